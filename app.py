@@ -1,44 +1,99 @@
 #!/usr/bin/env python3
 """
 Flask web application for Infinite Flight client with WebSocket support.
+
+Socket.IO runs as an asyncio (ASGI) server, so its handlers await the
+Infinite Flight clients directly on the loop that owns their connections.
 """
 
-import asyncio
+import os
+import time
+from functools import partial
+from typing import Any, Dict
+
+import socketio
+import uvicorn
+from asgiref.wsgi import WsgiToAsgi
 from flask import Flask, render_template
-from flask_socketio import SocketIO, emit
 from flask_cors import CORS
-import threading
-from typing import Optional
 
-from src import InfiniteFlightClient
+from src.api import SessionManager, TelemetryRecorder
+from src.api.discovery import DeviceRegistry
+from src.api.metrics import render_prometheus
+from src.api.poll_plan import PollPlan
+from src.api.subscriptions import Subscription
+from src.web import DeltaTracker, FlightPlanTracker, TelemetryEncoder
 
 app = Flask(__name__)
-import os  # Added for environment variables
 
 app.config["SECRET_KEY"] = os.environ.get("FLASK_SECRET_KEY", "pyfinite-flight-secret")
 
+# Where parsed manifests are cached between connections
+MANIFEST_CACHE_DIR = os.environ.get(
+    "MANIFEST_CACHE_DIR", os.path.join("~", ".cache", "pyfinite-flight", "manifests")
+)
+
+# How stale a cached state value may be before handlers re-read it (seconds)
+STATE_CACHE_MAX_AGE = float(os.environ.get("STATE_CACHE_MAX_AGE", "1.0"))
+
+# Category state lists are paged, and each page is streamed in chunks
+CATEGORY_PAGE_SIZE = int(os.environ.get("CATEGORY_PAGE_SIZE", "200"))
+CATEGORY_CHUNK_SIZE = 50
+
+# Slowest rate (Hz) update feeds back off to while values are static or
+# every viewer's page is hidden
+POLL_MIN_RATE = float(os.environ.get("POLL_MIN_RATE", "0.25"))
+
+# Where telemetry recordings are written
+RECORDINGS_DIR = os.environ.get("RECORDINGS_DIR", "recordings")
+
+# Most times one run_command event may repeat a command
+MAX_COMMAND_REPEAT = 100
+
+# How long a device may stay silent before it is removed from the list (seconds)
+DISCOVERY_TTL = float(os.environ.get("DISCOVERY_TTL", "10.0"))
+
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+flask_asgi_app = WsgiToAsgi(app)
 
-# Global client instance
-current_client: Optional[InfiniteFlightClient] = None
-discovery_task: Optional[asyncio.Task] = None
-event_loop: Optional[asyncio.AbstractEventLoop] = None
-location_update_task: Optional[threading.Thread] = None
-location_update_active = False
-flight_plan_update_task: Optional[threading.Thread] = None
-flight_plan_update_active = False
+
+async def http_app(scope, receive, send):
+    """Serve ``/metrics`` on the loop that owns the clients; the rest is Flask."""
+    if scope["type"] == "http" and scope["path"] == "/metrics":
+        body = render_prometheus(
+            {key: sessions.get(key).metrics_snapshot() for key in sessions.devices}
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain; version=0.0.4")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+    else:
+        await flask_asgi_app(scope, receive, send)
 
 
-def run_async(coro):
-    """Run an async coroutine in a thread-safe way."""
-    global event_loop
-    if event_loop is None:
-        event_loop = asyncio.new_event_loop()
-        threading.Thread(target=event_loop.run_forever, daemon=True).start()
+# Socket.IO traffic and metrics are handled natively; everything else goes
+# to Flask
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=http_app)
 
-    future = asyncio.run_coroutine_threadsafe(coro, event_loop)
-    return future.result()
+# One connection per device, shared by every browser session viewing it.
+# Each device's updates go to a Socket.IO room named after its device key.
+sessions = SessionManager(manifest_cache_dir=MANIFEST_CACHE_DIR)
+location_subscriptions: Dict[str, Subscription] = {}
+location_deltas: Dict[str, DeltaTracker] = {}
+flight_plan_subscriptions: Dict[str, Subscription] = {}
+flight_plan_trackers: Dict[str, FlightPlanTracker] = {}
+category_requests: Dict[str, Any] = {}  # sid -> request ID being streamed
+# Per-device merge of every browser's subscribe_states requests
+poll_plans: Dict[str, PollPlan] = {}
+# Binary telemetry state index of each browser that opted in
+telemetry_encoders: Dict[str, TelemetryEncoder] = {}
+hidden_viewers = set()  # sids whose page is in the background
+recorders: Dict[str, TelemetryRecorder] = {}  # device_key -> active recorder
 
 
 @app.route("/")
@@ -47,195 +102,315 @@ def index():
     return render_template("index.html")
 
 
-@socketio.on("connect")
-def handle_connect():
+@sio.on("connect")
+async def handle_connect(sid, environ):
     """Handle client connection."""
     print("Client connected")
-    emit("connected", {"status": "Connected to server"})
+    await sio.emit("connected", {"status": "Connected to server"}, to=sid)
+    # Listen for devices from the start so the list is warm when requested
+    try:
+        await device_registry.start()
+    except Exception as e:
+        print(f"Device discovery unavailable: {e}")
 
 
-@socketio.on("disconnect")
-def handle_disconnect():
+@sio.on("disconnect")
+async def handle_disconnect(sid):
     """Handle client disconnection."""
     print("Client disconnected")
-    # Stop updates
-    stop_location_updates()
-    stop_flight_plan_updates()
-    # Disconnect from Infinite Flight if connected
-    global current_client
-    if current_client and current_client.is_connected:
-        run_async(current_client.disconnect())
-        current_client = None
-
-
-@socketio.on("start_discovery")
-def handle_start_discovery():
+    category_requests.pop(sid, None)
+    # Release this session's device; the last viewer closes the connection
+    await _detach_viewer(sid)
+    hidden_viewers.discard(sid)
+
+
+async def _detach_viewer(sid):
+    """Detach a session from its device, stopping the device's updates if unused."""
+    device_key = sessions.device_of(sid)
+    if device_key is None:
+        return False
+
+    await sio.leave_room(sid, device_key)
+    if device_key in poll_plans:
+        await poll_plans[device_key].unsubscribe(sid)
+    telemetry_encoders.pop(sid, None)  # Indices are per device connection
+    hidden_viewers.discard(sid)
+    closed = await sessions.detach(sid)
+    if closed:
+        # The client's scheduler stopped with the connection
+        _forget_device_updates(closed)
+        await _stop_recording(closed)
+        print(f"Closed connection to {closed}")
+    else:
+        _update_device_demand(device_key)
+    return True
+
+
+def _update_device_demand(device_key):
+    """Idle a device's update feeds while none of its viewers is looking."""
+    client = sessions.get(device_key)
+    if client is None:
+        return
+
+    watched = any(v not in hidden_viewers for v in sessions.viewers(device_key))
+    for subscription in client.subscriptions:
+        if watched and subscription.idle:
+            client.wake([subscription])
+        elif not watched:
+            subscription.idle = True
+
+
+@sio.on("start_discovery")
+async def handle_start_discovery(sid):
     """Start device discovery."""
     print("Starting device discovery...")
-    emit("discovery_started", {"message": "Scanning for Infinite Flight devices..."})
-
-    async def discover():
-        client = InfiniteFlightClient()
-        devices = await client.discover_devices(timeout=5.0)
-        return devices
+    await sio.emit(
+        "discovery_started",
+        {"message": "Scanning for Infinite Flight devices..."},
+        to=sid,
+    )
 
     try:
-        devices = run_async(discover())
-
-        # Emit each device as it's found
-        for i, device in enumerate(devices):
-            device_info = {
-                "id": i,
-                "deviceName": device.get("deviceName", "Unknown"),
-                "deviceId": device.get("deviceId", "Unknown"),
-                "state": device.get("state", "Unknown"),
-                "aircraft": device.get("aircraft", "N/A"),
-                "livery": device.get("livery", "N/A"),
-                "version": device.get("version", "Unknown"),
-                "address": device.get("address", "Unknown"),
-                "preferredIp": device.get(
-                    "preferred_ip", device.get("address", "Unknown")
-                ),
-                "port": device.get("port", 10112),
-                "addresses": device.get("addresses", []),
-            }
-            socketio.emit("device_found", device_info)
+        # The registry keeps listening; devices appearing later are pushed
+        # to every browser as their broadcasts arrive
+        await device_registry.start()
+        devices = device_registry.devices
 
-        # Emit discovery complete
-        socketio.emit(
+        for device in devices:
+            await sio.emit("device_found", _device_info(device), to=sid)
+
+        await sio.emit(
             "discovery_complete",
             {
-                "message": f"Discovery complete. Found {len(devices)} device(s).",
+                "message": f"Listening for devices. Found {len(devices)} device(s) so far.",
                 "count": len(devices),
             },
+            to=sid,
         )
 
     except Exception as e:
-        socketio.emit("discovery_error", {"error": str(e)})
+        await sio.emit("discovery_error", {"error": str(e)}, to=sid)
 
 
-@socketio.on("connect_to_device")
-def handle_connect_to_device(data):
-    """Connect to a specific device."""
-    global current_client
+def _device_info(device):
+    """Build the device card data sent to the browser."""
+    return {
+        "deviceName": device.get("deviceName", "Unknown"),
+        "deviceId": device.get("deviceId", "Unknown"),
+        "state": device.get("state", "Unknown"),
+        "aircraft": device.get("aircraft", "N/A"),
+        "livery": device.get("livery", "N/A"),
+        "version": device.get("version", "Unknown"),
+        "address": device.get("address", "Unknown"),
+        "preferredIp": device.get("preferred_ip", device.get("address", "Unknown")),
+        "port": device.get("port", 10112),
+        "addresses": device.get("addresses", []),
+    }
+
+
+async def _on_device_found(device):
+    """Registry callback for new devices and devices whose details changed."""
+    await sio.emit("device_found", _device_info(device))
+
+
+async def _on_device_lost(device):
+    """Registry callback for devices that stopped broadcasting."""
+    print(f"Device lost: {device.get('deviceName', 'Unknown')}")
+    await sio.emit("device_lost", {"deviceId": device.get("deviceId", "Unknown")})
+
+
+# Devices broadcasting on the network, keyed by deviceId
+device_registry = DeviceRegistry(
+    ttl=DISCOVERY_TTL, on_found=_on_device_found, on_lost=_on_device_lost
+)
 
+
+@sio.on("connect_to_device")
+async def handle_connect_to_device(sid, data):
+    """Connect to a specific device."""
     host = data.get("host")
     port = data.get("port", 10112)
+    # Discovery details key the manifest cache, so reconnects skip the download
+    device = {
+        key: data[key] for key in ("deviceId", "version", "aircraft") if key in data
+    }
 
     print(f"Attempting to connect to {host}:{port}...")
-    emit(
+    await sio.emit(
         "connection_status",
         {"status": "connecting", "message": f"Connecting to {host}:{port}..."},
+        to=sid,
     )
 
     try:
-        # Disconnect existing client if any
-        if current_client and current_client.is_connected:
-            run_async(current_client.disconnect())
+        # Switching devices releases the previous one first
+        if sessions.device_of(sid) not in (
+            None,
+            SessionManager.device_key(host, port, device),
+        ):
+            await _detach_viewer(sid)
+
+        # Sessions already watching this device share its connection
+        device_key, client, created = await sessions.attach(sid, host, port, device)
+        await sio.enter_room(sid, device_key)
+
+        if not client.is_connected:
+            # Joined while the shared connection is being re-established;
+            # the room gets the status and manifest when it is back
+            await sio.emit(
+                "connection_status",
+                {"status": "reconnecting", "message": "Reconnecting..."},
+                to=sid,
+            )
+            return
 
-        # Create new client
-        current_client = InfiniteFlightClient(host=host, port=port)
+        manifest = _manifest_summary(client)
+        await sio.emit(
+            "connection_status",
+            {
+                "status": "connected",
+                "message": f"Successfully connected to Infinite Flight!",
+                "host": host,
+                "port": port,
+                "availableStates": manifest["stateCount"],
+            },
+            to=sid,
+        )
 
-        # Connect
-        connected = run_async(current_client.connect())
+        # Send initial state data
+        await sio.emit("manifest_loaded", manifest, to=sid)
 
-        if connected:
-            # Get some basic info
-            available_states = current_client.get_available_states()
+        if created:
+            client.on_connection_lost = partial(_on_connection_lost, device_key)
+            client.on_reconnected = partial(_on_reconnected, device_key, client)
+            await start_location_updates(device_key, client)
+            await start_flight_plan_updates(device_key, client)
+        else:
+            # Give the new viewer full location and flight plan frames,
+            # without waiting out a backed-off poll interval
+            if device_key in location_deltas:
+                location_deltas[device_key].reset()
+            if device_key in flight_plan_trackers:
+                flight_plan_trackers[device_key].reset()
+            client.wake()
+
+    except ConnectionError as e:
+        await sio.emit(
+            "connection_status",
+            {"status": "failed", "message": f"Connection failed: {str(e)}"},
+            to=sid,
+        )
+    except Exception as e:
+        await sio.emit(
+            "connection_status",
+            {"status": "error", "message": f"Error: {str(e)}"},
+            to=sid,
+        )
 
-            emit(
-                "connection_status",
-                {
-                    "status": "connected",
-                    "message": f"Successfully connected to Infinite Flight!",
-                    "host": host,
-                    "port": port,
-                    "availableStates": len(available_states),
-                },
-            )
 
-            # Send initial state data
-            emit(
-                "manifest_loaded",
-                {
-                    "stateCount": len(available_states),
-                    "categories": _categorize_states(available_states),
-                },
-            )
+def _manifest_summary(client):
+    """The ``manifest_loaded`` payload for a client's current manifest."""
+    available_states = client.get_available_states()
+    return {
+        "stateCount": len(available_states),
+        "categories": _categorize_states(available_states),
+        "commands": client.get_available_commands(),
+    }
 
-            # Start location updates
-            start_location_updates()
-            start_flight_plan_updates()
-        else:
-            error_msg = current_client.last_error or "Connection failed"
-            emit(
-                "connection_status",
-                {"status": "failed", "message": f"Connection failed: {error_msg}"},
-            )
-            current_client = None
 
-    except Exception as e:
-        emit("connection_status", {"status": "error", "message": f"Error: {str(e)}"})
-        current_client = None
+async def _on_connection_lost(device_key, error):
+    """Tell a device's viewers its connection dropped and is being retried."""
+    print(f"Lost connection to {device_key}: {error}")
+    await sio.emit(
+        "connection_status",
+        {"status": "reconnecting", "message": "Connection lost, reconnecting..."},
+        to=device_key,
+    )
 
 
-@socketio.on("disconnect_from_device")
-def handle_disconnect_from_device():
-    """Disconnect from the current device."""
-    global current_client
+async def _on_reconnected(device_key, client):
+    """Resume a device's viewers after its connection came back.
+
+    The client kept its subscriptions, so the location and flight plan
+    feeds pick up by themselves; the trackers are reset so the first frames
+    after the gap are complete. The manifest is sent again, since it may
+    have been reloaded for another aircraft and viewers may have joined
+    during the outage.
+    """
+    print(f"Reconnected to {device_key}")
+    if device_key in location_deltas:
+        location_deltas[device_key].reset()
+    if device_key in flight_plan_trackers:
+        flight_plan_trackers[device_key].reset()
+    manifest = _manifest_summary(client)
+    await sio.emit(
+        "connection_status",
+        {
+            "status": "connected",
+            "message": "Reconnected to Infinite Flight",
+            "host": client.host,
+            "port": client.port,
+            "availableStates": manifest["stateCount"],
+            "reconnected": True,
+        },
+        to=device_key,
+    )
+    await sio.emit("manifest_loaded", manifest, to=device_key)
 
-    # Stop updates
-    stop_location_updates()
-    stop_flight_plan_updates()
 
-    if current_client and current_client.is_connected:
-        try:
-            run_async(current_client.disconnect())
-            emit(
+@sio.on("disconnect_from_device")
+async def handle_disconnect_from_device(sid):
+    """Disconnect from the current device."""
+    try:
+        if await _detach_viewer(sid):
+            await sio.emit(
                 "connection_status",
                 {
                     "status": "disconnected",
                     "message": "Disconnected from Infinite Flight",
                 },
+                to=sid,
             )
-        except Exception as e:
-            emit(
+        else:
+            await sio.emit(
                 "connection_status",
-                {"status": "error", "message": f"Error disconnecting: {str(e)}"},
+                {"status": "disconnected", "message": "Not connected"},
+                to=sid,
             )
-        finally:
-            current_client = None
-    else:
-        emit(
-            "connection_status", {"status": "disconnected", "message": "Not connected"}
+    except Exception as e:
+        await sio.emit(
+            "connection_status",
+            {"status": "error", "message": f"Error disconnecting: {str(e)}"},
+            to=sid,
         )
 
 
-@socketio.on("get_connection_status")
-def handle_get_connection_status():
+@sio.on("get_connection_status")
+async def handle_get_connection_status(sid):
     """Get current connection status."""
-    global current_client
+    client = sessions.client_for(sid)
 
-    if current_client and current_client.is_connected:
-        emit(
+    if client:
+        await sio.emit(
             "connection_status",
             {
                 "status": "connected",
-                "host": current_client.host,
-                "port": current_client.port,
+                "host": client.host,
+                "port": client.port,
             },
+            to=sid,
         )
     else:
-        emit("connection_status", {"status": "disconnected"})
+        await sio.emit("connection_status", {"status": "disconnected"}, to=sid)
 
 
-@socketio.on("debug_states")
-def handle_debug_states():
+@sio.on("debug_states")
+async def handle_debug_states(sid):
     """Debug endpoint to check specific states."""
-    global current_client
+    client = sessions.client_for(sid)
 
-    if not current_client or not current_client.is_connected:
-        emit("debug_response", {"error": "Not connected"})
+    if not client:
+        await sio.emit("debug_response", {"error": "Not connected"}, to=sid)
         return
 
     debug_states = [
@@ -255,11 +430,10 @@ def handle_debug_states():
     results = {}
     for state_name in debug_states:
         try:
-            value = run_async(current_client.get_state(state_name))
+            value = await client.get_state(state_name)
             # Get the raw value and data type
-            state_id = current_client._state_map.get(state_name)
-            if state_id:
-                data_type = current_client._manifest[state_id][1]
+            data_type = client.get_state_type(state_name)
+            if data_type is not None:
                 results[state_name] = {
                     "value": str(value),
                     "raw": value,
@@ -270,76 +444,346 @@ def handle_debug_states():
         except Exception as e:
             results[state_name] = f"NOT FOUND: {str(e)}"
 
-    emit("debug_response", {"states": results})
+    await sio.emit("debug_response", {"states": results}, to=sid)
+
 
+@sio.on("get_category_states")
+async def handle_get_category_states(sid, data):
+    """Stream one page of a category's states, chunk by chunk.
 
-@socketio.on("get_category_states")
-def handle_get_category_states(data):
-    """Get all states for a specific category."""
-    global current_client
+    Emits ``category_states_start`` with the page bounds, then a
+    ``category_states_chunk`` as each pipelined batch of replies arrives,
+    then ``category_states_done``. ``data`` holds the ``category``, an
+    optional ``prefix`` below it to narrow the list, ``offset`` and
+    ``limit``, and a ``requestId`` echoed back on every event.
+    """
+    client = sessions.client_for(sid)
+    request_id = data.get("requestId")
 
-    if not current_client or not current_client.is_connected:
-        emit("category_states_error", {"error": "Not connected to Infinite Flight"})
+    if not client:
+        await sio.emit(
+            "category_states_error",
+            {"error": "Not connected to Infinite Flight", "requestId": request_id},
+            to=sid,
+        )
         return
 
     category = data.get("category")
     if not category:
-        emit("category_states_error", {"error": "No category specified"})
+        await sio.emit(
+            "category_states_error",
+            {"error": "No category specified", "requestId": request_id},
+            to=sid,
+        )
+        return
+
+    prefix = data.get("prefix") or category
+    if prefix != category and not prefix.startswith(f"{category}/"):
+        await sio.emit(
+            "category_states_error",
+            {"error": f"{prefix} is not in {category}", "requestId": request_id},
+            to=sid,
+        )
         return
 
     try:
-        # Get all states for this category
-        all_states = current_client.get_available_states()
-        category_states = []
-
-        for state_name in all_states:
-            if state_name.startswith(f"{category}/"):
-                # Try to get the current value
-                try:
-                    value = run_async(current_client.get_state(state_name))
-                    formatted_value = _format_state_value(value, state_name)
-                    state_type = _get_state_type(state_name)
-                except Exception as e:
-                    formatted_value = "N/A"
-                    state_type = "Unknown"
-
-                category_states.append(
-                    {
-                        "name": state_name,
-                        "displayName": state_name.replace(f"{category}/", "").replace(
-                            "/", " > "
-                        ),
-                        "value": formatted_value,
-                        "type": state_type,
-                        "category": category,
-                    }
-                )
+        offset = max(int(data.get("offset", 0)), 0)
+        limit = max(int(data.get("limit", CATEGORY_PAGE_SIZE)), 1)
+    except (TypeError, ValueError):
+        await sio.emit(
+            "category_states_error",
+            {"error": "offset and limit must be integers", "requestId": request_id},
+            to=sid,
+        )
+        return
 
-        # Sort states by name
-        category_states.sort(key=lambda x: x["name"])
+    # A newer request from this browser supersedes one still streaming
+    category_requests[sid] = request_id
 
-        emit(
-            "category_states",
+    try:
+        # Get the states below the prefix from the manifest's prefix index
+        state_names = client.get_states_with_prefix(prefix)
+        page = state_names[offset : offset + limit]
+
+        await sio.emit(
+            "category_states_start",
             {
+                "requestId": request_id,
                 "category": category,
-                "states": category_states,
-                "count": len(category_states),
+                "prefix": prefix,
+                "offset": offset,
+                "count": len(page),
+                "total": len(state_names),
             },
+            to=sid,
+        )
+
+        # Every chunk is requested at once; each is sent as soon as its
+        # replies are in, and recent values come straight from the cache
+        sent = 0
+        async for values in client.iter_cached_states(
+            page, STATE_CACHE_MAX_AGE, CATEGORY_CHUNK_SIZE
+        ):
+            if category_requests.get(sid) != request_id:
+                return  # Superseded or disconnected
+
+            chunk = page[sent : sent + CATEGORY_CHUNK_SIZE]
+            sent += len(chunk)
+            await sio.emit(
+                "category_states_chunk",
+                {
+                    "requestId": request_id,
+                    "category": category,
+                    "states": [
+                        _category_state(name, values, category) for name in chunk
+                    ],
+                },
+                to=sid,
+            )
+
+        await sio.emit(
+            "category_states_done",
+            {"requestId": request_id, "category": category, "count": sent},
+            to=sid,
         )
 
     except Exception as e:
-        emit("category_states_error", {"error": str(e)})
+        await sio.emit(
+            "category_states_error",
+            {"error": str(e), "requestId": request_id},
+            to=sid,
+        )
+    finally:
+        if category_requests.get(sid) == request_id:
+            del category_requests[sid]
+
+
+def _category_state(state_name, values, category):
+    """Build one row of the category states list."""
+    if state_name in values:
+        formatted_value = _format_state_value(values[state_name], state_name)
+        state_type = _get_state_type(state_name)
+    else:
+        formatted_value = "N/A"
+        state_type = "Unknown"
+
+    return {
+        "name": state_name,
+        "displayName": state_name.replace(f"{category}/", "").replace("/", " > "),
+        "value": formatted_value,
+        "type": state_type,
+        "category": category,
+    }
+
+
+@sio.on("viewer_visibility")
+async def handle_viewer_visibility(sid, data):
+    """Track whether a browser's page is visible, to idle unwatched feeds."""
+    if data.get("visible", True):
+        hidden_viewers.discard(sid)
+    else:
+        hidden_viewers.add(sid)
+
+    device_key = sessions.device_of(sid)
+    if device_key:
+        _update_device_demand(device_key)
+
+
+@sio.on("get_poll_rates")
+async def handle_get_poll_rates(sid):
+    """Report the target and current poll rate of each of the device's feeds."""
+    client = sessions.client_for(sid)
+    feeds = []
+    if client:
+        device_key = sessions.device_of(sid)
+        names = {
+            id(location_subscriptions.get(device_key)): "location",
+            id(flight_plan_subscriptions.get(device_key)): "flightPlan",
+        }
+        for subscription in client.subscriptions:
+            feeds.append(
+                {
+                    "feed": names.get(id(subscription), "states"),
+                    "states": len(subscription.state_names),
+                    "rate": subscription.rate,
+                    "effectiveRate": subscription.effective_rate,
+                    "idle": subscription.idle,
+                }
+            )
+    await sio.emit("poll_rates", {"feeds": feeds}, to=sid)
+
+
+@sio.on("get_metrics")
+async def handle_get_metrics(sid):
+    """Send the request counters and latency summaries of this device's client."""
+    client = sessions.client_for(sid)
+    if not client:
+        await sio.emit("metrics", {"error": "Not connected to Infinite Flight"}, to=sid)
+        return
+    await sio.emit("metrics", client.metrics_snapshot(), to=sid)
+
+
+@sio.on("subscribe_states")
+async def handle_subscribe_states(sid, data):
+    """Add states to this browser's live updates at a requested rate.
+
+    ``data`` holds the ``states`` to add and their ``rate`` in Hz (default
+    1). Values arrive as ``states_update`` events of formatted strings, or,
+    with ``binary`` set, as ``states_frame`` events of raw values packed by
+    a per-browser ``TelemetryEncoder``. The acknowledgement then carries
+    the ``index`` of each state in those frames. The latest subscription
+    picks the format of all of the browser's updates.
+    """
+    client = sessions.client_for(sid)
+    if not client:
+        await sio.emit(
+            "subscription_error", {"error": "Not connected to Infinite Flight"}, to=sid
+        )
+        return
+
+    state_names = data.get("states") or []
+    known = [name for name in state_names if client.has_state(name)]
+    unknown = [name for name in state_names if not client.has_state(name)]
+
+    ack = {"states": known, "unknown": unknown}
+    try:
+        rate = float(data.get("rate", 1.0))
+        if data.get("binary"):
+            encoder = telemetry_encoders.get(sid)
+            if encoder is None:
+                encoder = telemetry_encoders[sid] = TelemetryEncoder(
+                    client.get_state_type
+                )
+            ack["index"] = encoder.register(known)
+            callback = partial(_emit_states_frame, sid, encoder)
+        else:
+            callback = partial(_emit_states_update, sid)
+
+        plan = _poll_plan(sessions.device_of(sid), client)
+        ack["rate"] = await plan.subscribe(sid, known, rate, callback)
+    except (TypeError, ValueError) as e:
+        await sio.emit("subscription_error", {"error": str(e)}, to=sid)
+        return
+
+    await sio.emit("states_subscribed", ack, to=sid)
+
+
+@sio.on("unsubscribe_states")
+async def handle_unsubscribe_states(sid, data=None):
+    """Remove states from this browser's live updates (all if none are given)."""
+    state_names = (data or {}).get("states")
+    plan = poll_plans.get(sessions.device_of(sid))
+    if plan:
+        await plan.unsubscribe(sid, state_names)
+    await sio.emit("states_unsubscribed", {"states": state_names}, to=sid)
+
+
+def _poll_plan(device_key, client):
+    """Get the poll plan of a device, creating it on first use."""
+    plan = poll_plans.get(device_key)
+    if plan is None:
+        plan = poll_plans[device_key] = PollPlan(
+            client, _on_poll_plan_error, POLL_MIN_RATE
+        )
+    return plan
+
+
+async def _emit_states_update(sid, values):
+    """Poll plan callback that sends a browser its subscribed states."""
+    await sio.emit(
+        "states_update",
+        {"values": {name: _format_state_value(v, name) for name, v in values.items()}},
+        to=sid,
+    )
+
+
+async def _emit_states_frame(sid, encoder, values):
+    """Poll plan callback that sends a browser its states as a binary frame."""
+    await sio.emit("states_frame", encoder.encode(values), to=sid)
+
+
+def _on_poll_plan_error(error):
+    """Poll plan error callback."""
+    print(f"Error polling subscribed states: {error}")
+
+
+@sio.on("start_recording")
+async def handle_start_recording(sid, data=None):
+    """Start recording the device's telemetry to a file in RECORDINGS_DIR.
+
+    ``data`` may hold the ``states`` to record (the location states by
+    default) and the sample ``rate`` in Hz (default 1).
+    """
+    client = sessions.client_for(sid)
+    if not client:
+        await sio.emit(
+            "recording_status", {"error": "Not connected to Infinite Flight"}, to=sid
+        )
+        return
+
+    device_key = sessions.device_of(sid)
+    recorder = recorders.get(device_key)
+    if recorder is None:
+        data = data or {}
+        file_name = "{}-{}.iftr".format(
+            "".join(c if c.isalnum() else "_" for c in device_key),
+            time.strftime("%Y%m%d-%H%M%S"),
+        )
+        try:
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            recorder = TelemetryRecorder(
+                client,
+                os.path.join(RECORDINGS_DIR, file_name),
+                data.get("states") or LOCATION_STATES,
+                float(data.get("rate", 1.0)),
+            )
+            await recorder.start()
+        except (OSError, TypeError, ValueError) as e:
+            await sio.emit("recording_status", {"error": str(e)}, to=sid)
+            return
+        recorders[device_key] = recorder
+        print(f"Recording {device_key} to {recorder.path}")
+
+    await sio.emit(
+        "recording_status",
+        {"recording": True, "path": recorder.path, "states": recorder.state_names},
+        to=device_key,
+    )
+
+
+@sio.on("stop_recording")
+async def handle_stop_recording(sid):
+    """Stop recording the device's telemetry."""
+    device_key = sessions.device_of(sid)
+    recorder = await _stop_recording(device_key)
+    status = {"recording": False}
+    if recorder:
+        status.update(path=recorder.path, rows=recorder.rows_written)
+    await sio.emit("recording_status", status, to=device_key or sid)
 
 
-@socketio.on("set_aircraft_state")
-def handle_set_aircraft_state(data):
+async def _stop_recording(device_key):
+    """Stop a device's recorder, if any, and return it."""
+    recorder = recorders.pop(device_key, None)
+    if recorder:
+        try:
+            await recorder.stop()
+        except OSError as e:
+            print(f"Error finishing recording {recorder.path}: {e}")
+        print(f"Recorded {recorder.rows_written} samples to {recorder.path}")
+    return recorder
+
+
+@sio.on("set_aircraft_state")
+async def handle_set_aircraft_state(sid, data):
     """Set a specific aircraft state."""
-    global current_client
+    client = sessions.client_for(sid)
 
-    if not current_client or not current_client.is_connected:
-        emit(
+    if not client:
+        await sio.emit(
             "set_state_response",
             {"success": False, "error": "Not connected to Infinite Flight"},
+            to=sid,
         )
         return
 
@@ -347,42 +791,81 @@ def handle_set_aircraft_state(data):
     value = data.get("value")
 
     if not state_name:
-        emit(
-            "set_state_response", {"success": False, "error": "state_name not provided"}
+        await sio.emit(
+            "set_state_response",
+            {"success": False, "error": "state_name not provided"},
+            to=sid,
         )
         return
 
     # Value can be None for some types (e.g. if we were to allow setting booleans to false explicitly)
     # but for now, we expect a value.
     if value is None:
-        emit("set_state_response", {"success": False, "error": "value not provided"})
+        await sio.emit(
+            "set_state_response",
+            {"success": False, "error": "value not provided"},
+            to=sid,
+        )
         return
 
     try:
         print(f"Attempting to set state: {state_name} to {value}")
-        # The client's set_state method is async, so we use run_async
-        run_async(current_client.set_state(state_name, value))
-        emit(
+        await client.set_state(state_name, value)
+        await sio.emit(
             "set_state_response",
             {"success": True, "state_name": state_name, "value": value},
+            to=sid,
         )
         print(f"Successfully set state: {state_name} to {value}")
 
         # Optionally, re-fetch the state to confirm and send update
-        # current_value = run_async(current_client.get_state(state_name))
-        # emit("state_update", {"state_name": state_name, "value": current_value})
+        # current_value = await client.get_state(state_name)
+        # await sio.emit("state_update", {"state_name": state_name, "value": current_value}, to=sid)
 
     except ValueError as ve:  # Catch specific errors from client.set_state
         print(f"ValueError setting state {state_name}: {ve}")
-        emit("set_state_response", {"success": False, "error": str(ve)})
-    except (
-        NotImplementedError
-    ) as nie:  # Catch specific errors from client._send_request
-        print(f"NotImplementedError setting state {state_name}: {nie}")
-        emit("set_state_response", {"success": False, "error": str(nie)})
+        await sio.emit(
+            "set_state_response", {"success": False, "error": str(ve)}, to=sid
+        )
     except Exception as e:
         print(f"Error setting state {state_name}: {e}")
-        emit("set_state_response", {"success": False, "error": str(e)})
+        await sio.emit(
+            "set_state_response", {"success": False, "error": str(e)}, to=sid
+        )
+
+
+@sio.on("run_command")
+async def handle_run_command(sid, data):
+    """Run an Infinite Flight command, optionally several times in a row.
+
+    ``data`` holds the ``command`` name and an optional ``repeat`` count.
+    Commands are queued on the client's command channel and sent without
+    waiting for the sim.
+    """
+    client = sessions.client_for(sid)
+    if not client:
+        await sio.emit(
+            "command_response",
+            {"success": False, "error": "Not connected to Infinite Flight"},
+            to=sid,
+        )
+        return
+
+    command_name = data.get("command")
+    try:
+        repeat = int(data.get("repeat", 1))
+        if repeat > MAX_COMMAND_REPEAT:
+            raise ValueError(f"repeat must be at most {MAX_COMMAND_REPEAT}")
+        client.queue_command(command_name, repeat)
+    except (RuntimeError, TypeError, ValueError) as e:
+        await sio.emit("command_response", {"success": False, "error": str(e)}, to=sid)
+        return
+
+    await sio.emit(
+        "command_response",
+        {"success": True, "command": command_name, "repeat": repeat},
+        to=sid,
+    )
 
 
 def _categorize_states(states):
@@ -441,189 +924,196 @@ def _get_state_type(state_name):
         return "Value"
 
 
-def start_location_updates():
-    """Start sending location updates to all connected clients."""
-    global location_update_task, location_update_active
+LOCATION_STATES = [
+    "aircraft/0/latitude",
+    "aircraft/0/longitude",
+    "aircraft/0/altitude_msl",
+    "aircraft/0/altitude_agl",
+    "aircraft/0/heading_true",
+    "aircraft/0/heading_magnetic",
+    "aircraft/0/indicated_airspeed",
+    "aircraft/0/groundspeed",
+]
+
+
+# Display fields of the location panel and the states each is built from
+LOCATION_FIELDS = {
+    "latitude": ("aircraft/0/latitude",),
+    "longitude": ("aircraft/0/longitude",),
+    "altitude_msl": ("aircraft/0/altitude_msl",),
+    "altitude_agl": ("aircraft/0/altitude_agl",),
+    "heading": ("aircraft/0/heading_true", "aircraft/0/heading_magnetic"),
+    "speed": ("aircraft/0/indicated_airspeed", "aircraft/0/groundspeed"),
+}
+
+# Smallest change worth sending, in each state's native unit
+LOCATION_EPSILONS = {
+    "aircraft/0/latitude": 1e-6,  # degrees
+    "aircraft/0/longitude": 1e-6,  # degrees
+    "aircraft/0/altitude_msl": 1.0,  # feet
+    "aircraft/0/altitude_agl": 1.0,  # feet
+    "aircraft/0/heading_true": 0.001,  # radians
+    "aircraft/0/heading_magnetic": 0.001,  # radians
+    "aircraft/0/indicated_airspeed": 0.1,  # m/s
+    "aircraft/0/groundspeed": 0.1,  # m/s
+}
+
+FLIGHT_PLAN_STATE = "aircraft/0/flightplan/full_info"
+
+
+def _format_location(states):
+    """Format raw location states for the location panel."""
+    location_data = {}
+
+    # Position
+    lat = states.get("aircraft/0/latitude")
+    location_data["latitude"] = f"{lat:.6f}" if lat is not None else "N/A"
+    lon = states.get("aircraft/0/longitude")
+    location_data["longitude"] = f"{lon:.6f}" if lon is not None else "N/A"
+
+    # Altitude
+    alt_msl = states.get("aircraft/0/altitude_msl")
+    location_data["altitude_msl"] = (
+        f"{alt_msl:,.0f} ft" if alt_msl is not None else "N/A"
+    )
+    alt_agl = states.get("aircraft/0/altitude_agl")
+    location_data["altitude_agl"] = (
+        f"{alt_agl:,.0f} ft" if alt_agl is not None else "N/A"
+    )
+
+    # Heading - try true heading first, then magnetic (both in radians)
+    heading = states.get("aircraft/0/heading_true")
+    if heading is not None:
+        location_data["heading"] = f"{heading * 180 / 3.14159265359:.0f}°T"
+    else:
+        heading = states.get("aircraft/0/heading_magnetic")
+        if heading is not None:
+            location_data["heading"] = f"{heading * 180 / 3.14159265359:.0f}°M"
+        else:
+            location_data["heading"] = "N/A"
+
+    # Speed - indicated airspeed, falling back to groundspeed (both in m/s)
+    speed = states.get("aircraft/0/indicated_airspeed")
+    if speed is not None:
+        location_data["speed"] = f"{speed * 1.94384:.0f} kts IAS"
+    else:
+        speed = states.get("aircraft/0/groundspeed")
+        if speed is not None:
+            location_data["speed"] = f"{speed * 1.94384:.0f} kts GS"
+        else:
+            location_data["speed"] = "N/A"
+
+    return location_data
 
-    if location_update_active:
+
+async def start_location_updates(device_key, client):
+    """Start sending a device's location updates to its room."""
+    if device_key in location_subscriptions:
         return  # Already running
 
-    location_update_active = True
-    location_update_task = threading.Thread(target=_location_update_loop, daemon=True)
-    location_update_task.start()
-    print("Started location updates")
-
-
-def stop_location_updates():
-    """Stop sending location updates."""
-    global location_update_active
-
-    location_update_active = False
-    print("Stopped location updates")
-
-
-def _location_update_loop():
-    """Background thread that sends location updates."""
-    global current_client, location_update_active
-
-    while location_update_active:
-        if current_client and current_client.is_connected:
-            try:
-                # Get location data
-                location_data = {}
-
-                # Position
-                try:
-                    lat = run_async(current_client.get_state("aircraft/0/latitude"))
-                    location_data["latitude"] = f"{lat:.6f}"
-                except:
-                    location_data["latitude"] = "N/A"
-
-                try:
-                    lon = run_async(current_client.get_state("aircraft/0/longitude"))
-                    location_data["longitude"] = f"{lon:.6f}"
-                except:
-                    location_data["longitude"] = "N/A"
-
-                # Altitude
-                try:
-                    alt_msl = run_async(
-                        current_client.get_state("aircraft/0/altitude_msl")
-                    )
-                    location_data["altitude_msl"] = f"{alt_msl:,.0f} ft"
-                except:
-                    location_data["altitude_msl"] = "N/A"
-
-                try:
-                    alt_agl = run_async(
-                        current_client.get_state("aircraft/0/altitude_agl")
-                    )
-                    location_data["altitude_agl"] = f"{alt_agl:,.0f} ft"
-                except:
-                    location_data["altitude_agl"] = "N/A"
-
-                # Heading - try true heading first, then magnetic
-                heading_found = False
-                try:
-                    heading = run_async(
-                        current_client.get_state("aircraft/0/heading_true")
-                    )
-                    if heading is not None:
-                        # Convert from radians to degrees
-                        heading = heading * 180 / 3.14159265359
-                        location_data["heading"] = f"{heading:.0f}°T"
-                        heading_found = True
-                except:
-                    pass
-
-                if not heading_found:
-                    try:
-                        heading = run_async(
-                            current_client.get_state("aircraft/0/heading_magnetic")
-                        )
-                        if heading is not None:
-                            # Convert from radians to degrees
-                            heading = heading * 180 / 3.14159265359
-                            location_data["heading"] = f"{heading:.0f}°M"
-                    except:
-                        location_data["heading"] = "N/A"
-
-                # Speed - use indicated_airspeed and convert from m/s to knots
-                try:
-                    speed = run_async(
-                        current_client.get_state("aircraft/0/indicated_airspeed")
-                    )
-                    if speed is not None:
-                        # Convert from m/s to knots
-                        speed_knots = speed * 1.94384
-                        location_data["speed"] = f"{speed_knots:.0f} kts IAS"
-                    else:
-                        # Fallback to groundspeed
-                        try:
-                            speed = run_async(
-                                current_client.get_state("aircraft/0/groundspeed")
-                            )
-                            if speed is not None:
-                                # Also in m/s
-                                speed_knots = speed * 1.94384
-                                location_data["speed"] = f"{speed_knots:.0f} kts GS"
-                            else:
-                                location_data["speed"] = "N/A"
-                        except:
-                            location_data["speed"] = "N/A"
-                except Exception as e:
-                    location_data["speed"] = "N/A"
-
-                # Emit location update to all connected clients
-                socketio.emit("location_update", location_data)
-
-            except Exception as e:
-                print(f"Error getting location data: {e}")
-
-        # Wait before next update (2 Hz update rate)
-        threading.Event().wait(0.5)
-
-
-def start_flight_plan_updates():
-    """Start sending flight plan updates to all connected clients."""
-    global flight_plan_update_task, flight_plan_update_active
-
-    if flight_plan_update_active:
+    delta = DeltaTracker(LOCATION_EPSILONS, keyframe_interval=5.0)
+    location_deltas[device_key] = delta
+
+    # Poll location at 2 Hz through the client's shared scheduler, backing
+    # off while the aircraft sits still or the sim is paused
+    location_subscriptions[device_key] = await client.subscribe(
+        LOCATION_STATES,
+        2.0,
+        partial(_emit_location_update, device_key, delta),
+        _on_location_error,
+        min_rate=POLL_MIN_RATE,
+    )
+    print(f"Started location updates for {device_key}")
+
+
+async def _emit_location_update(device_key, delta, states):
+    """Subscription callback that sends changed location fields."""
+    changed, keyframe = delta.update(states)
+    if not changed and not keyframe:
+        return  # Nothing moved beyond its epsilon
+
+    location_data = _format_location(states)
+    if not keyframe:
+        location_data = {
+            field: value
+            for field, value in location_data.items()
+            if any(name in changed for name in LOCATION_FIELDS[field])
+        }
+
+    await sio.emit("location_update", location_data, to=device_key)
+
+
+def _on_location_error(error):
+    """Subscription error callback for location updates."""
+    print(f"Error getting location data: {error}")
+
+
+async def start_flight_plan_updates(device_key, client):
+    """Start sending a device's flight plan updates to its room."""
+    if device_key in flight_plan_subscriptions:
         return  # Already running
 
-    flight_plan_update_active = True
-    flight_plan_update_task = threading.Thread(
-        target=_flight_plan_update_loop, daemon=True
+    tracker = FlightPlanTracker()
+    flight_plan_trackers[device_key] = tracker
+
+    # Poll the flight plan at 1 Hz through the client's shared scheduler,
+    # backing off while it is unchanged
+    flight_plan_subscriptions[device_key] = await client.subscribe(
+        [FLIGHT_PLAN_STATE],
+        1.0,
+        partial(_emit_flight_plan_update, device_key, tracker),
+        partial(_on_flight_plan_error, device_key, tracker),
+        min_rate=min(POLL_MIN_RATE, 1.0),
     )
-    flight_plan_update_task.start()
-    print("Started flight plan updates")
+    print(f"Started flight plan updates for {device_key}")
 
 
-def stop_flight_plan_updates():
-    """Stop sending flight plan updates."""
-    global flight_plan_update_active
+def _forget_device_updates(device_key):
+    """Drop the update state of a device whose connection has closed."""
+    location_subscriptions.pop(device_key, None)
+    location_deltas.pop(device_key, None)
+    flight_plan_subscriptions.pop(device_key, None)
+    flight_plan_trackers.pop(device_key, None)
+    poll_plans.pop(device_key, None)
 
-    flight_plan_update_active = False
-    print("Stopped flight plan updates")
 
+async def _emit_flight_plan_update(device_key, tracker, states):
+    """Subscription callback that sends flight plan changes."""
+    flight_plan_data = states.get(FLIGHT_PLAN_STATE)
 
-def _flight_plan_update_loop():
-    """Background thread that sends flight plan updates."""
-    global current_client, flight_plan_update_active
+    if not flight_plan_data:
+        if tracker.clear():
+            await sio.emit(
+                "flight_plan_update",
+                {"error": "No active flight plan."},
+                to=device_key,
+            )
+        return
 
-    while flight_plan_update_active:
-        if current_client and current_client.is_connected:
-            try:
-                # Assuming flight plan data is available via a state like "aircraft/0/flightplan/full_info"
-                # or a specific method. Using get_state for consistency with location.
-                # The structure of flight_plan_data should match what the frontend expects.
-                flight_plan_data = run_async(
-                    current_client.get_state("aircraft/0/flightplan/full_info")
-                )
+    try:
+        # Unchanged plans are skipped; edits only carry what changed
+        update = tracker.update(flight_plan_data)
+    except ValueError as e:
+        print(f"Error parsing flight plan data: {e}")
+        await sio.emit(
+            "flight_plan_update",
+            {"error": "Invalid flight plan data format."},
+            to=device_key,
+        )
+        return
 
-                if flight_plan_data:
-                    # Ensure the data is in a serializable format (e.g., dict)
-                    # The user provided JSON indicates it's likely a complex dictionary.
-                    # No specific formatting needed here if get_state returns the dict directly.
-                    socketio.emit("flight_plan_update", flight_plan_data)
-                else:
-                    # Optionally handle cases where flight plan is not available or empty
-                    # print("Flight plan data not available or empty.")
-                    # We can emit an empty object or a specific message if needed
-                    socketio.emit(
-                        "flight_plan_update", {"error": "No active flight plan."}
-                    )
+    if update:
+        await sio.emit("flight_plan_update", update, to=device_key)
 
-            except Exception as e:
-                print(f"Error getting flight plan data: {e}")
-                # Optionally emit an error to the client if needed
-                socketio.emit("flight_plan_update", {"error": str(e)})
 
-        # Wait before next update (e.g., 1 Hz update rate for flight plan)
-        threading.Event().wait(1.0)
+async def _on_flight_plan_error(device_key, tracker, error):
+    """Subscription error callback for flight plan updates."""
+    print(f"Error getting flight plan data: {error}")
+    tracker.reset()  # Resend the whole plan once reads recover
+    await sio.emit("flight_plan_update", {"error": str(error)}, to=device_key)
 
 
 if __name__ == "__main__":
     print("Starting Infinite Flight Web Interface...")
     print("Open http://localhost:5000 in your browser")
-    socketio.run(app, debug=True, host="0.0.0.0", port=5000)
+    uvicorn.run(asgi_app, host="0.0.0.0", port=5000)
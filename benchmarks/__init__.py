@@ -0,0 +1 @@
+"""Benchmarks against a local mock Infinite Flight device."""
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare before.json after.json
+
+Prints every number the two runs have in common with its relative change.
+Whether higher is better depends on the metric: throughputs should go up,
+latencies down.
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (dotted path, value) for every number in nested results."""
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, path + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs.")
+    parser.add_argument("before", help="Results of the baseline run")
+    parser.add_argument("after", help="Results of the run to compare")
+    parser.add_argument(
+        "--filter", default="", help="Only show metrics whose path contains this"
+    )
+    args = parser.parse_args()
+
+    with open(args.before) as file:
+        before = json.load(file)
+    with open(args.after) as file:
+        after = json.load(file)
+
+    print(f"before: {before.get('commit')} ({before.get('timestamp')})")
+    print(f"after:  {after.get('commit')} ({after.get('timestamp')})")
+    print()
+
+    old = dict(flatten(before["results"]))
+    new = dict(flatten(after["results"]))
+    paths = [path for path in old if path in new and args.filter in path]
+    width = max(map(len, paths), default=0)
+    for path in paths:
+        change = (new[path] - old[path]) / old[path] * 100 if old[path] else 0.0
+        print(
+            f"{path:<{width}}  {old[path]:>14.6g}  {new[path]:>14.6g}  {change:+8.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite against a local mock Infinite Flight device.
+
+Writes a synthetic recording, serves it with ``src.api.mock_server`` on
+loopback and measures the client (and optionally the web app) under a
+configurable load. Results are JSON, so runs can be compared across
+commits with ``python -m benchmarks.compare``:
+
+    python -m benchmarks.run --output before.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.sim import REPO_ROOT, MockSim, free_port
+from src.api.client import InfiniteFlightClient
+from src.api.codec import DataType
+from src.api.discovery import DeviceRegistry
+from src.api.metrics import LatencyHistogram
+from src.api.mock_server import MockInfiniteFlight
+from src.api.replay import Recording
+from src.api.synthetic import LOCATION_STATES, synthetic_states, write_recording
+
+RESULTS_VERSION = 1
+
+
+async def _connected_client(sim: MockSim) -> InfiniteFlightClient:
+    """A client connected to the mock sim."""
+    client = InfiniteFlightClient(sim.host, sim.port)
+    if not await client.connect():
+        raise RuntimeError(client.last_error or "Connection failed")
+    return client
+
+
+def _filler_states(args: argparse.Namespace) -> List[str]:
+    """Synthetic floating point states outside the location feed."""
+    return [
+        name
+        for name, data_type in synthetic_states(args.states)
+        if data_type in (DataType.FLOAT, DataType.DOUBLE)
+        and name not in LOCATION_STATES
+    ]
+
+
+async def bench_manifest_load(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Connect from scratch (no manifest cache) ``--repeat`` times."""
+    connects = LatencyHistogram()
+    manifests = LatencyHistogram()
+    for _ in range(args.repeat):
+        client = InfiniteFlightClient(sim.host, sim.port)
+        started = time.perf_counter()
+        if not await client.connect():
+            raise RuntimeError(client.last_error or "Connection failed")
+        connects.record(time.perf_counter() - started)
+        manifests.record(client.metrics.operations["manifest"].total)
+        await client.disconnect()
+
+    return {
+        "states": args.states,
+        "connect": connects.snapshot(),
+        "manifest": manifests.snapshot(),
+    }
+
+
+async def bench_state_rtt(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Read one state ``--requests`` times, one request at a time."""
+    client = await _connected_client(sim)
+    try:
+        state = "aircraft/0/altitude_msl"
+        for _ in range(min(args.requests, 100)):
+            await client.get_state(state)  # Warm up
+
+        rtt = LatencyHistogram()
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            sent = time.perf_counter()
+            await client.get_state(state)
+            rtt.record(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.disconnect()
+
+    return {"requests_per_second": args.requests / elapsed, "rtt": rtt.snapshot()}
+
+
+async def _run_workers(
+    args: argparse.Namespace, work: Callable[[int], Any]
+) -> Dict[str, Any]:
+    """Run ``--concurrency`` workers for ``--duration`` seconds.
+
+    Each worker calls ``work(worker_index)`` in a loop; the call's duration
+    is recorded.
+
+    Returns:
+        The number of calls, the elapsed time and a latency summary
+    """
+    latency = LatencyHistogram()
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(index: int):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await work(index)
+            latency.record(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return {
+        "calls": latency.count,
+        "elapsed": time.perf_counter() - started,
+        "latency": latency.snapshot(),
+    }
+
+
+async def bench_batch_throughput(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Read ``--batch-size`` states per round trip from concurrent workers."""
+    client = await _connected_client(sim)
+    names = _filler_states(args)
+    batches = [
+        [names[(w * args.batch_size + i) % len(names)] for i in range(args.batch_size)]
+        for w in range(args.concurrency)
+    ]
+    try:
+        run = await _run_workers(args, lambda w: client.get_states(batches[w]))
+    finally:
+        await client.disconnect()
+
+    return {
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "states_per_second": run["calls"] * args.batch_size / run["elapsed"],
+        "batches_per_second": run["calls"] / run["elapsed"],
+        "batch_latency": run["latency"],
+    }
+
+
+async def bench_set_throughput(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Set states from concurrent workers, each cycling through its own."""
+    client = await _connected_client(sim)
+    # Location states are left alone; the fan-out benchmark needs them moving
+    names = _filler_states(args)
+    counters = [0] * args.concurrency
+
+    def set_next(worker: int):
+        counters[worker] += 1
+        name = names[(worker + counters[worker] * args.concurrency) % len(names)]
+        return client.set_state(name, float(counters[worker]))
+
+    try:
+        sent_before = client.metrics.bytes_sent
+        run = await _run_workers(args, set_next)
+        await client.flush_sets()
+        sent = client.metrics.bytes_sent - sent_before
+    finally:
+        await client.disconnect()
+
+    return {
+        "concurrency": args.concurrency,
+        "sets_per_second": run["calls"] / run["elapsed"],
+        # Below a set frame's size when coalescing dropped superseded sets
+        "bytes_per_set": sent / run["calls"] if run["calls"] else 0.0,
+        "set_latency": run["latency"],
+    }
+
+
+async def bench_discovery(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Time from a device's first broadcast until the registry reports it."""
+    latency = LatencyHistogram()
+    with Recording(sim.recording_path) as recording:
+        for _ in range(args.repeat):
+            port = free_port(socket.SOCK_DGRAM)
+            found = asyncio.Event()
+            registry = DeviceRegistry(on_found=lambda device: found.set())
+            await registry.start(port)
+            device = MockInfiniteFlight(
+                recording,
+                port=0,
+                broadcast_address="127.0.0.1",
+                broadcast_port=port,
+            )
+            try:
+                started = time.perf_counter()
+                await device.start()
+                await asyncio.wait_for(found.wait(), timeout=5.0)
+                latency.record(time.perf_counter() - started)
+            finally:
+                await device.stop()
+                await registry.stop()
+
+    return {"latency": latency.snapshot()}
+
+
+async def bench_socketio_fanout(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Measure how the web app's location updates reach ``--browsers`` clients.
+
+    Every browser attaches to the mock sim's device, so they all share one
+    connection and one Socket.IO room.
+    """
+    missing = [
+        module
+        for module in ("flask", "flask_cors", "socketio", "uvicorn", "aiohttp")
+        if importlib.util.find_spec(module) is None
+    ]
+    if missing:
+        return {"skipped": f"Not installed: {', '.join(missing)}"}
+
+    # The app logs to stdout, which may be carrying the results
+    with contextlib.redirect_stdout(sys.stderr):
+        return await _fanout(sim, args)
+
+
+async def _fanout(sim: MockSim, args: argparse.Namespace) -> Dict:
+    """Run the fan-out benchmark once its dependencies are known to exist."""
+    import socketio
+    import uvicorn
+
+    import app as webapp
+
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(webapp.asgi_app, host="127.0.0.1", port=port, log_level="error")
+    )
+    serving = asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    browsers = []
+    arrivals: List[List[float]] = []
+    attach = LatencyHistogram()
+    try:
+        for index in range(args.browsers):
+            browser = socketio.AsyncClient()
+            connected = asyncio.Event()
+            times: List[float] = []
+
+            def on_status(data, connected=connected):
+                if data.get("status") == "connected":
+                    connected.set()
+
+            def on_location(data, times=times):
+                times.append(time.perf_counter())
+
+            browser.on("connection_status", on_status)
+            browser.on("location_update", on_location)
+            await browser.connect(f"http://127.0.0.1:{port}", transports=["websocket"])
+            started = time.perf_counter()
+            await browser.emit(
+                "connect_to_device", {"host": sim.host, "port": sim.port}
+            )
+            await asyncio.wait_for(connected.wait(), timeout=10.0)
+            attach.record(time.perf_counter() - started)
+            browsers.append(browser)
+            arrivals.append(times)
+
+        for times in arrivals:
+            times.clear()  # Measure from here, with every browser attached
+        await asyncio.sleep(args.duration)
+    finally:
+        for browser in browsers:
+            await browser.disconnect()
+        server.should_exit = True
+        await serving
+
+    # The room gets the same updates in the same order, so the n-th update
+    # of every browser is the same emit
+    spread = LatencyHistogram()
+    for update in range(min(map(len, arrivals), default=0)):
+        moments = [times[update] for times in arrivals]
+        spread.record(max(moments) - min(moments))
+    delivered = sum(map(len, arrivals))
+
+    return {
+        "browsers": args.browsers,
+        "attach": attach.snapshot(),
+        "updates_per_browser": delivered / len(arrivals) if arrivals else 0.0,
+        "deliveries_per_second": delivered / args.duration,
+        "delivery_spread": spread.snapshot(),
+    }
+
+
+BENCHMARKS = {
+    "manifest_load": bench_manifest_load,
+    "state_rtt": bench_state_rtt,
+    "batch_throughput": bench_batch_throughput,
+    "set_throughput": bench_set_throughput,
+    "discovery": bench_discovery,
+    "socketio_fanout": bench_socketio_fanout,
+}
+
+
+def _git(*command: str) -> Optional[str]:
+    """Output of a git command in the repository, if git is available."""
+    try:
+        return subprocess.run(
+            ["git", *command],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the selected benchmarks and collect their results."""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        recording_path = os.path.join(directory, "benchmark.iftr")
+        write_recording(recording_path, args.states)
+
+        async with MockSim(recording_path) as sim:
+            for name in args.only or BENCHMARKS:
+                print(f"Running {name}...", file=sys.stderr)
+                started = time.perf_counter()
+                try:
+                    results[name] = await BENCHMARKS[name](sim, args)
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {e}"}
+                results[name]["seconds"] = time.perf_counter() - started
+
+    dirty = _git("status", "--porcelain")
+    return {
+        "version": RESULTS_VERSION,
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(dirty) if dirty is not None else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the client against a local mock Infinite Flight device."
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run"
+    )
+    parser.add_argument(
+        "--states", type=int, default=2000, help="States in the mock manifest"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="Reads for the RTT benchmark"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="Seconds per timed benchmark"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent workers")
+    parser.add_argument(
+        "--batch-size", type=int, default=50, help="States per batched read"
+    )
+    parser.add_argument(
+        "--browsers", type=int, default=20, help="Simulated Socket.IO browsers"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Repetitions of one-off benchmarks"
+    )
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    args = parser.parse_args()
+    if args.states < 100:
+        parser.error("--states must be at least 100")
+
+    results = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import socket
+import sys
+from typing import Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MockSim:
+    """``src.api.mock_server`` running in its own process on loopback.
+
+    A separate process keeps the server's work out of the timings of the
+    client being measured.
+    """
+
+    def __init__(self, recording_path: str, host: str = "127.0.0.1"):
+        """Initialize the mock sim.
+
+        Args:
+            recording_path: The recording to serve
+            host: Address to listen on
+        """
+        self.recording_path = recording_path
+        self.host = host
+        self.port: Optional[int] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self, timeout: float = 30.0):
+        """Start the server and wait until it listens.
+
+        Raises:
+            RuntimeError: If the server did not come up
+        """
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-u",
+            "-m",
+            "src.api.mock_server",
+            self.recording_path,
+            "--host",
+            self.host,
+            "--port",
+            "0",
+            "--broadcast-address",
+            "",
+            cwd=REPO_ROOT,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        # The server announces "... on host:port" once it listens
+        line = await asyncio.wait_for(self._process.stdout.readline(), timeout)
+        if not line:
+            await self.stop()
+            raise RuntimeError("Mock server exited before listening")
+        self.port = int(line.decode("utf-8").rsplit(":", 1)[1])
+
+    async def stop(self):
+        """Terminate the server."""
+        process, self._process = self._process, None
+        if process and process.returncode is None:
+            process.terminate()
+            await process.wait()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+
+def free_port(kind: int = socket.SOCK_STREAM) -> int:
+    """A currently unused loopback port (``SOCK_STREAM`` or ``SOCK_DGRAM``)."""
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -1,5 +1,7 @@
 """Infinite Flight Connect API client module."""
 
 from .client import InfiniteFlightClient
+from .recorder import TelemetryRecorder
+from .sessions import SessionManager
 
-__all__ = ["InfiniteFlightClient"]
\ No newline at end of file
+__all__ = ["InfiniteFlightClient", "SessionManager", "TelemetryRecorder"]
\ No newline at end of file
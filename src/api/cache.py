@@ -0,0 +1,78 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class StateCache:
+    """Most recent value of every state read over a connection.
+
+    Every batch the client reads lands here, so values polled for one
+    consumer can be served to any other without another round trip.
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._entries: Dict[str, Tuple[float, Any]] = {}  # name -> (time, value)
+        # Reads currently on the wire, so concurrent misses share one fetch
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def store(self, values: Dict[str, Any]):
+        """Record freshly read values.
+
+        Args:
+            values: State name -> value
+        """
+        now = time.monotonic()
+        for name, value in values.items():
+            self._entries[name] = (now, value)
+
+    def lookup(
+        self, state_names: Iterable[str], max_age: float
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """Split states into fresh cached values and misses.
+
+        Args:
+            state_names: The names of the states to look up
+            max_age: Oldest acceptable value, in seconds
+
+        Returns:
+            The fresh values and the names that must be read from the sim
+        """
+        oldest = time.monotonic() - max_age
+        hits: Dict[str, Any] = {}
+        misses: List[str] = []
+
+        for name in state_names:
+            entry = self._entries.get(name)
+            if entry and entry[0] >= oldest:
+                hits[name] = entry[1]
+            else:
+                misses.append(name)
+
+        return hits, misses
+
+    def inflight(self, state_name: str) -> Optional[asyncio.Future]:
+        """The read currently fetching a state, if any."""
+        return self._pending.get(state_name)
+
+    def track(self, state_names: List[str], fetch: asyncio.Future):
+        """Register a read so concurrent misses can await it.
+
+        Args:
+            state_names: The states the read is fetching
+            fetch: Future resolving to a dict of state name -> value
+        """
+        for name in state_names:
+            self._pending[name] = fetch
+
+        def release(_):
+            for name in state_names:
+                if self._pending.get(name) is fetch:
+                    del self._pending[name]
+
+        fetch.add_done_callback(release)
+
+    def clear(self):
+        """Drop every cached value."""
+        self._entries.clear()
+        self._pending.clear()
@@ -1,39 +1,90 @@
 import asyncio
-import json
 import socket
-import struct
-from typing import Dict, List, Optional, Any, Tuple
-from enum import IntEnum
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, Any
 
+from .cache import StateCache
+from .codec import CODECS, REQUEST, DataType, ensure_capacity, pack_get
+from .discovery import DeviceRegistry
+from .manifest import Manifest
+from .manifest_cache import ManifestCache, ManifestEntry
+from .metrics import ClientMetrics
+from .set_queue import SetQueue
+from .subscriptions import Subscription, SubscriptionScheduler
+from .transport import FrameProtocol
 
-class DataType(IntEnum):
-    """Data types used in the Connect API v2."""
-
-    BOOLEAN = 0
-    INTEGER = 1
-    FLOAT = 2
-    DOUBLE = 3
-    STRING = 4
-    LONG = 5
+# Most queued command frames written at once before waiting for the
+# transport to drain
+COMMAND_CHUNK_FRAMES = 1024
 
 
 class InfiniteFlightClient:
     """Minimal client for discovering and connecting to Infinite Flight sessions."""
 
-    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        device: Optional[Dict[str, Any]] = None,
+        manifest_cache_dir: Optional[str] = None,
+        set_flush_interval: float = 0.005,
+        auto_reconnect: bool = False,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+    ):
         """Initialize the client.
 
         Args:
             host: IP address of Infinite Flight device.
             port: TCP port for connection (default: 10112 for API v2).
+            device: Discovery record of the device. Its ``deviceId``,
+                ``version`` and ``aircraft`` key the on-disk manifest cache.
+            manifest_cache_dir: Directory for cached manifests (disabled if None).
+            set_flush_interval: Seconds sets are held to coalesce them into
+                one write.
+            auto_reconnect: Reconnect by itself when the connection drops.
+            reconnect_delay: Seconds before the second reconnect attempt
+                (the first is immediate); doubled after every failure.
+            max_reconnect_delay: Upper bound of the reconnect delay.
         """
         self.host = host
         self.port = port or 10112  # Default to API v2 port
-        self._socket: Optional[socket.socket] = None
+        # Copied, since the aircraft is updated when the sim switches it
+        self.device = dict(device or {})
+        self._manifest_cache = (
+            ManifestCache(manifest_cache_dir) if manifest_cache_dir else None
+        )
+        self.timeout = 5.0  # Seconds to wait for a state reply
+        self._transport: Optional[asyncio.Transport] = None
+        # Matches replies to requests, so concurrent callers share the socket
+        self._protocol: Optional[FrameProtocol] = None
         self._connected = False
+        # Set once the manifest is loaded and checked against the sim
+        self._ready = False
         self.last_error: Optional[str] = None
-        self._manifest: Dict[int, Tuple[str, DataType]] = {}  # id -> (name, type)
-        self._state_map: Dict[str, int] = {}  # name -> id
+        self._manifest = Manifest()
+        self._send_buffer = bytearray(64)  # Scratch space to pack request frames
+        self._cache = StateCache()
+        self._scheduler = SubscriptionScheduler(self)
+        self._sets = SetQueue(self._write_sets, set_flush_interval)
+        # Request counters and latency histograms, kept across reconnects
+        self.metrics = ClientMetrics()
+        # Commands queued and not yet written, as (frame, times to send it)
+        self._commands: Deque[Tuple[bytes, int]] = deque()
+        self._command_writer: Optional[asyncio.Task] = None
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.reconnects = 0  # Successful automatic reconnects
+        # Called with the error when the connection drops unexpectedly, and
+        # with no arguments once it is back (either may be a coroutine)
+        self.on_connection_lost: Optional[Callable[[Exception], Any]] = None
+        self.on_reconnected: Optional[Callable[[], Any]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._established = False  # Connected until disconnect() is called
+        # Aircraft the manifest was loaded for, read back to validate it
+        self._aircraft_name: Optional[str] = None
 
     async def discover_devices(self, timeout: float = 5.0) -> List[Dict[str, Any]]:
         """Listen for Infinite Flight UDP broadcasts on port 15000.
@@ -54,75 +105,13 @@ class InfiniteFlightClient:
         Returns:
             List of discovered devices with their connection info
         """
-        devices = []
-
-        # Create UDP socket for listening to broadcasts
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.bind(("", 15000))
-        sock.settimeout(timeout)
-
-        start_time = asyncio.get_event_loop().time()
-
-        while True:
-            try:
-                data, addr = sock.recvfrom(4096)
-
-                # Parse JSON data
-                device_info = json.loads(data.decode("utf-8"))
-                device_info["address"] = addr[0]
-
-                # Extract preferred IP if available
-                # Filter out localhost and IPv6 addresses to find the best IP
-                if "addresses" in device_info and device_info["addresses"]:
-                    valid_ips = []
-                    source_ip = addr[0]  # The IP that sent the broadcast
-
-                    for ip in device_info["addresses"]:
-                        # Skip localhost, IPv6, and link-local addresses
-                        if (
-                            not ip.startswith("127.")
-                            and not ":" in ip
-                            and not ip.startswith("169.254.")
-                        ):
-                            valid_ips.append(ip)
-
-                    # Prefer IPs in the same subnet as the source
-                    # The source IP is likely the correct one to use
-                    if source_ip in valid_ips:
-                        device_info["preferred_ip"] = source_ip
-                    elif valid_ips:
-                        # Try to find an IP in the same subnet
-                        source_prefix = ".".join(source_ip.split(".")[:3])
-                        for ip in valid_ips:
-                            if ip.startswith(source_prefix):
-                                device_info["preferred_ip"] = ip
-                                break
-                        else:
-                            # Just use the first valid IP
-                            device_info["preferred_ip"] = valid_ips[0]
-                    else:
-                        device_info["preferred_ip"] = addr[0]
-                else:
-                    device_info["preferred_ip"] = addr[0]
-
-                # Avoid duplicates
-                if not any(
-                    d.get("deviceId") == device_info.get("deviceId") for d in devices
-                ):
-                    devices.append(device_info)
-
-            except socket.timeout:
-                break
-            except Exception:
-                # Ignore parse errors
-                pass
-
-            # Check if we've exceeded timeout
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                break
-
-        sock.close()
+        registry = DeviceRegistry()
+        await registry.start()
+        try:
+            await asyncio.sleep(timeout)
+        finally:
+            devices = registry.devices
+            await registry.stop()
         return devices
 
     async def connect(self) -> bool:
@@ -135,56 +124,182 @@ class InfiniteFlightClient:
             raise ValueError("Host and port must be set before connecting")
 
         try:
-            # Create TCP socket
-            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._socket.settimeout(5.0)
-
-            # Connect
-            self._socket.connect((self.host, self.port))
-            self._connected = True
+            await self._open_transport()
 
-            # Get manifest after connecting
-            await self.get_manifest()
+            # Get manifest after connecting, reusing a cached copy if valid
+            await self._load_manifest()
 
+            self._ready = True
+            self._established = True
             return True
 
-        except socket.timeout:
-            self._connected = False
-            if self._socket:
-                self._socket.close()
-                self._socket = None
+        except asyncio.TimeoutError:
+            self._close_transport()
             self.last_error = "Connection timed out"
             return False
         except ConnectionRefusedError:
-            self._connected = False
-            if self._socket:
-                self._socket.close()
-                self._socket = None
+            self._close_transport()
             self.last_error = "Connection refused - Check if Connect API is enabled"
             return False
         except Exception as e:
-            self._connected = False
-            if self._socket:
-                self._socket.close()
-                self._socket = None
+            self._close_transport()
             self.last_error = str(e)
             return False
 
     async def disconnect(self):
         """Disconnect from Infinite Flight."""
-        if self._socket:
-            self._socket.close()
-            self._socket = None
+        self._established = False
+        task, self._reconnect_task = self._reconnect_task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._scheduler.stop()
+        self._close_transport()
+        self._manifest = Manifest()
+        self._aircraft_name = None
+        self._cache.clear()
+
+    async def _open_transport(self):
+        """Open the TCP connection (the manifest is left as it is)."""
+        # Open a non-blocking connection on the running event loop
+        loop = asyncio.get_running_loop()
+        self._transport, self._protocol = await asyncio.wait_for(
+            loop.create_connection(
+                lambda: FrameProtocol(
+                    self._decode_frame,
+                    on_lost=self._on_connection_lost,
+                    metrics=self.metrics,
+                ),
+                self.host,
+                self.port,
+            ),
+            timeout=5.0,
+        )
+        self._connected = True
+
+        # Sets and polls are batched here, so let every write go out
+        # at once instead of waiting on Nagle's algorithm
+        sock = self._transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _close_transport(self):
+        """Close the underlying connection, if any."""
         self._connected = False
-        self._manifest.clear()
-        self._state_map.clear()
+        self._ready = False
+        self._sets.clear(RuntimeError("Connection closed before the set was sent"))
+        if self._command_writer:
+            self._command_writer.cancel()
+            self._command_writer = None
+        self._commands.clear()
+        transport = self._transport
+        self._transport = None
+        self._protocol = None
+        if transport:
+            transport.close()
+
+    def _on_connection_lost(self, exc: Optional[Exception]):
+        """Protocol callback for a connection that went away."""
+        if not self._connected:
+            return  # Closed on purpose
+
+        error = exc or ConnectionError("Connection closed by Infinite Flight")
+        self._close_transport()
+        self._cache.clear()
+        self.last_error = f"Connection lost: {error}"
+        self.metrics.errors["connection_lost"] += 1
+        self._notify(self.on_connection_lost, error)
+
+        # A connect() still in progress reports its own failure instead
+        if self.auto_reconnect and self._established and not self._reconnect_task:
+            self._reconnect_task = asyncio.get_running_loop().create_task(
+                self._reconnect()
+            )
+
+    async def _reconnect(self):
+        """Reconnect with exponential backoff until it works.
+
+        The parsed manifest is kept if it still reads back the aircraft it
+        was loaded for, so a dropped link costs one round trip rather than a
+        manifest reload. Subscriptions are kept too and resume polling as
+        soon as the connection is back. The client only reports itself
+        connected again once the manifest has been checked (or reloaded).
+        """
+        delay = self.reconnect_delay
+        try:
+            while True:
+                try:
+                    await self._open_transport()
+                    if not await self._manifest_still_valid():
+                        await self._load_manifest()
+                    self._ready = True
+                    break
+                except Exception as e:
+                    self._close_transport()
+                    self.last_error = f"Reconnect failed: {e}"
+                    self.metrics.errors["reconnect_failed"] += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            self._reconnect_task = None
+
+        self.last_error = None
+        self.reconnects += 1
+        self._scheduler.wake()
+        self._notify(self.on_reconnected)
+
+    async def _manifest_still_valid(self) -> bool:
+        """Whether the loaded manifest still matches the sim."""
+        if not len(self._manifest) or self._aircraft_name is None:
+            return False
+        try:
+            return await self._read_state("aircraft/0/name") == self._aircraft_name
+        except Exception:
+            return False
+
+    async def _load_manifest(self):
+        """Load the manifest, from the disk cache if it is still valid."""
+        if await self._load_cached_manifest():
+            await self._remember_aircraft()
+        else:
+            await self._fetch_manifest()
+
+    async def _remember_aircraft(self):
+        """Read the aircraft name the manifest belongs to."""
+        self._aircraft_name = None
+        if "aircraft/0/name" in self._manifest:
+            try:
+                self._aircraft_name = await self._read_state("aircraft/0/name")
+            except Exception:
+                pass  # Without it the manifest is reloaded on reconnect
+
+    @staticmethod
+    def _notify(callback: Optional[Callable], *args):
+        """Call a connection callback, scheduling it if it is a coroutine."""
+        if callback is None:
+            return
+        result = callback(*args)
+        if asyncio.iscoroutine(result):
+            asyncio.get_running_loop().create_task(result)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Counters and latency summaries (see ``ClientMetrics.snapshot``)."""
+        return self.metrics.snapshot(self._manifest.name_of_id)
 
     @property
     def is_connected(self) -> bool:
-        """Check if connected to Infinite Flight."""
-        return self._connected
+        """Check if connected to Infinite Flight with a valid manifest."""
+        return self._connected and self._ready
+
+    @property
+    def reconnecting(self) -> bool:
+        """Whether a dropped connection is being re-established."""
+        return self._reconnect_task is not None
 
-    def _send_request(
+    async def _send_request(
         self, state_id: int, is_set: bool = False, value: Optional[Any] = None
     ):
         """Send a request to the API.
@@ -194,72 +309,107 @@ class InfiniteFlightClient:
             is_set: Whether this is a set request (True) or get request (False)
             value: The value to set (only used if is_set is True)
         """
-        if not self._connected or not self._socket:
+        if not self._connected or not self._protocol:
             raise RuntimeError("Not connected to Infinite Flight")
 
-        # Pack the state ID as little-endian 32-bit integer
-        data = struct.pack("<i", state_id)
-
-        # Add the boolean flag
-        data += struct.pack("?", is_set)
-
-        # If setting a value, add it (not implemented in this minimal version)
         if is_set and value is not None:
-            # Determine data type from manifest
-            if state_id not in self._manifest:
+            # The codec for this state was resolved once at manifest load
+            codec = self._manifest.codec_of_id(state_id)
+            if codec is None:
                 raise ValueError(
                     f"State ID {state_id} not found in manifest. Cannot determine type for setting."
                 )
+            end = codec.pack_set(self._send_buffer, 0, state_id, value)
+        else:
+            ensure_capacity(self._send_buffer, REQUEST.size)
+            REQUEST.pack_into(self._send_buffer, 0, state_id, is_set)
+            end = REQUEST.size
 
-            _, state_type = self._manifest[state_id]
-
-            if state_type == DataType.BOOLEAN:
-                data += struct.pack("?", bool(value))
-            elif state_type == DataType.INTEGER:
-                data += struct.pack("<i", int(value))
-            elif state_type == DataType.FLOAT:
-                data += struct.pack("<f", float(value))
-            elif state_type == DataType.DOUBLE:
-                data += struct.pack("<d", float(value))
-            elif state_type == DataType.STRING:
-                str_value = str(value).encode("utf-8")
-                data += struct.pack("<i", len(str_value))  # Length of string
-                data += str_value  # String data
-            elif state_type == DataType.LONG:
-                data += struct.pack("<q", int(value))
-            else:
-                raise NotImplementedError(
-                    f"Setting values for data type {state_type} is not implemented"
-                )
+        # Send a copy: the transport may hold on to what it is given until
+        # the socket accepts it, while the buffer is reused by the next call
+        self._protocol.write(bytes(self._send_buffer[:end]))
+        await self._protocol.drain()
 
-        # Send the request
-        self._socket.send(data)
+    def _send_gets(
+        self, state_ids: List[int], timeout: Optional[float] = None
+    ) -> List[asyncio.Future]:
+        """Write get requests in one send.
 
-    def _receive_data(self, expected_length: int) -> bytes:
-        """Receive a specific amount of data from the socket.
+        The whole batch is packed first, then each reply future is
+        registered and the batch written, with nothing awaited in between,
+        so concurrent callers interleave whole batches rather than bytes.
 
         Args:
-            expected_length: Number of bytes to receive
+            state_ids: The numeric IDs of the states to read
+            timeout: Seconds the replies will be waited for
+                (default: ``self.timeout``)
 
         Returns:
-            The received data
+            One future per ID, resolved with its decoded reply
         """
-        data = b""
-        # Temporarily increase timeout for large data transfers
-        old_timeout = self._socket.gettimeout()
-        self._socket.settimeout(30.0)  # 30 seconds for manifest
+        if not self._connected or not self._protocol:
+            raise RuntimeError("Not connected to Infinite Flight")
+
+        end = 0
+        for state_id in state_ids:
+            end = pack_get(self._send_buffer, end, state_id)
+        frames = bytes(self._send_buffer[:end])
 
+        protocol = self._protocol
+        futures = []
         try:
-            while len(data) < expected_length:
-                chunk = self._socket.recv(expected_length - len(data))
-                if not chunk:
-                    raise RuntimeError("Connection closed while reading data")
-                data += chunk
-        finally:
-            # Restore original timeout
-            self._socket.settimeout(old_timeout)
+            for state_id in state_ids:
+                futures.append(protocol.expect(state_id, timeout or self.timeout))
+            protocol.write(frames)
+        except BaseException:
+            # Nothing was sent, so no reply may be waited for
+            for state_id, future in zip(state_ids, futures):
+                protocol.withdraw(state_id, future)
+            raise
+        return futures
+
+    async def _wait_replies(
+        self, futures: List[asyncio.Future], timeout: Optional[float] = None
+    ) -> List[Any]:
+        """Wait for the replies to requests sent with ``_send_gets``.
+
+        Args:
+            futures: The reply futures
+            timeout: Seconds to wait for each reply (default: ``self.timeout``)
+
+        Returns:
+            The decoded values, in request order
+        """
+        await self._protocol.drain()
 
-        return data
+        timeout = timeout or self.timeout
+        values = []
+        try:
+            for future in futures:
+                if future.done():
+                    values.append(future.result())
+                else:
+                    values.append(await asyncio.wait_for(future, timeout=timeout))
+        except asyncio.TimeoutError:
+            self.metrics.errors["timeout"] += 1
+            raise
+        finally:
+            # Abandoned requests keep their queue slots for a while so that
+            # late replies are still matched; cancelling drops their values
+            for future in futures:
+                future.cancel()
+        return values
+
+    def _decode_frame(self, state_id: int, payload: memoryview) -> Any:
+        """Decode a reply payload in place, as it arrives."""
+        if state_id == -1:
+            # The manifest is a single string
+            return CODECS[DataType.STRING].decode(payload)
+
+        codec = self._manifest.codec_of_id(state_id)
+        if codec is None:
+            return bytes(payload)
+        return codec.decode(payload)
 
     async def get_manifest(self) -> Dict[str, Any]:
         """Get the manifest from Infinite Flight.
@@ -267,31 +417,19 @@ class InfiniteFlightClient:
         Returns:
             Dictionary mapping state names to their info
         """
-        if not self._connected:
+        if not self.is_connected:
             raise RuntimeError("Not connected to Infinite Flight")
+        return await self._fetch_manifest()
 
-        # Send manifest request (-1)
-        self._send_request(-1, False)
-
-        # Receive response header
-        header = self._receive_data(
-            12
-        )  # 4 bytes ID + 4 bytes total length + 4 bytes string length
-
-        # Parse header
-        response_id, total_length, string_length = struct.unpack("<iii", header)
-
-        if response_id != -1:
-            raise RuntimeError(f"Unexpected response ID: {response_id}")
-
-        # Receive the manifest string
-        manifest_data = self._receive_data(string_length)
-        manifest_str = manifest_data.decode("utf-8")
+    async def _fetch_manifest(self) -> Dict[str, Any]:
+        """Download and apply the manifest (see ``get_manifest``)."""
+        # Request the manifest (-1); allow 30 seconds for large manifests
+        started = time.monotonic()
+        futures = self._send_gets([-1], timeout=30.0)
+        (manifest_str,) = await self._wait_replies(futures, timeout=30.0)
 
         # Parse manifest
-        self._manifest.clear()
-        self._state_map.clear()
-
+        entries: List[ManifestEntry] = []
         for line in manifest_str.strip().split("\n"):
             if not line:
                 continue
@@ -301,24 +439,79 @@ class InfiniteFlightClient:
                 continue
 
             try:
-                state_id = int(parts[0])
-                data_type = int(parts[1])
-                name = parts[2]
-
-                # Skip commands (they have data_type = -1)
-                if data_type == -1:
-                    continue
-
-                self._manifest[state_id] = (name, DataType(data_type))
-                self._state_map[name] = state_id
-            except (ValueError, KeyError):
+                entries.append((int(parts[0]), int(parts[1]), parts[2]))
+            except ValueError:
                 continue
 
+        self._apply_manifest(entries)
+        self.metrics.observe("manifest", time.monotonic() - started)
+
+        # Cache it under the aircraft it was loaded for, which after a
+        # reconnect need not be the one discovery advertised
+        await self._remember_aircraft()
+        if self._aircraft_name is not None:
+            self.device["aircraft"] = self._aircraft_name
+        known = (
+            self._aircraft_name is not None or "aircraft/0/name" not in self._manifest
+        )
+        key = self._manifest_key()
+        if key and known:
+            try:
+                self._manifest_cache.save(key, entries)
+            except OSError:
+                pass  # The cache is an optimization; never fail a connect on it
+
         return {
             name: {"id": state_id, "type": data_type.name}
-            for state_id, (name, data_type) in self._manifest.items()
+            for name, state_id, data_type in self._manifest.items()
         }
 
+    def _apply_manifest(self, entries: List[ManifestEntry]):
+        """Replace the state index with a parsed manifest."""
+        self._manifest = Manifest(entries)
+
+    def _manifest_key(self) -> Optional[str]:
+        """Cache key for this device's manifest, if caching is possible."""
+        if not self._manifest_cache:
+            return None
+
+        device_id = self.device.get("deviceId")
+        version = self.device.get("version")
+        if not device_id or not version:
+            return None
+
+        return ManifestCache.make_key(
+            device_id, version, self.device.get("aircraft", "")
+        )
+
+    async def _load_cached_manifest(self) -> bool:
+        """Load the manifest from the disk cache and check it against the sim.
+
+        Returns:
+            True if a valid cached manifest was loaded
+        """
+        key = self._manifest_key()
+        entries = self._manifest_cache.load(key) if key else None
+        if not entries:
+            return False
+
+        self._apply_manifest(entries)
+
+        # Cheap validation: one read of the aircraft name through the cached
+        # state ID must come back as the aircraft discovery advertised
+        aircraft = self.device.get("aircraft")
+        if aircraft and "aircraft/0/name" in self._manifest:
+            try:
+                valid = await self._read_state("aircraft/0/name") == aircraft
+            except Exception:
+                valid = False
+
+            if not valid:
+                self._apply_manifest([])
+                return False
+
+        return True
+
     async def get_state(self, state_name: str) -> Any:
         """Get a state value from Infinite Flight.
 
@@ -328,47 +521,148 @@ class InfiniteFlightClient:
         Returns:
             The state value
         """
-        if not self._connected:
+        if not self.is_connected:
             raise RuntimeError("Not connected to Infinite Flight")
+        return await self._read_state(state_name)
 
-        if state_name not in self._state_map:
+    async def _read_state(self, state_name: str) -> Any:
+        """Read one state, also while the connection is being set up."""
+        if state_name not in self._manifest:
             raise ValueError(f"Unknown state: {state_name}")
 
-        state_id = self._state_map[state_name]
-        state_type = self._manifest[state_id][1]
+        state_id = self._manifest.id_of(state_name)
 
-        # Send get request
-        self._send_request(state_id, False)
+        # The reply is decoded as it comes off the wire
+        started = time.monotonic()
+        (value,) = await self._wait_replies(self._send_gets([state_id]))
+        self.metrics.observe("get_state", time.monotonic() - started)
 
-        # Receive response header (8 bytes: 4 for ID, 4 for data length)
-        header = self._receive_data(8)
-        response_id, data_length = struct.unpack("<ii", header)
+        self._cache.store({state_name: value})
+        return value
 
-        if response_id != state_id:
-            raise RuntimeError(
-                f"Unexpected response ID: {response_id}, expected {state_id}"
-            )
+    async def get_states(self, state_names: List[str]) -> Dict[str, Any]:
+        """Get several state values in a single pipelined round trip.
 
-        # Receive the actual data
-        data = self._receive_data(data_length)
-
-        # Parse based on data type
-        if state_type == DataType.BOOLEAN:
-            return struct.unpack("?", data)[0]
-        elif state_type == DataType.INTEGER:
-            return struct.unpack("<i", data)[0]
-        elif state_type == DataType.FLOAT:
-            return struct.unpack("<f", data)[0]
-        elif state_type == DataType.DOUBLE:
-            return struct.unpack("<d", data)[0]
-        elif state_type == DataType.STRING:
-            # String format: 4 bytes length + string data
-            str_length = struct.unpack("<i", data[:4])[0]
-            return data[4 : 4 + str_length].decode("utf-8")
-        elif state_type == DataType.LONG:
-            return struct.unpack("<q", data)[0]
-        else:
-            raise ValueError(f"Unknown data type: {state_type}")
+        All get requests are written in one send, and each reply is matched
+        back to its request by response ID.
+
+        Args:
+            state_names: The names of the states to read
+
+        Returns:
+            Dictionary mapping each requested state name to its value
+        """
+        if not self.is_connected:
+            raise RuntimeError("Not connected to Infinite Flight")
+
+        # Resolve names up front so a typo fails before anything is sent
+        names = list(dict.fromkeys(state_names))
+        for state_name in names:
+            if state_name not in self._manifest:
+                raise ValueError(f"Unknown state: {state_name}")
+
+        if not names:
+            return {}
+
+        started = time.monotonic()
+        futures = self._send_gets([self._manifest.id_of(name) for name in names])
+        results = dict(zip(names, await self._wait_replies(futures)))
+        self.metrics.observe("get_states", time.monotonic() - started)
+
+        self._cache.store(results)
+        return results
+
+    async def get_cached_states(
+        self, state_names: List[str], max_age: float = 1.0
+    ) -> Dict[str, Any]:
+        """Get state values, reusing recent reads where possible.
+
+        Values read within ``max_age`` seconds (by any caller or
+        subscription) are served from the cache. Misses are fetched in one
+        batch, and misses already being fetched by another caller are
+        awaited instead of requested again.
+
+        Args:
+            state_names: The names of the states to read
+            max_age: Oldest acceptable cached value, in seconds
+
+        Returns:
+            Dictionary mapping each requested state name to its value
+        """
+        if not self.is_connected:
+            raise RuntimeError("Not connected to Infinite Flight")
+
+        for state_name in state_names:
+            if state_name not in self._manifest:
+                raise ValueError(f"Unknown state: {state_name}")
+
+        values, misses = self._cache.lookup(state_names, max_age)
+
+        fetches: Dict[asyncio.Future, List[str]] = {}
+        to_read = []
+        for state_name in misses:
+            fetch = self._cache.inflight(state_name)
+            if fetch:
+                fetches.setdefault(fetch, []).append(state_name)
+            else:
+                to_read.append(state_name)
+
+        if to_read:
+            fetch = asyncio.ensure_future(self.get_states(to_read))
+            self._cache.track(to_read, fetch)
+            fetches[fetch] = to_read
+
+        if fetches:
+            # Shielded: other callers may be awaiting the same fetches, and
+            # cancelling this call must not cancel them
+            results = await asyncio.gather(*map(asyncio.shield, fetches))
+            for fetched, names in zip(results, fetches.values()):
+                values.update((n, fetched[n]) for n in names if n in fetched)
+
+        return {n: values[n] for n in state_names if n in values}
+
+    async def iter_cached_states(
+        self, state_names: List[str], max_age: float = 1.0, chunk_size: int = 50
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Get state values in chunks, as their replies arrive.
+
+        Every chunk is requested up front, so all reads are pipelined, and
+        chunks are yielded in order as soon as each one is complete. Cached
+        values are reused as in ``get_cached_states``. A chunk whose read
+        fails (e.g. a reply timed out) is yielded with None for each of its
+        states, so one bad read does not lose the others.
+
+        Args:
+            state_names: The names of the states to read
+            max_age: Oldest acceptable cached value, in seconds
+            chunk_size: Number of states per chunk
+
+        Yields:
+            Dicts of state name -> value, one per chunk of ``state_names``
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"Chunk size must be positive, got {chunk_size}")
+
+        chunks = [
+            state_names[i : i + chunk_size]
+            for i in range(0, len(state_names), chunk_size)
+        ]
+        fetches = [
+            asyncio.ensure_future(self.get_cached_states(chunk, max_age))
+            for chunk in chunks
+        ]
+        try:
+            for fetch, chunk in zip(fetches, chunks):
+                try:
+                    values = await fetch
+                except Exception:
+                    values = dict.fromkeys(chunk)
+                yield values
+        finally:
+            # A consumer that stops early leaves no orphaned fetches behind
+            for fetch in fetches:
+                if not fetch.cancel() and not fetch.cancelled():
+                    fetch.exception()  # Mark a failure as retrieved
 
     def get_available_states(self) -> List[str]:
         """Get a list of all available state names.
@@ -376,11 +670,124 @@ class InfiniteFlightClient:
         Returns:
             List of state names
         """
-        return sorted(self._state_map.keys())
+        return list(self._manifest.names)
+
+    def get_states_with_prefix(self, prefix: str) -> List[str]:
+        """Get the names of all states below a path prefix.
+
+        Args:
+            prefix: Path prefix without trailing slash (e.g., "aircraft/0/systems")
+
+        Returns:
+            Sorted list of state names
+        """
+        return list(self._manifest.with_prefix(prefix))
+
+    def has_state(self, state_name: str) -> bool:
+        """Check whether the connected aircraft exposes a state."""
+        return state_name in self._manifest
+
+    def get_state_type(self, state_name: str) -> Optional[DataType]:
+        """Get the data type of a state, or None if it is unknown."""
+        return self._manifest.type_of(state_name)
+
+    def get_available_commands(self) -> List[str]:
+        """Get a sorted list of all available command names."""
+        return self._manifest.commands
+
+    def has_command(self, command_name: str) -> bool:
+        """Check whether the connected aircraft offers a command."""
+        return self._manifest.has_command(command_name)
+
+    def _command_id(self, command_name: str) -> int:
+        """Look up a command's ID, checking the connection first."""
+        if not self.is_connected:
+            raise RuntimeError("Not connected to Infinite Flight")
+        if not self._manifest.has_command(command_name):
+            raise ValueError(f"Unknown command: {command_name}")
+        return self._manifest.command_id(command_name)
+
+    async def run_command(self, command_name: str):
+        """Run an Infinite Flight command (e.g. "commands/FlapsDown").
+
+        Commands queued with ``queue_command`` are sent first, so the order
+        of all commands is kept. Returns once the command has been written;
+        the API does not reply to commands.
+
+        Args:
+            command_name: The name of the command
+
+        Raises:
+            RuntimeError: If not connected
+            ValueError: If the command is unknown
+        """
+        command_id = self._command_id(command_name)
+        if self._command_writer:
+            # Waited on, not awaited: cancelling this call leaves them queued
+            await asyncio.wait([self._command_writer])
+        await self._send_request(command_id)
+        self.metrics.commands += 1
+
+    def queue_command(self, command_name: str, repeat: int = 1):
+        """Queue a command without waiting for it to be sent.
+
+        Every command queued during one event loop iteration goes out in a
+        single write right after it, so sequences such as trim or
+        autopilot increments can be sent at a high rate. Long sequences are
+        written ``COMMAND_CHUNK_FRAMES`` at a time, waiting for the
+        transport to drain in between. Write errors are recorded in
+        ``last_error``.
+
+        Args:
+            command_name: The name of the command
+            repeat: How many times to run it
+
+        Raises:
+            RuntimeError: If not connected
+            ValueError: If the command is unknown or ``repeat`` is below 1
+        """
+        if repeat < 1:
+            raise ValueError(f"repeat must be at least 1, got {repeat}")
+        command_id = self._command_id(command_name)
+        self._commands.append((REQUEST.pack(command_id, False), repeat))
+        self.metrics.commands += repeat
+
+        if self._command_writer is None:
+            self._command_writer = asyncio.get_running_loop().create_task(
+                self._write_commands()
+            )
+
+    async def _write_commands(self):
+        """Write the queued commands in chunks (the command queue's writer)."""
+        try:
+            while self._commands and self._protocol:
+                chunk = bytearray()
+                frames = 0
+                while self._commands and frames < COMMAND_CHUNK_FRAMES:
+                    frame, count = self._commands[0]
+                    taken = min(count, COMMAND_CHUNK_FRAMES - frames)
+                    chunk += frame * taken
+                    frames += taken
+                    if taken == count:
+                        self._commands.popleft()
+                    else:
+                        self._commands[0] = (frame, count - taken)
+
+                self._protocol.write(bytes(chunk))
+                await self._protocol.drain()
+        except RuntimeError as e:
+            self.last_error = str(e)
+        finally:
+            if self._command_writer is asyncio.current_task():
+                self._command_writer = None
 
     async def set_state(self, state_name: str, value: Any):
         """Set a state value in Infinite Flight.
 
+        Sets are held for up to ``set_flush_interval`` seconds and written
+        together; a newer value for the same state replaces a pending one.
+        Returns once the set has been written.
+
         Args:
             state_name: The name of the state (e.g., "aircraft/0/systems/flaps/state")
             value: The value to set for the state
@@ -389,18 +796,115 @@ class InfiniteFlightClient:
             RuntimeError: If not connected
             ValueError: If state_name is unknown or data type is unsupported for setting
         """
-        if not self._connected:
+        if not self.is_connected:
             raise RuntimeError("Not connected to Infinite Flight")
 
-        if state_name not in self._state_map:
+        if state_name not in self._manifest:
             raise ValueError(f"Unknown state: {state_name}")
 
-        state_id = self._state_map[state_name]
-        # The _send_request method will use self._manifest[state_id][1] to get the type
+        state_id = self._manifest.id_of(state_name)
+        codec = self._manifest.codec_of_id(state_id)
+        # Pack now, so a bad value fails this call rather than the batch
+        end = codec.pack_set(self._send_buffer, 0, state_id, value)
+
+        # As per docs, API does not send a confirmation for SetState, so
+        # this only waits for the write
+        self.metrics.sets += 1
+        started = time.monotonic()
+        await asyncio.shield(self._sets.put(state_id, bytes(self._send_buffer[:end])))
+        self.metrics.observe("set_state", time.monotonic() - started)
+
+    async def flush_sets(self):
+        """Write pending sets now instead of at the end of the flush window."""
+        await self._sets.flush()
+
+    async def _write_sets(self, frames: bytes):
+        """Write a batch of set frames (the set queue's writer)."""
+        if not self._connected or not self._protocol:
+            raise RuntimeError("Not connected to Infinite Flight")
+        self._protocol.write(frames)
+        await self._protocol.drain()
+
+    async def subscribe(
+        self,
+        state_names: List[str],
+        rate: float,
+        callback: Callable[[Dict[str, Any]], Any],
+        on_error: Optional[Callable[[Exception], Any]] = None,
+        min_rate: Optional[float] = None,
+    ) -> Subscription:
+        """Poll a group of states at a target rate.
+
+        All subscriptions share one poll task; states that fall due together
+        are fetched in a single pipelined batch.
+
+        Args:
+            state_names: The names of the states to poll
+            rate: Target poll rate in Hz
+            callback: Called with a dict of state name -> value on every poll.
+                Coroutine functions are scheduled as tasks.
+            on_error: Called with the exception when a poll fails
+            min_rate: Makes the subscription adaptive: while its values stay
+                the same, polling backs off towards this rate
+
+        Returns:
+            The subscription, to pass to ``unsubscribe``
+        """
+        if not self.is_connected:
+            raise RuntimeError("Not connected to Infinite Flight")
+
+        subscription = Subscription(state_names, rate, callback, on_error, min_rate)
+        self._scheduler.add(subscription)
+        return subscription
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        """The active subscriptions, with their current ``effective_rate``."""
+        return self._scheduler.subscriptions
+
+    def wake(self, subscriptions: Optional[List[Subscription]] = None):
+        """Poll adaptive subscriptions at their full rate again, starting now.
+
+        Args:
+            subscriptions: The subscriptions to wake (all of them if None)
+        """
+        self._scheduler.wake(subscriptions)
+
+    async def unsubscribe(self, subscription: Subscription):
+        """Stop polling a subscription.
+
+        Args:
+            subscription: A subscription returned by ``subscribe``
+        """
+        self._scheduler.remove(subscription)
+
+    async def stream(
+        self, state_names: List[str], rate: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over polled values of a group of states.
+
+        If the consumer falls behind, only the most recent update is kept.
+
+        Args:
+            state_names: The names of the states to poll
+            rate: Target poll rate in Hz
 
-        # Send set request
-        self._send_request(state_id, True, value)
-        # As per docs, API does not send a confirmation for SetState
+        Yields:
+            Dicts of state name -> value
+        """
+        updates: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        def push(values: Dict[str, Any]):
+            if updates.full():
+                updates.get_nowait()
+            updates.put_nowait(values)
+
+        subscription = await self.subscribe(state_names, rate, push)
+        try:
+            while True:
+                yield await updates.get()
+        finally:
+            await self.unsubscribe(subscription)
 
     async def __aenter__(self):
         """Async context manager entry."""
@@ -0,0 +1,118 @@
+import struct
+from enum import IntEnum
+from typing import Any, Callable, Dict
+
+
+class DataType(IntEnum):
+    """Data types used in the Connect API v2."""
+
+    BOOLEAN = 0
+    INTEGER = 1
+    FLOAT = 2
+    DOUBLE = 3
+    STRING = 4
+    LONG = 5
+
+
+# Request frame: state ID + set flag
+REQUEST = struct.Struct("<i?")
+
+# Reply header: state ID + payload length
+REPLY_HEADER = struct.Struct("<ii")
+
+
+def ensure_capacity(buffer: bytearray, size: int):
+    """Grow a reusable frame buffer to hold at least ``size`` bytes."""
+    if len(buffer) < size:
+        buffer.extend(bytes(size - len(buffer)))
+
+
+def pack_get(buffer: bytearray, offset: int, state_id: int) -> int:
+    """Write a get request frame into ``buffer``.
+
+    Args:
+        buffer: Reusable frame buffer, grown if needed
+        offset: Where to write the frame
+        state_id: The numeric ID of the state/command
+
+    Returns:
+        The offset just past the frame
+    """
+    end = offset + REQUEST.size
+    ensure_capacity(buffer, end)
+    REQUEST.pack_into(buffer, offset, state_id, False)
+    return end
+
+
+class StateCodec:
+    """Precompiled struct layouts for one fixed-size data type."""
+
+    def __init__(self, data_type: DataType, fmt: str, convert: Callable[[Any], Any]):
+        """Initialize the codec.
+
+        Args:
+            data_type: The manifest data type this codec handles
+            fmt: struct format character of the value
+            convert: Coerces a caller-supplied value before packing
+        """
+        self.data_type = data_type
+        self._convert = convert
+        self._value = struct.Struct("<" + fmt)
+        self._set_frame = struct.Struct("<i?" + fmt)
+
+    def decode(self, data) -> Any:
+        """Decode a reply payload (bytes or memoryview)."""
+        return self._value.unpack_from(data)[0]
+
+    def pack_set(
+        self, buffer: bytearray, offset: int, state_id: int, value: Any
+    ) -> int:
+        """Write a set request frame into ``buffer``.
+
+        Args:
+            buffer: Reusable frame buffer, grown if needed
+            offset: Where to write the frame
+            state_id: The numeric ID of the state
+            value: The value to set
+
+        Returns:
+            The offset just past the frame
+        """
+        end = offset + self._set_frame.size
+        ensure_capacity(buffer, end)
+        self._set_frame.pack_into(buffer, offset, state_id, True, self._convert(value))
+        return end
+
+
+class StringCodec(StateCodec):
+    """Length-prefixed UTF-8 strings."""
+
+    def __init__(self):
+        super().__init__(DataType.STRING, "i", str)
+
+    def decode(self, data) -> str:
+        # String format: 4 bytes length + string data
+        (length,) = self._value.unpack_from(data)
+        return str(data[4 : 4 + length], "utf-8")
+
+    def pack_set(
+        self, buffer: bytearray, offset: int, state_id: int, value: Any
+    ) -> int:
+        encoded = str(value).encode("utf-8")
+        start = offset + self._set_frame.size
+        end = start + len(encoded)
+        ensure_capacity(buffer, end)
+        self._set_frame.pack_into(buffer, offset, state_id, True, len(encoded))
+        buffer[start:end] = encoded
+        return end
+
+
+# One shared codec per data type, looked up once per state at manifest load
+CODECS: Dict[DataType, StateCodec] = {
+    DataType.BOOLEAN: StateCodec(DataType.BOOLEAN, "?", bool),
+    DataType.INTEGER: StateCodec(DataType.INTEGER, "i", int),
+    DataType.FLOAT: StateCodec(DataType.FLOAT, "f", float),
+    DataType.DOUBLE: StateCodec(DataType.DOUBLE, "d", float),
+    DataType.STRING: StringCodec(),
+    DataType.LONG: StateCodec(DataType.LONG, "q", int),
+}
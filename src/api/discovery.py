@@ -0,0 +1,192 @@
+import asyncio
+import json
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DISCOVERY_PORT = 15000
+
+
+def parse_broadcast(data: bytes, addr: Tuple[str, int]) -> Optional[Dict[str, Any]]:
+    """Parse an Infinite Flight discovery broadcast.
+
+    Args:
+        data: The datagram payload (a JSON object)
+        addr: The sender's address
+
+    Returns:
+        The device information, with ``address`` and ``preferred_ip`` added,
+        or None if its ``deviceId`` or ``addresses`` have the wrong type
+
+    Raises:
+        ValueError: If the payload is not a JSON object
+    """
+    device_info = json.loads(data.decode("utf-8"))
+    if not isinstance(device_info, dict):
+        raise ValueError("Discovery broadcast is not a JSON object")
+    device_id = device_info.get("deviceId")
+    if device_id is not None and not isinstance(device_id, str):
+        return None
+    addresses = device_info.get("addresses") or []
+    if not isinstance(addresses, list) or not all(
+        isinstance(ip, str) for ip in addresses
+    ):
+        return None
+
+    source_ip = addr[0]  # The IP that sent the broadcast
+    device_info["address"] = source_ip
+    device_info["preferred_ip"] = source_ip
+
+    # Filter out localhost and IPv6 addresses to find the best IP
+    if addresses:
+        valid_ips = [
+            ip
+            for ip in addresses
+            # Skip localhost, IPv6, and link-local addresses
+            if not ip.startswith("127.")
+            and ":" not in ip
+            and not ip.startswith("169.254.")
+        ]
+
+        # The source IP is likely the correct one to use; otherwise prefer
+        # an IP in the same subnet as the source, then the first valid IP
+        if valid_ips and source_ip not in valid_ips:
+            source_prefix = ".".join(source_ip.split(".")[:3])
+            device_info["preferred_ip"] = next(
+                (ip for ip in valid_ips if ip.startswith(source_prefix)),
+                valid_ips[0],
+            )
+
+    return device_info
+
+
+class DeviceRegistry(asyncio.DatagramProtocol):
+    """Live registry of the Infinite Flight devices broadcasting on the network.
+
+    Listens on the discovery port for as long as it runs, keeping the
+    latest broadcast of each device keyed by its ``deviceId``. A device is
+    reported through ``on_found`` as soon as its first broadcast (or one
+    with changed details) arrives, and through ``on_lost`` once it has
+    been silent for ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 10.0,
+        on_found: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        on_lost: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
+        """Initialize the registry.
+
+        Args:
+            ttl: Seconds without a broadcast before a device is dropped
+            on_found: Called with the device info of new or changed devices
+            on_lost: Called with the last device info of expired devices
+        """
+        self.ttl = ttl
+        self.on_found = on_found
+        self.on_lost = on_lost
+        self._devices: Dict[str, Dict[str, Any]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._expiry_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the listener is bound and receiving."""
+        return self._transport is not None
+
+    @property
+    def devices(self) -> List[Dict[str, Any]]:
+        """The devices currently on the network, in discovery order."""
+        return list(self._devices.values())
+
+    async def start(self, port: int = DISCOVERY_PORT):
+        """Bind the discovery port and start listening.
+
+        Args:
+            port: UDP port Infinite Flight broadcasts on
+        """
+        if self._expiry_task:
+            return  # Already listening (or starting)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("", port))
+        except OSError:
+            sock.close()
+            raise
+
+        loop = asyncio.get_running_loop()
+        self._expiry_task = loop.create_task(self._expire())
+        try:
+            await loop.create_datagram_endpoint(lambda: self, sock=sock)
+        except Exception:
+            sock.close()
+            await self.stop()
+            raise
+
+    async def stop(self):
+        """Stop listening and forget every device."""
+        task = self._expiry_task
+        self._expiry_task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        self._devices.clear()
+        self._last_seen.clear()
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self._transport = transport
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self._transport = None
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        try:
+            device_info = parse_broadcast(data, addr)
+        except (ValueError, TypeError, AttributeError):
+            return  # Ignore stray or malformed datagrams
+        if device_info is None:
+            return
+
+        device_id = (
+            device_info.get("deviceId") or f"{addr[0]}:{device_info.get('port')}"
+        )
+        self._last_seen[device_id] = time.monotonic()
+
+        if self._devices.get(device_id) != device_info:
+            # New device, or its state/aircraft/livery changed
+            self._devices[device_id] = device_info
+            self._notify(self.on_found, device_info)
+
+    async def _expire(self):
+        """Drop devices whose broadcasts have stopped."""
+        while True:
+            await asyncio.sleep(self.ttl / 4)
+            deadline = time.monotonic() - self.ttl
+            for device_id in [
+                d for d, seen in self._last_seen.items() if seen < deadline
+            ]:
+                del self._last_seen[device_id]
+                self._notify(self.on_lost, self._devices.pop(device_id))
+
+    @staticmethod
+    def _notify(callback: Optional[Callable], device_info: Dict[str, Any]):
+        """Run a registry callback without letting it stop the listener."""
+        if callback is None:
+            return
+        try:
+            result = callback(device_info)
+            if asyncio.iscoroutine(result):
+                asyncio.get_running_loop().create_task(result)
+        except Exception:
+            pass
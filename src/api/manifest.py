@@ -0,0 +1,120 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .codec import CODECS, DataType, StateCodec
+from .manifest_cache import ManifestEntry
+
+# Codec per data type value, indexed directly by the packed type column
+_CODEC_TABLE: Tuple[StateCodec, ...] = tuple(CODECS[t] for t in sorted(DataType))
+
+
+class Manifest:
+    """Compact, read-only index of the states a device exposes.
+
+    Rows are kept in name order: interned names in a list, IDs and data
+    types in parallel ``array`` columns. Because sorted names sharing a
+    path prefix are contiguous, every path prefix (``aircraft``,
+    ``aircraft/0``, ``aircraft/0/systems`` ...) maps to a single row range,
+    so listing a category costs O(k) for k matching states.
+
+    Commands (data type -1) have no value to read, so they are kept apart
+    in their own name -> ID index.
+    """
+
+    def __init__(self, entries: Iterable[ManifestEntry] = ()):
+        """Build the index.
+
+        Args:
+            entries: (state id, data type, name) tuples. Commands (data
+                type -1) go to the command index; unknown data types are
+                left out.
+        """
+        states: Dict[str, Tuple[int, int]] = {}
+        self._commands: Dict[str, int] = {}
+        for state_id, data_type, name in entries:
+            if state_id < 0:
+                continue
+            if 0 <= data_type < len(_CODEC_TABLE):
+                states[name] = (state_id, data_type)
+            elif data_type == -1:
+                self._commands[sys.intern(name)] = state_id
+
+        self._names: List[str] = [sys.intern(name) for name in sorted(states)]
+        self._ids = array("i", (states[name][0] for name in self._names))
+        self._types = array("b", (states[name][1] for name in self._names))
+        self._rows: Dict[str, int] = {name: row for row, name in enumerate(self._names)}
+
+        # Dense ID -> row lookup; Connect API IDs are small and sequential
+        self._rows_by_id = array("i", [-1]) * (max(self._ids, default=-1) + 1)
+        for row, state_id in enumerate(self._ids):
+            self._rows_by_id[state_id] = row
+
+        # Path prefix -> (first row, end row) over the sorted names
+        self._prefixes: Dict[str, Tuple[int, int]] = {}
+        for row, name in enumerate(self._names):
+            end = name.rfind("/")
+            while end > 0:
+                prefix = name[:end]
+                span = self._prefixes.get(prefix)
+                self._prefixes[prefix] = (span[0] if span else row, row + 1)
+                end = name.rfind("/", 0, end)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, state_name: str) -> bool:
+        return state_name in self._rows
+
+    @property
+    def names(self) -> List[str]:
+        """All state names, sorted. Do not mutate."""
+        return self._names
+
+    def id_of(self, state_name: str) -> int:
+        """The numeric ID of a state (KeyError if unknown)."""
+        return self._ids[self._rows[state_name]]
+
+    def type_of(self, state_name: str) -> Optional[DataType]:
+        """The data type of a state, or None if unknown."""
+        row = self._rows.get(state_name)
+        return None if row is None else DataType(self._types[row])
+
+    def codec_of_id(self, state_id: int) -> Optional[StateCodec]:
+        """The codec for a state ID, or None if unknown."""
+        if 0 <= state_id < len(self._rows_by_id):
+            row = self._rows_by_id[state_id]
+            if row >= 0:
+                return _CODEC_TABLE[self._types[row]]
+        return None
+
+    def name_of_id(self, state_id: int) -> Optional[str]:
+        """The name of a state ID, or None if unknown."""
+        if 0 <= state_id < len(self._rows_by_id):
+            row = self._rows_by_id[state_id]
+            if row >= 0:
+                return self._names[row]
+        return None
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Names of the states below a path prefix (e.g. ``aircraft/0``)."""
+        span = self._prefixes.get(prefix.rstrip("/"))
+        return self._names[span[0] : span[1]] if span else []
+
+    @property
+    def commands(self) -> List[str]:
+        """All command names, sorted."""
+        return sorted(self._commands)
+
+    def has_command(self, command_name: str) -> bool:
+        """Whether the device offers a command."""
+        return command_name in self._commands
+
+    def command_id(self, command_name: str) -> int:
+        """The numeric ID of a command (KeyError if unknown)."""
+        return self._commands[command_name]
+
+    def items(self) -> Iterator[Tuple[str, int, DataType]]:
+        """Iterate (name, id, data type) in name order."""
+        for row, name in enumerate(self._names):
+            yield name, self._ids[row], DataType(self._types[row])
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import struct
+import zlib
+from array import array
+from typing import List, Optional, Tuple
+
+# File header: magic, format version, entry count, key length
+_HEADER = struct.Struct("<4sBII")
+_MAGIC = b"IFMC"
+_FORMAT_VERSION = 1
+
+# (state id, data type, name); commands keep data type -1
+ManifestEntry = Tuple[int, int, str]
+
+
+class ManifestCache:
+    """Stores parsed manifests on disk, one file per device/version/aircraft.
+
+    Each file holds the entry columns as packed arrays (ids, types) plus
+    the newline-joined names, zlib-compressed, so loading one is a single
+    read and decompress instead of a full manifest transfer and parse.
+    """
+
+    def __init__(self, directory: str):
+        """Initialize the cache.
+
+        Args:
+            directory: Where manifest files are kept (created on first save)
+        """
+        self.directory = os.path.expanduser(directory)
+
+    @staticmethod
+    def make_key(device_id: str, version: str, aircraft: str) -> str:
+        """Build the cache key for a device's current manifest."""
+        return json.dumps([device_id, version, aircraft])
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.manifest")
+
+    def load(self, key: str) -> Optional[List[ManifestEntry]]:
+        """Read a cached manifest.
+
+        Args:
+            key: Key from ``make_key``
+
+        Returns:
+            The manifest entries, or None if absent or unreadable
+        """
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+
+            magic, version, count, key_length = _HEADER.unpack_from(data)
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                return None
+
+            offset = _HEADER.size
+            if data[offset : offset + key_length].decode("utf-8") != key:
+                return None  # Hash collision or renamed file
+            body = zlib.decompress(data[offset + key_length :])
+
+            ids = array("i")
+            ids.frombytes(body[: 4 * count])
+            types = array("b")
+            types.frombytes(body[4 * count : 5 * count])
+            names = body[5 * count :].decode("utf-8").split("\n")
+        except (OSError, ValueError, struct.error, zlib.error):
+            return None
+
+        if len(names) != count:
+            return None
+        return list(zip(ids, types, names))
+
+    def save(self, key: str, entries: List[ManifestEntry]):
+        """Write a manifest to the cache, replacing any previous copy.
+
+        Args:
+            key: Key from ``make_key``
+            entries: The manifest entries
+        """
+        ids = array("i", (entry[0] for entry in entries))
+        types = array("b", (entry[1] for entry in entries))
+        names = "\n".join(entry[2] for entry in entries).encode("utf-8")
+        encoded_key = key.encode("utf-8")
+
+        body = zlib.compress(ids.tobytes() + types.tobytes() + names)
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(entries), len(encoded_key))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header + encoded_key + body)
+        # Atomic swap so a concurrent reader never sees a half-written file
+        os.replace(tmp_path, path)
@@ -0,0 +1,239 @@
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Linear sub-buckets per power of two (2 ** SUB_BUCKET_BITS)
+SUB_BUCKET_BITS = 6
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Quantiles reported by snapshots and the Prometheus summaries
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _bucket_bounds(index: int):
+    """The microsecond range [low, high) covered by a bucket."""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift = index >> SUB_BUCKET_BITS
+    mantissa = index & (_SUB_BUCKETS - 1)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in the style of HdrHistogram.
+
+    Samples are counted in microseconds, bucketed by their power of two and
+    then linearly within it, so a bucket is never wider than ~3% of the
+    values in it, from microseconds to hours. Buckets are kept sparsely;
+    recording a sample is a few integer operations and a dict increment.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0  # Sum of all samples, in seconds
+        self.min = float("inf")
+        self.max = 0.0
+        self._buckets: Dict[int, int] = {}
+
+    def record(self, seconds: float):
+        """Add one sample (in seconds)."""
+        micros = int(seconds * 1_000_000) if seconds > 0 else 0
+        shift = micros.bit_length() - SUB_BUCKET_BITS
+        index = micros if shift <= 0 else (shift << SUB_BUCKET_BITS) + (micros >> shift)
+        buckets = self._buckets
+        buckets[index] = buckets.get(index, 0) + 1
+
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.count += 1
+        self.total += seconds
+
+    @property
+    def mean(self) -> float:
+        """Average sample, in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, quantile: float) -> float:
+        """The sample value (in seconds) at a quantile between 0 and 1."""
+        if not self.count:
+            return 0.0
+
+        rank = max(1, round(quantile * self.count))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                low, high = _bucket_bounds(index)
+                value = (low + high) / 2 / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        """Count, sum, extremes, mean and quantiles (in seconds)."""
+        summary = {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "mean": self.mean,
+        }
+        for quantile in QUANTILES:
+            summary[f"p{quantile * 100:g}"] = self.percentile(quantile)
+        return summary
+
+
+class ClientMetrics:
+    """Counters and latency histograms of one ``InfiniteFlightClient``.
+
+    The frame protocol records every reply's round trip per state ID, and
+    the client times whole operations (``get_state``, ``get_states``,
+    ``manifest`` ...). Counters are plain attributes, so the hot path only
+    does attribute increments; names are resolved when a snapshot is taken.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.gets = 0  # Get requests written, polls included
+        self.sets = 0  # set_state calls (coalesced ones included)
+        self.commands = 0
+        self.replies = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors: Counter = Counter()  # Error kind -> occurrences
+        self.operations: Dict[str, LatencyHistogram] = {}
+        self.states: Dict[int, LatencyHistogram] = {}  # By state ID
+
+    def observe(self, operation: str, seconds: float):
+        """Record the duration of one client operation."""
+        histogram = self.operations.get(operation)
+        if histogram is None:
+            histogram = self.operations[operation] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def observe_reply(self, state_id: int, seconds: float):
+        """Record the round trip of one reply."""
+        histogram = self.states.get(state_id)
+        if histogram is None:
+            histogram = self.states[state_id] = LatencyHistogram()
+        histogram.record(seconds)
+        self.replies += 1
+
+    def snapshot(
+        self, name_of: Callable[[int], Optional[str]] = lambda state_id: None
+    ) -> Dict[str, Any]:
+        """Copy the metrics into plain, JSON-serializable dicts.
+
+        Args:
+            name_of: Resolves a state ID to its name; IDs it does not know
+                are reported by number
+
+        Returns:
+            Dictionary with ``uptime``, ``requests``, ``bytes``,
+            ``replies``, ``errors``, and per ``operations`` / ``states``
+            latency summaries (in seconds)
+        """
+        states = {}
+        for state_id, histogram in list(self.states.items()):
+            name = "manifest" if state_id == -1 else name_of(state_id)
+            states[name or str(state_id)] = histogram.snapshot()
+
+        return {
+            "uptime": time.time() - self.started,
+            "requests": {"get": self.gets, "set": self.sets, "command": self.commands},
+            "bytes": {"sent": self.bytes_sent, "received": self.bytes_received},
+            "replies": self.replies,
+            "errors": dict(self.errors),
+            "operations": {
+                operation: histogram.snapshot()
+                for operation, histogram in list(self.operations.items())
+            },
+            "states": states,
+        }
+
+
+def _labels(**labels: str) -> str:
+    """Format Prometheus labels, escaping their values."""
+    return ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for key, value in labels.items()
+    )
+
+
+def render_prometheus(snapshots: Dict[str, Dict[str, Any]]) -> str:
+    """Render client snapshots in the Prometheus text exposition format.
+
+    Args:
+        snapshots: ``ClientMetrics.snapshot()`` results keyed by device
+
+    Returns:
+        The metrics page, one family after another
+    """
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("ifclient_uptime_seconds", "gauge", "Seconds since the client was created")
+    for device, snapshot in snapshots.items():
+        labels = _labels(device=device)
+        lines.append(f"ifclient_uptime_seconds{{{labels}}} {snapshot['uptime']}")
+
+    family("ifclient_requests_total", "counter", "Requests issued, by kind")
+    for device, snapshot in snapshots.items():
+        for kind, count in snapshot["requests"].items():
+            labels = _labels(device=device, kind=kind)
+            lines.append(f"ifclient_requests_total{{{labels}}} {count}")
+
+    family("ifclient_replies_total", "counter", "Replies matched to a request")
+    for device, snapshot in snapshots.items():
+        labels = _labels(device=device)
+        lines.append(f"ifclient_replies_total{{{labels}}} {snapshot['replies']}")
+
+    family("ifclient_bytes_total", "counter", "Bytes on the connection")
+    for device, snapshot in snapshots.items():
+        for direction, count in snapshot["bytes"].items():
+            labels = _labels(device=device, direction=direction)
+            lines.append(f"ifclient_bytes_total{{{labels}}} {count}")
+
+    family("ifclient_errors_total", "counter", "Errors, by kind")
+    for device, snapshot in snapshots.items():
+        for kind, count in sorted(snapshot["errors"].items()):
+            labels = _labels(device=device, kind=kind)
+            lines.append(f"ifclient_errors_total{{{labels}}} {count}")
+
+    for name, key, label, help_text in (
+        (
+            "ifclient_operation_latency_seconds",
+            "operations",
+            "operation",
+            "Duration of client operations",
+        ),
+        (
+            "ifclient_state_latency_seconds",
+            "states",
+            "state",
+            "Round trip of state reads",
+        ),
+    ):
+        family(name, "summary", help_text)
+        for device, snapshot in snapshots.items():
+            for item, summary in sorted(snapshot[key].items()):
+                for quantile in QUANTILES:
+                    labels = _labels(
+                        device=device, **{label: item}, quantile=f"{quantile:g}"
+                    )
+                    value = summary[f"p{quantile * 100:g}"]
+                    lines.append(f"{name}{{{labels}}} {value}")
+                labels = _labels(device=device, **{label: item})
+                lines.append(f"{name}_sum{{{labels}}} {summary['sum']}")
+                lines.append(f"{name}_count{{{labels}}} {summary['count']}")
+
+    return "\n".join(lines) + "\n"
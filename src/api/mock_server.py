@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from .codec import REPLY_HEADER, REQUEST, DataType
+from .discovery import DISCOVERY_PORT
+from .replay import Recording
+
+# Payload sizes of the fixed-size data types
+_VALUE_SIZES = {
+    DataType.BOOLEAN: 1,
+    DataType.INTEGER: 4,
+    DataType.FLOAT: 4,
+    DataType.DOUBLE: 8,
+    DataType.LONG: 8,
+}
+_STRING_LENGTH = struct.Struct("<i")
+
+
+class _ConnectProtocol(asyncio.Protocol):
+    """One client connection to the mock server."""
+
+    def __init__(self, server: "MockInfiniteFlight"):
+        self._server = server
+        self._buffer = bytearray()
+        self._transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport: asyncio.Transport):
+        self._transport = transport
+        self._server._connections.add(transport)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self._server._connections.discard(self._transport)
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        consumed, replies = self._server._serve(self._buffer)
+        del self._buffer[:consumed]
+        if replies:
+            # Pipelined requests are answered with one write
+            self._transport.write(replies)
+
+
+class MockInfiniteFlight:
+    """Stand-in Infinite Flight device that replays a recording.
+
+    Speaks the Connect API v2: the manifest (ID -1) lists the recorded
+    states, with their column index as state ID, and every get is answered
+    with the state's value at the current playback time. Playback runs at
+    ``speed`` times real time and loops by default. Sets are accepted and
+    override the recorded value of the state from then on. While running,
+    the server also sends discovery broadcasts like a real device.
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        speed: float = 1.0,
+        host: str = "127.0.0.1",
+        port: int = 10112,
+        loop: bool = True,
+        broadcast_address: Optional[str] = "255.255.255.255",
+        broadcast_interval: float = 1.0,
+        broadcast_port: int = DISCOVERY_PORT,
+    ):
+        """Initialize the server.
+
+        Args:
+            recording: The recording to play back
+            speed: Playback speed multiplier
+            host: Address to listen on
+            port: TCP port to listen on (0 for any free port)
+            loop: Start over at the end of the recording instead of
+                holding its last sample
+            broadcast_address: Where to send discovery broadcasts (None to
+                not broadcast)
+            broadcast_interval: Seconds between discovery broadcasts
+            broadcast_port: UDP port discovery broadcasts are sent to
+        """
+        if speed <= 0:
+            raise ValueError(f"Playback speed must be positive, got {speed}")
+
+        self.recording = recording
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.loop = loop
+        self.broadcast_address = broadcast_address
+        self.broadcast_interval = broadcast_interval
+        self.broadcast_port = broadcast_port
+        self.requests = 0  # Get requests served
+        self._types: List[DataType] = [t for _, t in recording.states]
+        self._overrides: Dict[int, bytes] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections = set()
+        self._broadcaster: Optional[asyncio.Task] = None
+        self._started = 0.0
+
+        manifest = "\n".join(
+            f"{state_id},{int(data_type)},{name}"
+            for state_id, (name, data_type) in enumerate(recording.states)
+        ).encode("utf-8")
+        payload = _STRING_LENGTH.pack(len(manifest)) + manifest
+        self._manifest_frame = REPLY_HEADER.pack(-1, len(payload)) + payload
+
+        # A replay's manifest is its recorded states, so they key its
+        # identity (and with it the client's manifest cache)
+        digest = hashlib.blake2b(manifest, digest_size=6).hexdigest()
+        recorded = recording.header.get("device") or {}
+        self.device: Dict[str, Any] = {
+            "state": "Playing",
+            "port": port,
+            "deviceId": f"replay-{digest}",
+            "deviceName": f"Replay of {os.path.basename(recording.path)}",
+            "aircraft": recorded.get("aircraft", "Replay"),
+            "livery": recorded.get("livery", ""),
+            "version": recorded.get("version", "replay"),
+            "addresses": [host],
+        }
+
+    @property
+    def running(self) -> bool:
+        """Whether the server is accepting connections."""
+        return self._server is not None
+
+    def playback_time(self) -> float:
+        """The recording time (Unix time) currently being served."""
+        elapsed = (asyncio.get_running_loop().time() - self._started) * self.speed
+        duration = self.recording.duration
+        if self.loop and duration > 0:
+            elapsed %= duration
+        return self.recording.start_time + min(elapsed, duration)
+
+    async def start(self):
+        """Start listening, and broadcasting if enabled."""
+        if self.running:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _ConnectProtocol(self), self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.device["port"] = self.port
+        self._started = loop.time()
+
+        if self.broadcast_address:
+            self._broadcaster = loop.create_task(self._broadcast())
+
+    async def stop(self):
+        """Stop broadcasting and close every connection."""
+        if self._broadcaster:
+            self._broadcaster.cancel()
+            try:
+                await self._broadcaster
+            except asyncio.CancelledError:
+                pass
+            self._broadcaster = None
+
+        if self._server:
+            self._server.close()
+            for transport in list(self._connections):
+                transport.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _broadcast(self):
+        """Announce the server on the discovery port until stopped."""
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, family=socket.AF_INET, allow_broadcast=True
+        )
+        try:
+            while True:
+                try:
+                    transport.sendto(
+                        json.dumps(self.device).encode("utf-8"),
+                        (self.broadcast_address, self.broadcast_port),
+                    )
+                except OSError:
+                    pass  # No network; the TCP side still works
+                await asyncio.sleep(self.broadcast_interval)
+        finally:
+            transport.close()
+
+    def _serve(self, buffer: bytearray) -> Tuple[int, bytes]:
+        """Answer the complete requests at the start of a buffer.
+
+        Args:
+            buffer: Bytes received and not yet consumed
+
+        Returns:
+            The number of bytes consumed and the replies to send
+        """
+        replies = []
+        position = None
+        offset = 0
+
+        while len(buffer) - offset >= REQUEST.size:
+            state_id, is_set = REQUEST.unpack_from(buffer, offset)
+            start = offset + REQUEST.size
+            data_type = (
+                self._types[state_id] if 0 <= state_id < len(self._types) else None
+            )
+
+            if is_set:
+                if data_type is None:
+                    # The value's size is unknown; drop everything received
+                    return len(buffer), b"".join(replies)
+                if data_type == DataType.STRING:
+                    if len(buffer) - start < _STRING_LENGTH.size:
+                        break
+                    size = (
+                        _STRING_LENGTH.size
+                        + _STRING_LENGTH.unpack_from(buffer, start)[0]
+                    )
+                else:
+                    size = _VALUE_SIZES[data_type]
+                if len(buffer) - start < size:
+                    break
+                # A set carries the value exactly as a reply would
+                self._overrides[state_id] = bytes(buffer[start : start + size])
+                offset = start + size
+                continue
+
+            offset = start
+            if state_id == -1:
+                replies.append(self._manifest_frame)
+                continue
+            if data_type is None:
+                continue  # Commands and unknown IDs get no reply
+
+            self.requests += 1
+            payload = self._overrides.get(state_id)
+            if payload is None:
+                if position is None:
+                    position = self.recording.locate(self.playback_time())
+                raw = self.recording.raw(position, state_id) if position else None
+                if data_type == DataType.STRING:
+                    raw = raw or b""
+                    payload = _STRING_LENGTH.pack(len(raw)) + raw
+                else:
+                    # A sample without a value is served as zero
+                    payload = raw or bytes(_VALUE_SIZES[data_type])
+            replies.append(REPLY_HEADER.pack(state_id, len(payload)) + payload)
+
+        return offset, b"".join(replies)
+
+
+async def _run(args: argparse.Namespace):
+    with Recording(args.recording) as recording:
+        server = MockInfiniteFlight(
+            recording,
+            speed=args.speed,
+            host=args.host,
+            port=args.port,
+            loop=not args.no_loop,
+            broadcast_address=args.broadcast_address or None,
+            broadcast_port=args.broadcast_port,
+        )
+        await server.start()
+        print(
+            f"Replaying {recording.rows} samples ({recording.duration:.0f} s) "
+            f"at {args.speed}x on {server.host}:{server.port}"
+        )
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve a telemetry recording as a mock Infinite Flight device."
+    )
+    parser.add_argument("recording", help="Recording (.iftr) to play back")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=10112, help="TCP port")
+    parser.add_argument(
+        "--no-loop", action="store_true", help="Hold the last sample at the end"
+    )
+    parser.add_argument(
+        "--broadcast-address",
+        default="255.255.255.255",
+        help="Discovery broadcast address (empty to disable)",
+    )
+    parser.add_argument(
+        "--broadcast-port",
+        type=int,
+        default=DISCOVERY_PORT,
+        help="Discovery broadcast port",
+    )
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
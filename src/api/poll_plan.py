@@ -0,0 +1,189 @@
+import asyncio
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .subscriptions import Subscription
+
+# Poll rates (Hz) requests are rounded up to, so that subscribers asking
+# for similar rates share a poll instead of each getting their own
+RATE_TIERS: Tuple[float, ...] = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0)
+
+
+def rate_tier(rate: float) -> float:
+    """Round a requested poll rate up to its tier (capped at the fastest)."""
+    if rate <= 0:
+        raise ValueError(f"Poll rate must be positive, got {rate}")
+    for tier in RATE_TIERS:
+        if rate <= tier:
+            return tier
+    return RATE_TIERS[-1]
+
+
+class _Subscriber:
+    """The states one subscriber wants, and when it last got each batch."""
+
+    __slots__ = ("callback", "states", "next_due")
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], Any]):
+        self.callback = callback
+        self.states: Dict[str, float] = {}  # name -> requested tier
+        # (poll tier, requested tier) -> time the next delivery is due
+        self.next_due: Dict[Tuple[float, float], float] = {}
+
+
+class PollPlan:
+    """Merges many subscribers' state sets into one poll plan for a client.
+
+    Each state is polled once, at the fastest rate any subscriber wants it,
+    through one client subscription per rate tier. Every subscriber then
+    gets its own states at the rate it asked for, so adding a gauge only
+    costs the states nobody was polling yet.
+    """
+
+    def __init__(
+        self,
+        client,
+        on_error: Optional[Callable[[Exception], Any]] = None,
+        min_rate: Optional[float] = None,
+    ):
+        """Initialize the plan.
+
+        Args:
+            client: The connected InfiniteFlightClient to poll
+            on_error: Called with the exception when a poll fails
+            min_rate: Rate each tier backs off to while its values are
+                static (None to always poll at the tier's rate)
+        """
+        self._client = client
+        self._on_error = on_error
+        self._min_rate = min_rate
+        self._subscribers: Dict[str, _Subscriber] = {}
+        self._tiers: Dict[float, Subscription] = {}  # poll tier -> subscription
+
+    @property
+    def rates(self) -> Dict[str, float]:
+        """The rate each state is polled at."""
+        rates: Dict[str, float] = {}
+        for subscriber in self._subscribers.values():
+            for name, tier in subscriber.states.items():
+                if tier > rates.get(name, 0.0):
+                    rates[name] = tier
+        return rates
+
+    def subscribed(self, subscriber_id: str) -> Dict[str, float]:
+        """The states a subscriber receives, with their rates."""
+        subscriber = self._subscribers.get(subscriber_id)
+        return dict(subscriber.states) if subscriber else {}
+
+    async def subscribe(
+        self,
+        subscriber_id: str,
+        state_names: Iterable[str],
+        rate: float,
+        callback: Callable[[Dict[str, Any]], Any],
+    ) -> float:
+        """Add states to a subscriber's updates, or change their rate.
+
+        Args:
+            subscriber_id: Identifies the subscriber (e.g. a Socket.IO session id)
+            state_names: The names of the states to add
+            rate: Requested update rate in Hz
+            callback: Called with a dict of state name -> value for the
+                subscriber's due states. Replaces any earlier callback.
+
+        Returns:
+            The rate the states will be delivered at
+        """
+        tier = rate_tier(rate)
+
+        subscriber = self._subscribers.get(subscriber_id)
+        if subscriber is None:
+            subscriber = self._subscribers[subscriber_id] = _Subscriber(callback)
+        subscriber.callback = callback
+        for name in state_names:
+            subscriber.states[name] = tier
+
+        await self._replan()
+        return tier
+
+    async def unsubscribe(
+        self, subscriber_id: str, state_names: Optional[Iterable[str]] = None
+    ):
+        """Remove states from a subscriber's updates.
+
+        Args:
+            subscriber_id: The subscriber
+            state_names: The states to remove (all of them if None)
+        """
+        subscriber = self._subscribers.get(subscriber_id)
+        if subscriber is None:
+            return
+
+        if state_names is None:
+            subscriber.states.clear()
+        else:
+            for name in state_names:
+                subscriber.states.pop(name, None)
+
+        if not subscriber.states:
+            del self._subscribers[subscriber_id]
+        await self._replan()
+
+    async def close(self):
+        """Drop every subscriber and stop polling."""
+        self._subscribers.clear()
+        await self._replan()
+
+    async def _replan(self):
+        """Bring the client subscriptions in line with the wanted rates."""
+        by_tier: Dict[float, List[str]] = {}
+        for name, tier in sorted(self.rates.items()):
+            by_tier.setdefault(tier, []).append(name)
+
+        for tier in [t for t in self._tiers if t not in by_tier]:
+            await self._client.unsubscribe(self._tiers.pop(tier))
+
+        for tier, names in by_tier.items():
+            subscription = self._tiers.get(tier)
+            if subscription is None:
+                self._tiers[tier] = await self._client.subscribe(
+                    names,
+                    tier,
+                    partial(self._dispatch, tier),
+                    self._on_error,
+                    None if self._min_rate is None else min(self._min_rate, tier),
+                )
+            elif subscription.state_names != names:
+                # The scheduler reads the list on every poll; new states
+                # should not wait out a backed-off interval
+                subscription.state_names = names
+                self._client.wake([subscription])
+
+    def _dispatch(self, tier: float, values: Dict[str, Any]):
+        """Hand one poll of a tier to the subscribers whose states are due."""
+        now = asyncio.get_running_loop().time()
+        # Deliveries may come up to half a poll early, to absorb jitter
+        slack = 0.5 / tier
+
+        for subscriber in list(self._subscribers.values()):
+            batches: Dict[float, Dict[str, Any]] = {}
+            for name, value in values.items():
+                wanted = subscriber.states.get(name)
+                if wanted is not None:
+                    batches.setdefault(wanted, {})[name] = value
+
+            update: Dict[str, Any] = {}
+            for wanted, batch in batches.items():
+                key = (tier, wanted)
+                if now + slack >= subscriber.next_due.get(key, 0.0):
+                    subscriber.next_due[key] = now + 1.0 / wanted
+                    update.update(batch)
+
+            if update:
+                try:
+                    result = subscriber.callback(update)
+                    if asyncio.iscoroutine(result):
+                        asyncio.get_running_loop().create_task(result)
+                except Exception:
+                    # One failing subscriber must not starve the others
+                    pass
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Union
+
+from .codec import DataType
+from .subscriptions import Subscription
+
+# File layout: header, then chunks appended back to back until the file ends
+#   header: MAGIC, FORMAT_VERSION (uint16), JSON length (uint32), JSON
+#   chunk:  CHUNK_MAGIC, row count (uint32), payload length (uint64), payload
+# A chunk's payload is its columns one after another, all little-endian:
+#   timestamps: rows x float64 (Unix time of each poll)
+#   per state:  rows x uint8 (1 where the poll returned a value), then
+#               rows x the state's dtype, or for strings rows x uint32
+#               byte lengths followed by the UTF-8 bytes
+MAGIC = b"IFTR"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHI")
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sIQ")
+
+# array typecode and NumPy dtype of each fixed-size column
+COLUMN_TYPES = {
+    DataType.BOOLEAN: ("B", "<u1"),
+    DataType.INTEGER: ("i", "<i4"),
+    DataType.FLOAT: ("f", "<f4"),
+    DataType.DOUBLE: ("d", "<f8"),
+    DataType.LONG: ("q", "<i8"),
+}
+
+
+def _little_endian(values: array) -> bytes:
+    """Serialize an array in the file's byte order."""
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Column:
+    """The samples of one state in the chunk being filled."""
+
+    __slots__ = ("name", "data_type", "valid", "values")
+
+    def __init__(self, name: str, data_type: DataType):
+        self.name = name
+        self.data_type = data_type
+        self.valid = array("B")
+        self.values: Union[array, List[str]] = (
+            [] if data_type == DataType.STRING else array(COLUMN_TYPES[data_type][0])
+        )
+
+    def append(self, value: Any):
+        """Add one sample (None where the poll returned no value)."""
+        if value is None:
+            self.valid.append(0)
+            self.values.append("" if self.data_type == DataType.STRING else 0)
+        else:
+            self.valid.append(1)
+            self.values.append(value)
+
+    def encode(self) -> bytes:
+        """Serialize the column as laid out in a chunk payload."""
+        if self.data_type != DataType.STRING:
+            return _little_endian(self.valid) + _little_endian(self.values)
+        encoded = [value.encode("utf-8") for value in self.values]
+        lengths = array("I", map(len, encoded))
+        return _little_endian(self.valid) + _little_endian(lengths) + b"".join(encoded)
+
+
+class TelemetryRecorder:
+    """Records polled state values to an append-only columnar file.
+
+    Samples are taken through a client subscription and collected in
+    typed per-state columns. Every ``chunk_rows`` samples, or every
+    ``flush_interval`` seconds, the columns are handed to a background
+    writer that appends them as one chunk and fsyncs the file, so the
+    poll path never waits on the disk. At most ``max_pending_chunks``
+    chunks wait for the writer; further chunks are dropped and counted
+    in ``dropped_chunks`` rather than growing memory.
+    """
+
+    def __init__(
+        self,
+        client,
+        path: str,
+        state_names: List[str],
+        rate: float = 1.0,
+        chunk_rows: int = 1024,
+        flush_interval: float = 5.0,
+        max_pending_chunks: int = 8,
+    ):
+        """Initialize the recorder.
+
+        Args:
+            client: The connected InfiniteFlightClient to poll
+            path: The file to create
+            state_names: The states to record
+            rate: Samples per second
+            chunk_rows: Samples per chunk
+            flush_interval: Seconds after which a partial chunk is written
+            max_pending_chunks: Chunks that may wait for the writer
+        """
+        self._client = client
+        self.path = path
+        self.state_names = list(dict.fromkeys(state_names))
+        self.rate = rate
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.max_pending_chunks = max_pending_chunks
+        self.rows_written = 0
+        self.dropped_chunks = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._file = None
+        self._subscription: Optional[Subscription] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._timestamps = array("d")
+        self._columns: List[_Column] = []
+        self._chunk_started = 0.0
+
+    @property
+    def recording(self) -> bool:
+        """Whether samples are being taken."""
+        return self._subscription is not None
+
+    async def start(self):
+        """Create the file and start sampling.
+
+        Raises:
+            RuntimeError: If not connected
+            ValueError: If a state is not in the manifest
+            FileExistsError: If the file already exists
+        """
+        if self.recording:
+            return
+        if not self._client.is_connected:
+            raise RuntimeError("Not connected to Infinite Flight")
+
+        types = {name: self._client.get_state_type(name) for name in self.state_names}
+        unknown = [name for name, data_type in types.items() if data_type is None]
+        if unknown:
+            raise ValueError(f"Unknown states: {', '.join(unknown)}")
+
+        header = {
+            "states": [
+                {
+                    "name": name,
+                    "type": data_type.name,
+                    "dtype": COLUMN_TYPES.get(data_type, (None, None))[1],
+                }
+                for name, data_type in types.items()
+            ],
+            "rate": self.rate,
+            "started": time.time(),
+            "device": self._client.device,
+        }
+        encoded = json.dumps(header).encode("utf-8")
+
+        loop = asyncio.get_running_loop()
+        self._file = await loop.run_in_executor(None, open, self.path, "xb")
+        self._file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        self._file.write(encoded)
+
+        self._columns = [_Column(name, types[name]) for name in self.state_names]
+        self._queue = asyncio.Queue(self.max_pending_chunks)
+        self._writer = loop.create_task(self._write_chunks())
+        self._subscription = await self._client.subscribe(
+            self.state_names, self.rate, self._record
+        )
+
+    async def stop(self):
+        """Stop sampling, write what is left and close the file."""
+        if not self.recording:
+            return
+
+        await self._client.unsubscribe(self._subscription)
+        self._subscription = None
+        self._cut_chunk()
+        if not self._writer.done():
+            await self._queue.put(None)
+        try:
+            await self._writer  # Raises if a write failed
+        finally:
+            self._writer = None
+            await asyncio.get_running_loop().run_in_executor(None, self._file.close)
+            self._file = None
+
+    def _record(self, values: Dict[str, Any]):
+        """Subscription callback that appends one sample to the columns."""
+        now = time.time()
+        if not self._timestamps:
+            self._chunk_started = now
+
+        self._timestamps.append(now)
+        for column in self._columns:
+            column.append(values.get(column.name))
+
+        if (
+            len(self._timestamps) >= self.chunk_rows
+            or now - self._chunk_started >= self.flush_interval
+        ):
+            self._cut_chunk()
+
+    def _cut_chunk(self):
+        """Hand the filled columns to the writer and start new ones."""
+        if not self._timestamps:
+            return
+
+        chunk = (self._timestamps, self._columns)
+        self._timestamps = array("d")
+        self._columns = [_Column(c.name, c.data_type) for c in self._columns]
+        try:
+            self._queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            self.dropped_chunks += 1  # The disk can't keep up; stay bounded
+
+    async def _write_chunks(self):
+        """Append queued chunks to the file from a worker thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                break
+            await loop.run_in_executor(None, self._write_chunk, *chunk)
+            self.rows_written += len(chunk[0])
+
+    def _write_chunk(self, timestamps: array, columns: List[_Column]):
+        """Encode a chunk, append it and fsync (runs in a worker thread)."""
+        payload = b"".join(
+            [_little_endian(timestamps)] + [column.encode() for column in columns]
+        )
+        self._file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(timestamps), len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -0,0 +1,253 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .codec import DataType
+from .recorder import CHUNK_HEADER, CHUNK_MAGIC, FILE_HEADER, FORMAT_VERSION, MAGIC
+
+# Value layout of each fixed-size column (same bytes as the Connect API v2)
+_VALUE_STRUCTS = {
+    DataType.BOOLEAN: struct.Struct("<?"),
+    DataType.INTEGER: struct.Struct("<i"),
+    DataType.FLOAT: struct.Struct("<f"),
+    DataType.DOUBLE: struct.Struct("<d"),
+    DataType.LONG: struct.Struct("<q"),
+}
+_TIMESTAMP = struct.Struct("<d")
+
+# (chunk index, row) of one sample
+Position = Tuple[int, int]
+
+
+class _ChunkLayout:
+    """Where each column of one chunk starts within the file."""
+
+    __slots__ = ("valid", "values", "string_offsets")
+
+    def __init__(self):
+        self.valid: List[int] = []
+        self.values: List[int] = []
+        # Per string column, the start of each row's bytes (plus the end)
+        self.string_offsets: List[Optional[array]] = []
+
+
+class Recording:
+    """Read-only view of a ``TelemetryRecorder`` file through ``mmap``.
+
+    Opening a recording reads its header and the chunk headers only;
+    samples are decoded straight from the mapping when asked for, so a
+    multi-hour flight costs address space rather than memory. A chunk cut
+    short by a crash ends the recording.
+    """
+
+    def __init__(self, path: str):
+        """Open a recording.
+
+        Args:
+            path: The ``.iftr`` file
+
+        Raises:
+            ValueError: If the file is not a telemetry recording
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+        self._layout: Tuple[int, Optional[_ChunkLayout]] = (-1, None)
+
+    def _read_index(self):
+        """Parse the file header and find every complete chunk."""
+        data = self._map
+        if len(data) < FILE_HEADER.size:
+            raise ValueError(f"{self.path} is not a telemetry recording")
+        magic, version, header_size = FILE_HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a telemetry recording")
+
+        offset = FILE_HEADER.size
+        self.header: Dict[str, Any] = json.loads(
+            data[offset : offset + header_size].decode("utf-8")
+        )
+        self.states: List[Tuple[str, DataType]] = [
+            (state["name"], DataType[state["type"]]) for state in self.header["states"]
+        ]
+        offset += header_size
+
+        self._chunks: List[Tuple[int, int]] = []  # (payload offset, rows)
+        self._starts = array("d")  # First timestamp of each chunk
+        self._end_time = 0.0
+        while offset + CHUNK_HEADER.size <= len(data):
+            magic, rows, payload_size = CHUNK_HEADER.unpack_from(data, offset)
+            payload = offset + CHUNK_HEADER.size
+            if magic != CHUNK_MAGIC or payload + payload_size > len(data) or not rows:
+                break
+            self._chunks.append((payload, rows))
+            self._starts.append(_TIMESTAMP.unpack_from(data, payload)[0])
+            self._end_time = _TIMESTAMP.unpack_from(data, payload + 8 * (rows - 1))[0]
+            offset = payload + payload_size
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def state_names(self) -> List[str]:
+        """The recorded states, in column order."""
+        return [name for name, _ in self.states]
+
+    @property
+    def rows(self) -> int:
+        """Number of samples."""
+        return sum(rows for _, rows in self._chunks)
+
+    @property
+    def start_time(self) -> float:
+        """Unix time of the first sample."""
+        return self._starts[0] if self._starts else 0.0
+
+    @property
+    def end_time(self) -> float:
+        """Unix time of the last sample."""
+        return self._end_time if self._starts else 0.0
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first sample to the last."""
+        return self.end_time - self.start_time
+
+    def locate(self, timestamp: float) -> Optional[Position]:
+        """Find the last sample taken at or before a time.
+
+        Args:
+            timestamp: Unix time (clamped to the recording)
+
+        Returns:
+            The sample's position, or None if the recording is empty
+        """
+        if not self._chunks:
+            return None
+
+        chunk = max(bisect_right(self._starts, timestamp) - 1, 0)
+        payload, rows = self._chunks[chunk]
+
+        # Last row whose timestamp is <= the time, searching the mapping
+        low, high = 0, rows
+        while low < high:
+            middle = (low + high) // 2
+            if _TIMESTAMP.unpack_from(self._map, payload + 8 * middle)[0] <= timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return chunk, max(low - 1, 0)
+
+    def timestamp(self, position: Position) -> float:
+        """Unix time of the sample at a position."""
+        chunk, row = position
+        return _TIMESTAMP.unpack_from(self._map, self._chunks[chunk][0] + 8 * row)[0]
+
+    def raw(self, position: Position, column: int) -> Optional[bytes]:
+        """The little-endian bytes of one value, without decoding them.
+
+        Fixed-size values are laid out like Connect API v2 replies; string
+        values are the UTF-8 bytes without a length prefix.
+
+        Args:
+            position: The sample's position
+            column: Index of the state in ``states``
+
+        Returns:
+            The value's bytes, or None if the sample has no value
+        """
+        chunk, row = position
+        layout = self._chunk_layout(chunk)
+        if not self._map[layout.valid[column] + row]:
+            return None
+
+        offsets = layout.string_offsets[column]
+        if offsets is not None:
+            start, end = offsets[row], offsets[row + 1]
+        else:
+            size = _VALUE_STRUCTS[self.states[column][1]].size
+            start = layout.values[column] + size * row
+            end = start + size
+        return self._map[start:end]
+
+    def value(self, position: Position, column: int) -> Any:
+        """Decode one value (None if the sample has none)."""
+        data = self.raw(position, column)
+        if data is None:
+            return None
+        data_type = self.states[column][1]
+        if data_type == DataType.STRING:
+            return str(data, "utf-8")
+        return _VALUE_STRUCTS[data_type].unpack_from(data)[0]
+
+    def values_at(self, timestamp: float) -> Dict[str, Any]:
+        """Every state's value as of a time (see ``locate``)."""
+        position = self.locate(timestamp)
+        if position is None:
+            return {name: None for name in self.state_names}
+        return {
+            name: self.value(position, column)
+            for column, name in enumerate(self.state_names)
+        }
+
+    def samples(self) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """Iterate over every sample in order, as (Unix time, values)."""
+        for chunk, (_, rows) in enumerate(self._chunks):
+            for row in range(rows):
+                position = (chunk, row)
+                yield self.timestamp(position), {
+                    name: self.value(position, column)
+                    for column, name in enumerate(self.state_names)
+                }
+
+    def _chunk_layout(self, chunk: int) -> _ChunkLayout:
+        """Column offsets of a chunk; the last one used is kept."""
+        if self._layout[0] == chunk:
+            return self._layout[1]
+
+        payload, rows = self._chunks[chunk]
+        layout = _ChunkLayout()
+        offset = payload + 8 * rows  # Past the timestamps
+        for _, data_type in self.states:
+            layout.valid.append(offset)
+            offset += rows
+            if data_type == DataType.STRING:
+                lengths = array("I")
+                lengths.frombytes(self._map[offset : offset + 4 * rows])
+                if sys.byteorder == "big":
+                    lengths.byteswap()
+                offset += 4 * rows
+                offsets = array("Q", [offset])
+                for length in lengths:
+                    offset += length
+                    offsets.append(offset)
+                layout.values.append(offsets[0])
+                layout.string_offsets.append(offsets)
+            else:
+                layout.values.append(offset)
+                layout.string_offsets.append(None)
+                offset += _VALUE_STRUCTS[data_type].size * rows
+
+        self._layout = (chunk, layout)
+        return layout
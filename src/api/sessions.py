@@ -0,0 +1,150 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .client import InfiniteFlightClient
+
+
+class SessionManager:
+    """Pool of Infinite Flight connections shared by many viewers.
+
+    Each device gets one ``InfiniteFlightClient`` (with its own reader and
+    poll scheduler), keyed by its ``deviceId``. Viewers such as browser
+    sessions attach to a device; the connection is opened for the first
+    viewer and closed when the last one detaches. A connection that drops
+    while viewers are attached is re-established by its client.
+    """
+
+    def __init__(
+        self, manifest_cache_dir: Optional[str] = None, auto_reconnect: bool = True
+    ):
+        """Initialize the manager.
+
+        Args:
+            manifest_cache_dir: Directory for cached manifests (disabled if None)
+            auto_reconnect: Reconnect devices whose connection drops
+        """
+        self.manifest_cache_dir = manifest_cache_dir
+        self.auto_reconnect = auto_reconnect
+        self._clients: Dict[str, InfiniteFlightClient] = {}
+        self._viewers: Dict[str, Set[str]] = {}  # device key -> viewer ids
+        self._device_of: Dict[str, str] = {}  # viewer id -> device key
+        # Per-device locks so two viewers attaching at once share one connect
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def device_key(
+        host: str, port: int, device: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Key a device by its ``deviceId``, falling back to its address."""
+        if device and device.get("deviceId"):
+            return device["deviceId"]
+        return f"{host}:{port}"
+
+    def get(self, device_key: str) -> Optional[InfiniteFlightClient]:
+        """The connected client for a device, if any."""
+        client = self._clients.get(device_key)
+        return client if client and client.is_connected else None
+
+    def client_for(self, viewer_id: str) -> Optional[InfiniteFlightClient]:
+        """The connected client a viewer is attached to, if any."""
+        device_key = self._device_of.get(viewer_id)
+        return self.get(device_key) if device_key else None
+
+    def device_of(self, viewer_id: str) -> Optional[str]:
+        """The device key a viewer is attached to, if any."""
+        return self._device_of.get(viewer_id)
+
+    def viewers(self, device_key: str) -> Set[str]:
+        """The viewers attached to a device."""
+        return set(self._viewers.get(device_key, ()))
+
+    @property
+    def devices(self) -> List[str]:
+        """Keys of the devices with an open connection."""
+        return [key for key in self._clients if self.get(key)]
+
+    async def attach(
+        self,
+        viewer_id: str,
+        host: str,
+        port: int,
+        device: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, InfiniteFlightClient, bool]:
+        """Attach a viewer to a device, connecting to it if needed.
+
+        A viewer attached to another device is detached from it first.
+
+        Args:
+            viewer_id: Identifies the viewer (e.g. a Socket.IO session id)
+            host: IP address of the device
+            port: TCP port of the Connect API
+            device: Discovery record of the device
+
+        Returns:
+            The device key, its client, and whether a new connection was opened
+
+        Raises:
+            ConnectionError: If the device could not be reached
+        """
+        device_key = self.device_key(host, port, device)
+        if self._device_of.get(viewer_id) not in (None, device_key):
+            await self.detach(viewer_id)
+
+        lock = self._locks.setdefault(device_key, asyncio.Lock())
+        async with lock:
+            # A dropped connection being re-established is still shared
+            client = self._clients.get(device_key)
+            if client and not (client.is_connected or client.reconnecting):
+                client = None
+            created = client is None
+
+            if created:
+                client = InfiniteFlightClient(
+                    host=host,
+                    port=port,
+                    device=device,
+                    manifest_cache_dir=self.manifest_cache_dir,
+                    auto_reconnect=self.auto_reconnect,
+                )
+                if not await client.connect():
+                    raise ConnectionError(client.last_error or "Connection failed")
+                self._clients[device_key] = client
+
+            self._viewers.setdefault(device_key, set()).add(viewer_id)
+            self._device_of[viewer_id] = device_key
+
+        return device_key, client, created
+
+    async def detach(self, viewer_id: str) -> Optional[str]:
+        """Detach a viewer, disconnecting its device if nobody else uses it.
+
+        Args:
+            viewer_id: The viewer to detach
+
+        Returns:
+            The key of the device that was disconnected, if any
+        """
+        device_key = self._device_of.pop(viewer_id, None)
+        if device_key is None:
+            return None
+
+        async with self._locks.setdefault(device_key, asyncio.Lock()):
+            viewers = self._viewers.get(device_key, set())
+            viewers.discard(viewer_id)
+            if viewers:
+                return None
+
+            self._viewers.pop(device_key, None)
+            client = self._clients.pop(device_key, None)
+            if client:
+                await client.disconnect()
+        return device_key
+
+    async def close_all(self):
+        """Disconnect every device and forget all viewers."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._viewers.clear()
+        self._device_of.clear()
+        for client in clients:
+            await client.disconnect()
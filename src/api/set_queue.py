@@ -0,0 +1,96 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class SetQueue:
+    """Coalesces set requests into batched writes.
+
+    Set frames are kept per state ID, so a newer value for a state replaces
+    the one still pending and a burst of sets (a slider being dragged)
+    sends only the latest value. The first set after a flush starts a
+    ``flush_interval`` timer; when it fires, every pending frame goes out
+    in a single write.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[bytes], Awaitable[None]],
+        flush_interval: float = 0.005,
+    ):
+        """Initialize the queue.
+
+        Args:
+            write: Sends a batch of frames on the connection
+            flush_interval: Seconds a set may wait for others to join it
+        """
+        self.flush_interval = flush_interval
+        self.coalesced = 0  # Sets replaced before they were sent
+        self._write = write
+        self._pending: Dict[int, bytes] = {}
+        self._batch: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, state_id: int, frame: bytes) -> asyncio.Future:
+        """Queue a set frame, replacing any pending one for the same state.
+
+        Args:
+            state_id: The state being set
+            frame: The complete set request frame
+
+        Returns:
+            A future that resolves once the batch holding the frame has
+            been written (await it through ``asyncio.shield``)
+        """
+        if state_id in self._pending:
+            self.coalesced += 1
+        self._pending[state_id] = frame
+
+        if self._batch is None:
+            loop = asyncio.get_running_loop()
+            self._batch = loop.create_future()
+            # Nobody may be left waiting on a failed batch
+            self._batch.add_done_callback(
+                lambda batch: batch.cancelled() or batch.exception()
+            )
+            self._timer = loop.call_later(self.flush_interval, self._flush_later)
+        return self._batch
+
+    def _flush_later(self):
+        """Timer callback that writes the pending batch."""
+        self._timer = None
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Write every pending frame now, in one write."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._batch = self._batch, None
+        frames, self._pending = self._pending, {}
+        if batch is None:
+            return
+
+        try:
+            await self._write(b"".join(frames.values()))
+        except Exception as e:
+            if not batch.done():
+                batch.set_exception(e)
+        else:
+            if not batch.done():
+                batch.set_result(None)
+
+    def clear(self, error: Exception):
+        """Drop every pending frame, failing their callers with ``error``."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = {}
+
+        batch, self._batch = self._batch, None
+        if batch and not batch.done():
+            batch.set_exception(error)
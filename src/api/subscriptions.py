@@ -0,0 +1,219 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Subscription:
+    """A group of states polled together at a target rate.
+
+    An adaptive subscription (one with a ``min_rate``) halves its poll rate
+    after every ``idle_polls`` polls in a row that return the same values,
+    down to ``min_rate``, and returns to the full rate as soon as a value
+    changes. While ``idle`` (nobody is watching) it stays at ``min_rate``.
+    """
+
+    def __init__(
+        self,
+        state_names: List[str],
+        rate: float,
+        callback: Callable[[Dict[str, Any]], Any],
+        on_error: Optional[Callable[[Exception], Any]] = None,
+        min_rate: Optional[float] = None,
+        idle_polls: int = 5,
+    ):
+        """Initialize the subscription.
+
+        Args:
+            state_names: The names of the states to poll
+            rate: Target poll rate in Hz
+            callback: Called with a dict of state name -> value on every poll
+            on_error: Called with the exception when a poll fails
+            min_rate: Lowest rate to back off to while the values are static
+                (None to always poll at ``rate``)
+            idle_polls: Static polls at a rate before backing off further
+        """
+        if rate <= 0:
+            raise ValueError(f"Poll rate must be positive, got {rate}")
+        if min_rate is not None and not 0 < min_rate <= rate:
+            raise ValueError(
+                f"Minimum poll rate must be in (0, {rate}], got {min_rate}"
+            )
+
+        self.state_names = list(dict.fromkeys(state_names))
+        self.rate = rate
+        self.callback = callback
+        self.on_error = on_error
+        self.min_rate = min_rate
+        self.idle_polls = idle_polls
+        self.effective_rate = rate
+        self.idle = False
+        self.next_due = 0.0
+        self._last_values: Optional[Dict[str, Any]] = None
+        self._static_polls = 0
+
+    @property
+    def interval(self) -> float:
+        """Seconds between polls, at the current effective rate."""
+        return 1.0 / self.effective_rate
+
+    def observe(self, values: Dict[str, Any]):
+        """Adapt the poll rate to the values of the latest poll."""
+        if self.min_rate is None:
+            return
+
+        if values != self._last_values:
+            self._last_values = values
+            self._static_polls = 0
+            if not self.idle:
+                self.effective_rate = self.rate
+        else:
+            self._static_polls += 1
+            if self._static_polls >= self.idle_polls:
+                self._static_polls = 0
+                self.effective_rate = max(self.min_rate, self.effective_rate / 2)
+
+        if self.idle:
+            self.effective_rate = self.min_rate
+
+    def wake(self):
+        """Return to the full rate, e.g. because someone started watching."""
+        self.idle = False
+        self._static_polls = 0
+        self.effective_rate = self.rate
+
+
+class SubscriptionScheduler:
+    """Polls every subscription of a client from a single task.
+
+    On each tick the states of all due subscriptions are merged into one
+    pipelined ``get_states`` batch, so a fast feed and a slow feed share
+    round trips instead of competing for the connection.
+    """
+
+    def __init__(self, client):
+        """Initialize the scheduler.
+
+        Args:
+            client: The connected InfiniteFlightClient to poll
+        """
+        self._client = client
+        self._subscriptions: List[Subscription] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        """The active subscriptions."""
+        return list(self._subscriptions)
+
+    def add(self, subscription: Subscription):
+        """Register a subscription and make sure the poll task is running."""
+        self._subscriptions.append(subscription)
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def wake(self, subscriptions: Optional[List[Subscription]] = None):
+        """Return subscriptions to their full rate and poll them right away.
+
+        Args:
+            subscriptions: The subscriptions to wake (all of them if None)
+        """
+        now = asyncio.get_running_loop().time()
+        for subscription in (
+            self._subscriptions if subscriptions is None else subscriptions
+        ):
+            subscription.wake()
+            subscription.next_due = min(subscription.next_due, now)
+        if self._wakeup:
+            self._wakeup.set()
+
+    def remove(self, subscription: Subscription):
+        """Unregister a subscription."""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def stop(self):
+        """Drop every subscription and stop the poll task."""
+        self._subscriptions.clear()
+        task = self._task
+        self._task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        """Poll due subscriptions until none are left."""
+        loop = asyncio.get_running_loop()
+
+        while self._subscriptions:
+            now = loop.time()
+            due = [s for s in self._subscriptions if s.next_due <= now]
+
+            if due:
+                await self._poll(due)
+                for subscription in due:
+                    subscription.next_due += subscription.interval
+                    if subscription.next_due <= now:
+                        # Skip missed ticks rather than bursting to catch up
+                        subscription.next_due = now + subscription.interval
+
+            if not self._subscriptions:
+                break
+
+            delay = min(s.next_due for s in self._subscriptions) - loop.time()
+            self._wakeup.clear()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _poll(self, due: List[Subscription]):
+        """Fetch the union of the due subscriptions' states and dispatch it."""
+        client = self._client
+        if not client.is_connected:
+            return
+
+        # States missing from this aircraft's manifest are skipped, so a
+        # subscription can list fallbacks that only some aircraft provide
+        names = [
+            name
+            for name in dict.fromkeys(n for s in due for n in s.state_names)
+            if client.has_state(name)
+        ]
+
+        try:
+            values = await client.get_states(names)
+        except Exception as e:
+            client.last_error = str(e)
+            for subscription in due:
+                if subscription.on_error:
+                    self._invoke(subscription.on_error, e)
+            return
+
+        for subscription in due:
+            subscription_values = {
+                n: values[n] for n in subscription.state_names if n in values
+            }
+            subscription.observe(subscription_values)
+            self._invoke(subscription.callback, subscription_values)
+
+    @staticmethod
+    def _invoke(callback: Callable, arg: Any):
+        """Run a subscriber callback without letting it break the poll loop."""
+        try:
+            result = callback(arg)
+            if asyncio.iscoroutine(result):
+                asyncio.get_running_loop().create_task(result)
+        except Exception:
+            # A misbehaving subscriber must not stop the other feeds
+            pass
@@ -0,0 +1,115 @@
+import json
+import math
+import struct
+from typing import Any, Callable, Dict, List, Tuple
+
+from .codec import DataType
+from .recorder import (
+    CHUNK_HEADER,
+    CHUNK_MAGIC,
+    COLUMN_TYPES,
+    FILE_HEADER,
+    FORMAT_VERSION,
+    MAGIC,
+)
+
+AIRCRAFT_NAME = "Benchmark 737"
+
+# States the web app's location feed polls, moving along a straight track
+LOCATION_STATES: Dict[str, Callable[[float], float]] = {
+    "aircraft/0/latitude": lambda t: 47.0 + t * 1e-4,
+    "aircraft/0/longitude": lambda t: 8.0 + t * 1e-4,
+    "aircraft/0/altitude_msl": lambda t: 3000.0 + 10.0 * math.sin(t),
+    "aircraft/0/altitude_agl": lambda t: 2500.0 + 10.0 * math.sin(t),
+    "aircraft/0/heading_true": lambda t: (t * 3.0) % 360.0,
+    "aircraft/0/heading_magnetic": lambda t: (t * 3.0 + 2.0) % 360.0,
+    "aircraft/0/indicated_airspeed": lambda t: 128.0 + math.sin(t),
+    "aircraft/0/groundspeed": lambda t: 130.0 + math.sin(t),
+}
+
+# Data types the filler states cycle through, with their wire formats
+_FILLER_TYPES = (DataType.FLOAT, DataType.INTEGER, DataType.BOOLEAN, DataType.DOUBLE)
+_FORMATS = {
+    DataType.BOOLEAN: "B",
+    DataType.INTEGER: "i",
+    DataType.FLOAT: "f",
+    DataType.DOUBLE: "d",
+    DataType.LONG: "q",
+}
+
+
+def synthetic_states(count: int) -> List[Tuple[str, DataType]]:
+    """The states of a synthetic manifest of about ``count`` states.
+
+    The location states and the aircraft name come first, then filler
+    states of mixed types under ``aircraft/0/systems/bench``.
+    """
+    states = [(name, DataType.DOUBLE) for name in LOCATION_STATES]
+    states.append(("aircraft/0/name", DataType.STRING))
+    for i in range(max(count - len(states), 0)):
+        states.append(
+            (
+                f"aircraft/0/systems/bench/{i // 100}/state_{i}",
+                _FILLER_TYPES[i % len(_FILLER_TYPES)],
+            )
+        )
+    return states
+
+
+def _sample(name: str, data_type: DataType, column: int, t: float) -> Any:
+    """The value of one synthetic state at ``t`` seconds into the flight."""
+    if name in LOCATION_STATES:
+        return LOCATION_STATES[name](t)
+    if data_type == DataType.STRING:
+        return AIRCRAFT_NAME
+    if data_type == DataType.BOOLEAN:
+        return int(t) % 2
+    if data_type == DataType.INTEGER:
+        return int(t) + column
+    return column + math.sin(t)
+
+
+def write_recording(path: str, state_count: int, rows: int = 600, rate: float = 10):
+    """Write a synthetic flight in the ``TelemetryRecorder`` format.
+
+    Args:
+        path: The ``.iftr`` file to create
+        state_count: Number of states in the manifest
+        rows: Number of samples
+        rate: Samples per second
+    """
+    states = synthetic_states(state_count)
+    header = json.dumps(
+        {
+            "states": [
+                {
+                    "name": name,
+                    "type": data_type.name,
+                    "dtype": COLUMN_TYPES.get(data_type, (None, None))[1],
+                }
+                for name, data_type in states
+            ],
+            "rate": rate,
+            "started": 0.0,
+            "device": {"aircraft": AIRCRAFT_NAME, "version": "benchmark"},
+        }
+    ).encode("utf-8")
+
+    times = [row / rate for row in range(rows)]
+    columns = [struct.pack(f"<{rows}d", *(1_700_000_000 + t for t in times))]
+    for column, (name, data_type) in enumerate(states):
+        values = [_sample(name, data_type, column, t) for t in times]
+        columns.append(bytes([1]) * rows)  # Every sample has a value
+        if data_type == DataType.STRING:
+            encoded = [value.encode("utf-8") for value in values]
+            columns.append(struct.pack(f"<{rows}I", *map(len, encoded)))
+            columns.append(b"".join(encoded))
+        else:
+            columns.append(struct.pack(f"<{rows}{_FORMATS[data_type]}", *values))
+    payload = b"".join(columns)
+
+    with open(path, "xb") as file:
+        file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(header)))
+        file.write(header)
+        file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, rows, len(payload)))
+        file.write(payload)
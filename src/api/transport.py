@@ -0,0 +1,240 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .codec import REPLY_HEADER
+from .metrics import ClientMetrics
+
+# Seconds past its timeout that an abandoned request may still get a reply
+LATE_REPLY_GRACE = 5.0
+
+
+class FrameProtocol(asyncio.BufferedProtocol):
+    """Request multiplexer for a Connect API v2 connection.
+
+    The event loop receives straight into a preallocated buffer
+    (``recv_into``), and each complete ``<ii`` frame is decoded in place
+    through a memoryview, so no intermediate ``bytes`` objects are built.
+    Unparsed bytes are compacted to the front of the buffer rather than
+    wrapped around it, keeping every frame contiguous for ``unpack_from``.
+
+    Callers register a future per request with ``expect`` right before
+    writing it. The sim answers requests for the same state in order, so
+    each reply resolves the oldest pending future of its state ID, and any
+    number of callers can share the connection without locking.
+
+    A request whose caller gave up keeps its place, so a late reply is not
+    handed to the next caller, but only while nobody behind it is still
+    waiting: otherwise its reply is taken as lost and skipped, and one
+    dropped reply cannot shift every later one. Abandoned requests expire
+    ``LATE_REPLY_GRACE`` seconds after their timeout.
+
+    Traffic, reply round trips and stray replies are counted in a
+    ``ClientMetrics``.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[int, memoryview], Any],
+        buffer_size: int = 64 * 1024,
+        on_lost: Optional[Callable[[Optional[Exception]], Any]] = None,
+        metrics: Optional[ClientMetrics] = None,
+    ):
+        """Initialize the protocol.
+
+        Args:
+            decode: Turns a frame's state ID and payload view into a value.
+                The view is only valid for the duration of the call.
+            buffer_size: Initial receive buffer size in bytes
+            on_lost: Called with the error (None on EOF) once the
+                connection is gone, after pending requests have failed
+            metrics: Where to count traffic and reply latencies
+        """
+        self._decode = decode
+        self._on_lost = on_lost
+        self.metrics = metrics if metrics is not None else ClientMetrics()
+        self._default_size = buffer_size
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # First unparsed byte
+        self._end = 0  # End of received data
+        # Waiting requests per state ID, with the loop time they were sent
+        # and the time after which an abandoned one is given up on
+        self._pending: Dict[int, Deque[Tuple[asyncio.Future, float, float]]] = {}
+        self._now: Callable[[], float] = time.monotonic
+        self._transport: Optional[asyncio.Transport] = None
+        self._closed: Optional[Exception] = None
+        self._can_write: Optional[asyncio.Event] = None
+
+    def connection_made(self, transport: asyncio.Transport):
+        self._transport = transport
+        self._now = asyncio.get_running_loop().time
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self._closed = RuntimeError("Connection closed while reading data")
+        pending = self._pending
+        self._pending = {}
+        for waiters in pending.values():
+            for waiter, _, _ in waiters:
+                if not waiter.done():
+                    waiter.set_exception(self._closed)
+        if self._can_write:
+            self._can_write.set()
+        if self._on_lost:
+            self._on_lost(exc)
+
+    def pause_writing(self):
+        self._can_write.clear()
+
+    def resume_writing(self):
+        self._can_write.set()
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif len(self._buffer) - self._end < 4096:
+            # Compact: slide the partial frame to the front of the buffer
+            pending = self._end - self._start
+            self._buffer[:pending] = self._view[self._start : self._end]
+            self._start, self._end = 0, pending
+
+        if len(self._buffer) - self._end < 4096:
+            self._resize(len(self._buffer) * 2)
+
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int):
+        self._end += nbytes
+        self.metrics.bytes_received += nbytes
+
+        while self._end - self._start >= REPLY_HEADER.size:
+            state_id, length = REPLY_HEADER.unpack_from(self._buffer, self._start)
+            frame_end = self._start + REPLY_HEADER.size + length
+
+            if frame_end > self._end:
+                # Make sure a frame larger than the buffer (e.g. the manifest)
+                # can arrive in full
+                needed = REPLY_HEADER.size + length
+                if needed > len(self._buffer):
+                    self._resize(needed)
+                break
+
+            self._resolve(state_id, self._start + REPLY_HEADER.size, frame_end)
+            self._start = frame_end
+
+        if self._start == self._end:
+            self._start = self._end = 0
+            if len(self._buffer) > self._default_size:
+                # Give back the memory borrowed for an oversized frame
+                self._resize(self._default_size)
+
+    def _resolve(self, state_id: int, start: int, end: int):
+        """Hand a reply to the oldest request waiting on its state ID."""
+        waiters = self._pending.get(state_id)
+        if not waiters:
+            self.metrics.errors["unexpected_reply"] += 1
+            return  # Nobody asked; skip decoding
+
+        # A caller that timed out keeps its place in the queue, so its late
+        # reply is consumed here instead of going to the next caller. With
+        # a caller still waiting behind it, though, the reply is taken to
+        # be that caller's, and the abandoned requests before it as lost.
+        if waiters[0][0].done():
+            waiting = next(
+                (i for i, (w, _, _) in enumerate(waiters) if not w.done()), 0
+            )
+            for _ in range(waiting):
+                waiters.popleft()
+                self.metrics.errors["lost_reply"] += 1
+        waiter, sent, _ = waiters.popleft()
+        if not waiters:
+            del self._pending[state_id]
+        if waiter.done():
+            self.metrics.errors["late_reply"] += 1
+            return
+
+        payload = self._view[start:end]
+        try:
+            waiter.set_result(self._decode(state_id, payload))
+        except Exception as e:
+            self.metrics.errors["decode"] += 1
+            waiter.set_exception(e)
+        else:
+            self.metrics.observe_reply(state_id, self._now() - sent)
+        finally:
+            payload.release()
+
+    def _resize(self, size: int):
+        """Replace the buffer, keeping any unparsed bytes."""
+        pending = self._end - self._start
+        buffer = bytearray(max(size, pending))
+        buffer[:pending] = self._view[self._start : self._end]
+        self._view.release()
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._start, self._end = 0, pending
+
+    def expect(self, state_id: int, timeout: float) -> asyncio.Future:
+        """Register a pending reply for a request about to be written.
+
+        Args:
+            state_id: The state ID the request asks for
+            timeout: Seconds the caller will wait for the reply
+
+        Returns:
+            A future resolved with the decoded reply value
+        """
+        if self._closed or not self._transport:
+            raise RuntimeError("Not connected to Infinite Flight")
+
+        now = self._now()
+        waiters = self._pending.setdefault(state_id, deque())
+        # Requests abandoned long ago are not getting a reply any more
+        while waiters and waiters[0][0].done() and waiters[0][2] <= now:
+            waiters.popleft()
+            self.metrics.errors["lost_reply"] += 1
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append((waiter, now, now + timeout + LATE_REPLY_GRACE))
+        self.metrics.gets += 1
+        return waiter
+
+    def withdraw(self, state_id: int, waiter: asyncio.Future):
+        """Unregister a reply whose request was never written.
+
+        Args:
+            state_id: The state ID passed to ``expect``
+            waiter: The future ``expect`` returned
+        """
+        waiter.cancel()
+        waiters = self._pending.get(state_id)
+        if not waiters:
+            return
+        # Withdrawn requests are the most recent ones
+        for index in range(len(waiters) - 1, -1, -1):
+            if waiters[index][0] is waiter:
+                del waiters[index]
+                self.metrics.gets -= 1
+                break
+        if not waiters:
+            del self._pending[state_id]
+
+    def write(self, data):
+        """Queue bytes on the transport.
+
+        The transport may keep a reference to ``data`` until the socket
+        accepts it, so it must not be modified afterwards.
+        """
+        if self._closed or not self._transport:
+            raise RuntimeError("Not connected to Infinite Flight")
+        self._transport.write(data)
+        self.metrics.bytes_sent += len(data)
+
+    async def drain(self):
+        """Wait until the transport's write buffer is below its high-water mark."""
+        await self._can_write.wait()
+        if self._closed:
+            raise self._closed
@@ -0,0 +1,7 @@
+"""Helpers for the Socket.IO web interface."""
+
+from .delta import DeltaTracker
+from .flightplan import FlightPlanTracker
+from .telemetry import TelemetryEncoder
+
+__all__ = ["DeltaTracker", "FlightPlanTracker", "TelemetryEncoder"]
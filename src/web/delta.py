@@ -0,0 +1,74 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class DeltaTracker:
+    """Tracks the last-sent value of each state to emit only what changed.
+
+    Numeric values count as changed once they move further than their
+    epsilon from the value last sent; anything else is compared for
+    equality. A full keyframe is sent periodically so late joiners and
+    dropped packets converge.
+    """
+
+    def __init__(
+        self,
+        epsilons: Optional[Dict[str, float]] = None,
+        default_epsilon: float = 0.0,
+        keyframe_interval: float = 5.0,
+    ):
+        """Initialize the tracker.
+
+        Args:
+            epsilons: Per-state change threshold, keyed by state name
+            default_epsilon: Threshold for states without their own epsilon
+            keyframe_interval: Seconds between full keyframes
+        """
+        self.epsilons = epsilons or {}
+        self.default_epsilon = default_epsilon
+        self.keyframe_interval = keyframe_interval
+        self._last_sent: Dict[str, Any] = {}
+        self._last_keyframe: Optional[float] = None
+
+    def reset(self):
+        """Force the next update to be a full keyframe."""
+        self._last_keyframe = None
+
+    def update(self, values: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Compare fresh values against the last-sent ones.
+
+        Args:
+            values: Latest state name -> value
+
+        Returns:
+            The values to send and whether they form a full keyframe
+        """
+        now = time.monotonic()
+        if (
+            self._last_keyframe is None
+            or now - self._last_keyframe >= self.keyframe_interval
+        ):
+            self._last_keyframe = now
+            self._last_sent = dict(values)
+            return dict(values), True
+
+        changed = {}
+        for name, value in values.items():
+            if name not in self._last_sent or self._has_changed(
+                name, self._last_sent[name], value
+            ):
+                changed[name] = value
+                self._last_sent[name] = value
+
+        return changed, False
+
+    def _has_changed(self, name: str, old: Any, new: Any) -> bool:
+        """Check whether a value moved beyond its state's epsilon."""
+        if (
+            isinstance(old, (int, float))
+            and isinstance(new, (int, float))
+            and not isinstance(old, bool)
+            and not isinstance(new, bool)
+        ):
+            return abs(new - old) > self.epsilons.get(name, self.default_epsilon)
+        return old != new
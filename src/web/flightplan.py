@@ -0,0 +1,124 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+
+class FlightPlanTracker:
+    """Turns the raw ``flightplan/full_info`` string into incremental updates.
+
+    The raw payload is hashed and nothing is produced while it is
+    unchanged. Otherwise the plan is split into its summary fields
+    (distances, ETE/ETA, cross-track ...), of which only the changed ones
+    are sent, and its waypoint list (``detailedInfo.flightPlanItems``),
+    which is sent as a single splice when the plan is edited.
+
+    Updates are dicts with ``keyframe`` (True when ``fields`` holds every
+    field rather than just the changed ones), ``fields``, and either the
+    full ``waypoints`` list or a ``waypointsSplice`` of ``start``,
+    ``deleteCount`` and ``items``.
+    """
+
+    def __init__(self):
+        self._digest: Optional[bytes] = None
+        self._fields: Dict[str, Any] = {}
+        self._waypoints: Optional[List[Any]] = None
+        self._keyframe_pending = True
+
+    def reset(self):
+        """Force the next update to be a full keyframe."""
+        self._keyframe_pending = True
+
+    def clear(self) -> bool:
+        """Forget the current plan.
+
+        Returns:
+            True if there was a plan (or nothing was sent yet) to clear
+        """
+        cleared = self._digest != b"" or self._keyframe_pending
+        self._digest = b""
+        self._fields = {}
+        self._waypoints = None
+        self._keyframe_pending = False
+        return cleared
+
+    def update(self, raw: str) -> Optional[Dict[str, Any]]:
+        """Compare a fresh flight plan payload against the last one sent.
+
+        Args:
+            raw: The flight plan JSON string
+
+        Returns:
+            The update to send, or None if nothing changed
+
+        Raises:
+            ValueError: If the payload is not a JSON object
+        """
+        digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+        if digest == self._digest and not self._keyframe_pending:
+            return None
+        # A plan following a cleared or unreadable one is sent in full, too
+        keyframe = self._keyframe_pending or not self._fields
+        self._digest = digest
+
+        try:
+            plan = json.loads(raw)
+            if not isinstance(plan, dict):
+                raise ValueError("Flight plan is not a JSON object")
+        except ValueError:
+            # Report a bad payload once, then send the next good one in full
+            self._fields = {}
+            self._waypoints = None
+            raise
+
+        detailed_info = dict(plan.pop("detailedInfo", None) or {})
+        waypoints = detailed_info.pop("flightPlanItems", None)
+        plan["detailedInfo"] = detailed_info
+
+        if keyframe:
+            self._keyframe_pending = False
+            self._fields = plan
+            self._waypoints = waypoints
+            return {"keyframe": True, "fields": plan, "waypoints": waypoints}
+
+        fields = {
+            name: value
+            for name, value in plan.items()
+            if name not in self._fields or self._fields[name] != value
+        }
+        for name in self._fields.keys() - plan.keys():
+            fields[name] = None
+        self._fields = plan
+
+        update: Dict[str, Any] = {"keyframe": False, "fields": fields}
+
+        if waypoints != self._waypoints:
+            if waypoints is None or self._waypoints is None:
+                update["waypoints"] = waypoints
+            else:
+                update["waypointsSplice"] = self._splice(self._waypoints, waypoints)
+            self._waypoints = waypoints
+
+        if not update["fields"] and len(update) == 2:
+            return None  # Only key order or formatting changed
+        return update
+
+    @staticmethod
+    def _splice(old: List[Any], new: List[Any]) -> Dict[str, Any]:
+        """Describe the edit from ``old`` to ``new`` as one array splice."""
+        start = 0
+        limit = min(len(old), len(new))
+        while start < limit and old[start] == new[start]:
+            start += 1
+
+        old_end, new_end = len(old), len(new)
+        while (
+            old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]
+        ):
+            old_end -= 1
+            new_end -= 1
+
+        return {
+            "start": start,
+            "deleteCount": old_end - start,
+            "items": new[start:new_end],
+        }
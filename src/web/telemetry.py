@@ -0,0 +1,139 @@
+import struct
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..api.codec import DataType, ensure_capacity
+
+# Frame header: format version + number of entries
+FRAME_HEADER = struct.Struct("<BH")
+FRAME_VERSION = 1
+
+# Type tag of an entry whose value could not be read (no payload follows)
+NULL_TAG = 0xFF
+
+# Largest index an entry can carry (uint16)
+MAX_INDEX = 0xFFFF
+
+# Longest string value, in UTF-8 bytes (its length is a uint16)
+MAX_STRING_BYTES = 0xFFFF
+
+# Entry layouts, precompiled per data type: uint16 index, uint8 type tag
+# and the value. Strings are a uint16 byte length followed by the UTF-8.
+_ENTRY_STRUCTS = {
+    data_type: struct.Struct("<HB" + value_format)
+    for data_type, value_format in (
+        (DataType.BOOLEAN, "?"),
+        (DataType.INTEGER, "i"),
+        (DataType.FLOAT, "f"),
+        (DataType.DOUBLE, "d"),
+        (DataType.LONG, "q"),
+        (DataType.STRING, "H"),
+    )
+}
+_STRING_ENTRY = _ENTRY_STRUCTS[DataType.STRING]
+_NULL_ENTRY = struct.Struct("<HB")
+_MAX_ENTRY_SIZE = max(entry.size for entry in _ENTRY_STRUCTS.values())
+
+
+class TelemetryEncoder:
+    """Packs raw state values into compact binary frames for one viewer.
+
+    States are numbered in the order the viewer subscribes to them, and
+    frames refer to states by that index instead of by name. A frame is
+    little-endian: a ``uint8`` version and ``uint16`` entry count, then per
+    entry a ``uint16`` index, a ``uint8`` type tag (the state's
+    ``DataType``, or ``NULL_TAG``) and the raw value, so the browser can
+    walk it with a ``DataView`` and format the values itself.
+    """
+
+    def __init__(self, type_of: Callable[[str], Optional[DataType]]):
+        """Initialize the encoder.
+
+        Args:
+            type_of: Looks up the data type of a state (e.g.
+                ``client.get_state_type``)
+        """
+        self._type_of = type_of
+        self._index: Dict[str, int] = {}
+        self._types: List[Optional[DataType]] = []
+        # Each registered state's entry layout (None if it has no type)
+        self._structs: List[Optional[struct.Struct]] = []
+        # Reused between frames, grown as needed
+        self._buffer = bytearray(256)
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """State name -> index, for every state registered so far."""
+        return dict(self._index)
+
+    def register(self, state_names: Iterable[str]) -> Dict[str, int]:
+        """Assign indices to states, keeping those already assigned.
+
+        Args:
+            state_names: The states the viewer will receive
+
+        Returns:
+            The index of each of the given states
+
+        Raises:
+            ValueError: If the viewer would exceed the index space
+        """
+        assigned = {}
+        for name in state_names:
+            index = self._index.get(name)
+            if index is None:
+                index = len(self._types)
+                if index > MAX_INDEX:
+                    raise ValueError("Too many states for one telemetry session")
+                data_type = self._type_of(name)
+                self._index[name] = index
+                self._types.append(data_type)
+                self._structs.append(_ENTRY_STRUCTS.get(data_type))
+            assigned[name] = index
+        return assigned
+
+    def encode(self, values: Dict[str, Any]) -> bytes:
+        """Pack state values into a frame.
+
+        Args:
+            values: State name -> raw value. Unregistered states are skipped.
+
+        Returns:
+            The binary frame
+        """
+        buffer = self._buffer
+        # Room for every entry but the string bytes, added as they come
+        size = FRAME_HEADER.size + _MAX_ENTRY_SIZE * len(values)
+        ensure_capacity(buffer, size)
+        offset = FRAME_HEADER.size
+        count = 0
+
+        for name, value in values.items():
+            index = self._index.get(name)
+            if index is None:
+                continue
+            count += 1
+            entry = self._structs[index]
+            if value is None or entry is None:
+                _NULL_ENTRY.pack_into(buffer, offset, index, NULL_TAG)
+                offset += _NULL_ENTRY.size
+            elif entry is _STRING_ENTRY:
+                encoded = str(value).encode("utf-8")
+                if len(encoded) > MAX_STRING_BYTES:
+                    # Cut on a character boundary, not inside one
+                    encoded = (
+                        encoded[:MAX_STRING_BYTES]
+                        .decode("utf-8", "ignore")
+                        .encode("utf-8")
+                    )
+                entry.pack_into(buffer, offset, index, DataType.STRING, len(encoded))
+                offset += entry.size
+                size += len(encoded)
+                ensure_capacity(buffer, size)
+                buffer[offset : offset + len(encoded)] = encoded
+                offset += len(encoded)
+            else:
+                entry.pack_into(buffer, offset, index, self._types[index], value)
+                offset += entry.size
+
+        FRAME_HEADER.pack_into(buffer, 0, FRAME_VERSION, count)
+        return bytes(buffer[:offset])
@@ -76,6 +76,11 @@ function setupEventListeners() {
     //         }
     //     });
     // }
+
+    // Let the server idle this device's feeds while the page is hidden
+    document.addEventListener('visibilitychange', () => {
+        socket.emit('viewer_visibility', { visible: document.visibilityState === 'visible' });
+    });
 }
 
 // Socket Event Listeners
@@ -90,12 +95,17 @@ function setupSocketListeners() {
         currentDevices = [];
     });
 
+    // Pushed whenever a device appears or its details change
     socket.on('device_found', (device) => {
         console.log('Device found:', device);
-        currentDevices.push(device);
         addDeviceToList(device);
     });
 
+    socket.on('device_lost', (data) => {
+        console.log('Device lost:', data.deviceId);
+        removeDeviceFromList(data.deviceId);
+    });
+
     socket.on('discovery_complete', (data) => {
         showDiscoveryStatus(data.message, 'complete');
         if (data.count === 0) {
@@ -120,44 +130,85 @@ function setupSocketListeners() {
         displayCategories(data.categories);
     });
 
-    socket.on('category_states', (data) => {
+    // Category pages stream in: start (page bounds), chunks, done
+    socket.on('category_states_start', (data) => {
+        if (data.requestId !== categoryRequest.id) return;
+
         const statesLoading = document.getElementById('statesLoading');
         const statesList = document.getElementById('statesList');
 
         statesLoading.style.display = 'none';
         statesList.style.display = 'block';
+        removeLoadMoreButton();
 
-        if (data.states && data.states.length > 0) {
+        if (data.total === 0) {
             statesList.innerHTML = `
-                <div style="margin-bottom: 16px; color: #8892b0;">
-                    Showing ${data.count} states for ${data.category}
+                <div style="text-align: center; padding: 40px; color: #8892b0;">
+                    No states found for this category
                 </div>
             `;
+            return;
+        }
+
+        categoryRequest.total = data.total;
+        categoryRequest.nextOffset = data.offset + data.count;
+        if (data.offset === 0) {
+            statesList.innerHTML = `
+                <div class="states-summary" style="margin-bottom: 16px; color: #8892b0;"></div>
+            `;
+        }
+        statesList.querySelector('.states-summary').textContent =
+            `Showing ${categoryRequest.nextOffset} of ${data.total} states for ${data.prefix}`;
+    });
 
-            data.states.forEach(state => {
-                const stateItem = document.createElement('div');
-                stateItem.className = 'state-item';
+    socket.on('category_states_chunk', (data) => {
+        if (data.requestId !== categoryRequest.id) return;
 
-                const valueClass = state.value === 'N/A' ? 'na' : '';
+        const statesList = document.getElementById('statesList');
+        const fragment = document.createDocumentFragment();
 
-                stateItem.innerHTML = `
-                    <div class="state-name">${state.displayName}</div>
-                    <div class="state-type">${state.type}</div>
-                    <div class="state-value ${valueClass}">${state.value}</div>
-                `;
+        data.states.forEach(state => {
+            const stateItem = document.createElement('div');
+            stateItem.className = 'state-item';
+            stateItem.dataset.name = state.name;
 
-                statesList.appendChild(stateItem);
-            });
-        } else {
-            statesList.innerHTML = `
-                <div style="text-align: center; padding: 40px; color: #8892b0;">
-                    No states found for this category
-                </div>
+            const valueClass = state.value === 'N/A' ? 'na' : '';
+
+            stateItem.innerHTML = `
+                <div class="state-name">${state.displayName}</div>
+                <div class="state-type">${state.type}</div>
+                <div class="state-value ${valueClass}">${state.value}</div>
             `;
+
+            fragment.appendChild(stateItem);
+            liveStateValues.set(state.name, stateItem.querySelector('.state-value'));
+        });
+
+        statesList.appendChild(fragment);
+    });
+
+    socket.on('category_states_done', (data) => {
+        if (data.requestId !== categoryRequest.id) return;
+
+        // Keep the rows shown so far ticking while the modal is open
+        socket.emit('subscribe_states', {
+            states: Array.from(liveStateValues.keys()),
+            rate: LIVE_STATES_RATE,
+            binary: true,
+        });
+
+        if (categoryRequest.nextOffset < categoryRequest.total) {
+            const loadMore = document.createElement('button');
+            loadMore.className = 'btn btn-primary load-more-btn';
+            loadMore.textContent = 'Load more';
+            loadMore.onclick = () => requestCategoryPage(categoryRequest.nextOffset);
+            document.getElementById('statesList').appendChild(loadMore);
         }
     });
 
     socket.on('category_states_error', (data) => {
+        if (data.requestId !== undefined && data.requestId !== categoryRequest.id) return;
+
         const statesLoading = document.getElementById('statesLoading');
         const statesList = document.getElementById('statesList');
 
@@ -192,6 +243,30 @@ function setupSocketListeners() {
     socket.on('flight_plan_update', (data) => {
         updateFlightPlanDisplay(data);
     });
+
+    socket.on('states_subscribed', (data) => {
+        if (data.index) {
+            for (const [name, index] of Object.entries(data.index)) {
+                telemetryNames[index] = name;
+            }
+        }
+    });
+
+    socket.on('states_update', (data) => {
+        showLiveStates(data.values);
+    });
+
+    socket.on('states_frame', (buffer) => {
+        const formatted = {};
+        decodeTelemetryFrame(buffer).forEach(({ name, type, value }) => {
+            formatted[name] = formatStateValue(name, type, value);
+        });
+        showLiveStates(formatted);
+    });
+
+    socket.on('subscription_error', (data) => {
+        console.error('State subscription error:', data.error);
+    });
 }
 
 // Discovery Functions
@@ -208,14 +283,47 @@ function showDiscoveryStatus(message, type = 'info') {
     discoveryStatus.className = `discovery-status ${type}`;
 }
 
+function findDeviceCard(deviceId) {
+    return Array.from(deviceList.querySelectorAll('.device-card'))
+        .find(card => card.dataset.deviceId === deviceId);
+}
+
 function addDeviceToList(device) {
+    const index = currentDevices.findIndex(d => d.deviceId === device.deviceId);
+    if (index >= 0) {
+        currentDevices[index] = device;
+    } else {
+        currentDevices.push(device);
+    }
+
     const deviceCard = createDeviceCard(device);
-    deviceList.appendChild(deviceCard);
+    const existing = findDeviceCard(device.deviceId);
+    if (existing) {
+        existing.replaceWith(deviceCard);
+    } else {
+        const placeholder = deviceList.querySelector('.no-devices');
+        if (placeholder) {
+            placeholder.remove();
+        }
+        deviceList.appendChild(deviceCard);
+    }
+}
+
+function removeDeviceFromList(deviceId) {
+    currentDevices = currentDevices.filter(d => d.deviceId !== deviceId);
+    const card = findDeviceCard(deviceId);
+    if (card) {
+        card.remove();
+    }
+    if (currentDevices.length === 0) {
+        showNoDevicesFound();
+    }
 }
 
 function createDeviceCard(device) {
     const card = document.createElement('div');
     card.className = 'device-card';
+    card.dataset.deviceId = device.deviceId;
 
     const stateClass = device.state.toLowerCase().replace(' ', '-');
 
@@ -249,7 +357,7 @@ function createDeviceCard(device) {
 
 function showNoDevicesFound() {
     deviceList.innerHTML = `
-        <div style="text-align: center; padding: 40px; color: #8892b0;">
+        <div class="no-devices" style="text-align: center; padding: 40px; color: #8892b0;">
             <p>No devices found</p>
             <p style="margin-top: 10px; font-size: 0.9rem;">
                 Make sure Infinite Flight is running with Connect API enabled
@@ -265,10 +373,18 @@ function connectToDevice(host, port) {
     const device = currentDevices.find(d => d.preferredIp === host && d.port === port);
     if (device) {
         currentConnection = { host, port, aircraft: device.aircraft, livery: device.livery };
+        // Device identity lets the server reuse a cached manifest
+        socket.emit('connect_to_device', {
+            host,
+            port,
+            deviceId: device.deviceId,
+            version: device.version,
+            aircraft: device.aircraft,
+        });
     } else {
         currentConnection = { host, port, aircraft: 'N/A', livery: 'N/A' }; // Fallback
+        socket.emit('connect_to_device', { host, port });
     }
-    socket.emit('connect_to_device', { host, port });
 }
 
 function disconnectFromDevice() {
@@ -293,6 +409,14 @@ function handleConnectionStatus(data) {
             statusText.textContent = 'Connecting...';
             break;
 
+        case 'reconnecting':
+            // The server retries on its own; keep the last values on screen
+            isConnected = false;
+            statusIndicator.className = 'status-indicator connecting';
+            statusText.textContent = 'Reconnecting...';
+            showDiscoveryStatus(data.message || 'Reconnecting...', 'info');
+            break;
+
         case 'connected':
             isConnected = true;
             statusIndicator.className = 'status-indicator connected';
@@ -374,6 +498,12 @@ function displayCategories(categories) {
 }
 
 // Category States Modal
+// The page request in flight; replies to older requests are ignored
+let categoryRequest = { id: 0, category: null, total: 0, nextOffset: 0 };
+// Value cells of the listed states, by state name, for live updates
+const liveStateValues = new Map();
+const LIVE_STATES_RATE = 1; // Hz
+
 function showCategoryStates(category) {
     const modal = document.getElementById('statesModal');
     const modalTitle = document.getElementById('modalTitle');
@@ -386,14 +516,52 @@ function showCategoryStates(category) {
     statesLoading.style.display = 'flex';
     statesList.style.display = 'none';
     statesList.innerHTML = '';
+    stopLiveStates();
 
-    // Request states for this category
-    socket.emit('get_category_states', { category });
+    // Request the first page of states for this category
+    categoryRequest = { id: categoryRequest.id + 1, category, total: 0, nextOffset: 0 };
+    requestCategoryPage(0);
+}
+
+function requestCategoryPage(offset) {
+    removeLoadMoreButton();
+    categoryRequest.id += 1;
+    socket.emit('get_category_states', {
+        category: categoryRequest.category,
+        offset,
+        requestId: categoryRequest.id,
+    });
+}
+
+function removeLoadMoreButton() {
+    const loadMore = document.querySelector('#statesList .load-more-btn');
+    if (loadMore) {
+        loadMore.remove();
+    }
 }
 
 function closeStatesModal() {
     const modal = document.getElementById('statesModal');
     modal.style.display = 'none';
+    categoryRequest.id += 1; // Drop anything still streaming in
+    stopLiveStates();
+}
+
+function showLiveStates(values) {
+    for (const [name, value] of Object.entries(values)) {
+        const valueElement = liveStateValues.get(name);
+        if (valueElement) {
+            valueElement.textContent = value;
+            valueElement.classList.toggle('na', value === 'N/A');
+        }
+    }
+}
+
+function stopLiveStates() {
+    if (liveStateValues.size > 0) {
+        socket.emit('unsubscribe_states', { states: Array.from(liveStateValues.keys()) });
+        liveStateValues.clear();
+    }
 }
 
 // Close modal when clicking outside
@@ -413,6 +581,88 @@ function hideLoading() {
     loadingOverlay.style.display = 'none';
 }
 
+// Binary Telemetry
+// Frames from the server (see src/web/telemetry.py) are little-endian:
+// uint8 version, uint16 entry count, then per entry a uint16 state index,
+// a uint8 data type tag and the raw value.
+const TELEMETRY_TYPES = { BOOLEAN: 0, INTEGER: 1, FLOAT: 2, DOUBLE: 3, STRING: 4, LONG: 5, NULL: 0xFF };
+const telemetryDecoder = new TextDecoder();
+// State name of each index, filled in from the states_subscribed replies
+const telemetryNames = [];
+
+function decodeTelemetryFrame(buffer) {
+    const view = new DataView(buffer);
+    const count = view.getUint16(1, true);
+    const entries = [];
+    let offset = 3;
+
+    for (let i = 0; i < count; i++) {
+        const index = view.getUint16(offset, true);
+        const type = view.getUint8(offset + 2);
+        offset += 3;
+
+        let value = null;
+        switch (type) {
+            case TELEMETRY_TYPES.BOOLEAN:
+                value = view.getUint8(offset) !== 0;
+                offset += 1;
+                break;
+            case TELEMETRY_TYPES.INTEGER:
+                value = view.getInt32(offset, true);
+                offset += 4;
+                break;
+            case TELEMETRY_TYPES.FLOAT:
+                value = view.getFloat32(offset, true);
+                offset += 4;
+                break;
+            case TELEMETRY_TYPES.DOUBLE:
+                value = view.getFloat64(offset, true);
+                offset += 8;
+                break;
+            case TELEMETRY_TYPES.LONG:
+                value = view.getBigInt64(offset, true);
+                offset += 8;
+                break;
+            case TELEMETRY_TYPES.STRING: {
+                const length = view.getUint16(offset, true);
+                value = telemetryDecoder.decode(new Uint8Array(buffer, offset + 2, length));
+                offset += 2 + length;
+                break;
+            }
+        }
+
+        const name = telemetryNames[index];
+        if (name !== undefined) {
+            entries.push({ name, type, value });
+        }
+    }
+    return entries;
+}
+
+// Same display rules as _format_state_value in app.py
+function formatStateValue(name, type, value) {
+    if (value === null) return 'N/A';
+
+    switch (type) {
+        case TELEMETRY_TYPES.BOOLEAN:
+            return value ? 'Yes' : 'No';
+        case TELEMETRY_TYPES.FLOAT:
+        case TELEMETRY_TYPES.DOUBLE:
+            if (name.includes('latitude') || name.includes('longitude')) {
+                return value.toFixed(6);
+            } else if (name.includes('altitude') || name.includes('speed')) {
+                return value.toFixed(1);
+            } else if (name.includes('heading') || name.includes('pitch') || name.includes('bank')) {
+                return `${value.toFixed(1)}°`;
+            }
+            return value.toFixed(2);
+        case TELEMETRY_TYPES.STRING:
+            return value || '(empty)';
+        default:
+            return String(value);
+    }
+}
+
 // Location Updates
 function updateLocationDisplay(data) {
     // Update each location value
@@ -444,131 +694,80 @@ function updateLocationDisplay(data) {
 }
 
 // Flight Plan Display
-function updateFlightPlanDisplay(rawData) {
-    let data;
-    if (typeof rawData === 'string') {
-        try {
-            data = JSON.parse(rawData);
-        } catch (e) {
-            console.error("Error parsing flight plan JSON:", e);
-            fpBearing.textContent = '-';
-            fpDesiredTrack.textContent = '-';
-            fpDistanceToDestination.textContent = '-';
-            fpDistanceToNext.textContent = '-';
-            fpEtaToDestination.textContent = '-';
-            fpEtaToNext.textContent = '-';
-            fpEteToDestination.textContent = '-';
-            fpEteToNext.textContent = '-';
-            fpTrack.textContent = '-';
-            fpWaypointName.textContent = '-';
-            fpIcao.textContent = '-';
-            fpNextWaypointLatitude.textContent = '-';
-            fpNextWaypointLongitude.textContent = '-';
-            fpXTrackErrorDistance.textContent = '-';
-            fpXTrackErrorAngle.textContent = '-';
-            fpTotalDistance.textContent = '-';
-            fpNextWaypointIndex.textContent = '-';
-            fpWaypointsList.innerHTML = `<li style="color: #ff4444; font-weight: bold;">Error: Invalid flight plan data format.</li>`;
-            if (flightPlannerSection.style.display === 'none' && isConnected) {
-                flightPlannerSection.style.display = 'block';
-            }
-            return;
-        }
-    } else {
-        data = rawData; // Assume it's already an object (e.g. if backend changes or for testing)
-    }
-
-    if (!data) {
-        // Clear all fields if data is null or undefined after potential parsing
-        fpBearing.textContent = '-';
-        fpDesiredTrack.textContent = '-';
-        fpDistanceToDestination.textContent = '-';
-        fpDistanceToNext.textContent = '-';
-        fpEtaToDestination.textContent = '-';
-        fpEtaToNext.textContent = '-';
-        fpEteToDestination.textContent = '-';
-        fpEteToNext.textContent = '-';
-        fpTrack.textContent = '-';
-        fpWaypointName.textContent = '-';
-        fpIcao.textContent = '-';
-        fpNextWaypointLatitude.textContent = '-';
-        fpNextWaypointLongitude.textContent = '-';
-        fpXTrackErrorDistance.textContent = '-';
-        fpXTrackErrorAngle.textContent = '-';
-        fpTotalDistance.textContent = '-';
-        fpNextWaypointIndex.textContent = '-';
-        fpWaypointsList.innerHTML = '<li>Error: No data received.</li>';
-        if (flightPlannerSection.style.display === 'none' && isConnected) {
-            flightPlannerSection.style.display = 'block';
+// Latest plan from the server: summary fields plus the waypoint list.
+// Updates only carry changed fields and a splice for waypoint edits.
+let flightPlan = { fields: {}, waypoints: null };
+
+function updateFlightPlanDisplay(data) {
+    if (!data || data.error) {
+        if (data) {
+            console.error("Flight plan error:", data.error);
         }
+        flightPlan = { fields: {}, waypoints: null };
+        clearFlightPlanFields();
+        const message = data ? data.error : 'No data received.';
+        fpWaypointsList.innerHTML = `<li style="color: #ff4444; font-weight: bold;">Error: ${message}</li>`;
+        showFlightPlanner();
         return;
     }
 
-    // Check for an error message from the backend
-    if (data.error) {
-        console.error("Flight plan error:", data.error);
-        // Clear all fields
-        fpBearing.textContent = '-';
-        fpDesiredTrack.textContent = '-';
-        fpDistanceToDestination.textContent = '-';
-        fpDistanceToNext.textContent = '-';
-        fpEtaToDestination.textContent = '-';
-        fpEtaToNext.textContent = '-';
-        fpEteToDestination.textContent = '-';
-        fpEteToNext.textContent = '-';
-        fpTrack.textContent = '-';
-        fpWaypointName.textContent = '-';
-        fpIcao.textContent = '-';
-        fpNextWaypointLatitude.textContent = '-';
-        fpNextWaypointLongitude.textContent = '-';
-        fpXTrackErrorDistance.textContent = '-';
-        fpXTrackErrorAngle.textContent = '-';
-        fpTotalDistance.textContent = '-';
-        fpNextWaypointIndex.textContent = '-';
-        // Display the error in the waypoints list area
-        fpWaypointsList.innerHTML = `<li style="color: #ff4444; font-weight: bold;">Error: ${data.error}</li>`;
-        // Ensure the section is visible to show the error
-        if (flightPlannerSection.style.display === 'none' && isConnected) {
-            flightPlannerSection.style.display = 'block';
-        }
-        return;
+    if (data.keyframe) {
+        flightPlan.fields = data.fields;
+    } else {
+        Object.assign(flightPlan.fields, data.fields);
+    }
+
+    if ('waypoints' in data) {
+        flightPlan.waypoints = data.waypoints;
+        renderWaypoints();
+    } else if (data.waypointsSplice) {
+        spliceWaypoints(data.waypointsSplice);
     }
 
+    renderFlightPlanFields(flightPlan.fields);
+    showFlightPlanner();
+}
+
+function showFlightPlanner() {
+    // Show the section if it was hidden and we have data
+    if (flightPlannerSection.style.display === 'none' && isConnected) {
+        flightPlannerSection.style.display = 'block';
+    }
+}
+
+function clearFlightPlanFields() {
+    fpBearing.textContent = '-';
+    fpDesiredTrack.textContent = '-';
+    fpDistanceToDestination.textContent = '-';
+    fpDistanceToNext.textContent = '-';
+    fpEtaToDestination.textContent = '-';
+    fpEtaToNext.textContent = '-';
+    fpEteToDestination.textContent = '-';
+    fpEteToNext.textContent = '-';
+    fpTrack.textContent = '-';
+    fpWaypointName.textContent = '-';
+    fpIcao.textContent = '-';
+    fpNextWaypointLatitude.textContent = '-';
+    fpNextWaypointLongitude.textContent = '-';
+    fpXTrackErrorDistance.textContent = '-';
+    fpXTrackErrorAngle.textContent = '-';
+    fpTotalDistance.textContent = '-';
+    fpNextWaypointIndex.textContent = '-';
+}
+
+function renderFlightPlanFields(data) {
     // Check if the data object is not a valid flight plan (e.g., empty object from backend)
     // by checking for a key field like 'bearing'.
-    if (typeof data.bearing === 'undefined') {
-        console.warn("Received flight plan data object without expected fields (e.g., bearing). Assuming no active flight plan.");
-        // Clear all fields
-        fpBearing.textContent = '-';
-        fpDesiredTrack.textContent = '-';
-        fpDistanceToDestination.textContent = '-';
-        fpDistanceToNext.textContent = '-';
-        fpEtaToDestination.textContent = '-';
-        fpEtaToNext.textContent = '-';
-        fpEteToDestination.textContent = '-';
-        fpEteToNext.textContent = '-';
-        fpTrack.textContent = '-';
-        fpWaypointName.textContent = '-';
-        fpIcao.textContent = '-';
-        fpNextWaypointLatitude.textContent = '-';
-        fpNextWaypointLongitude.textContent = '-';
-        fpXTrackErrorDistance.textContent = '-';
-        fpXTrackErrorAngle.textContent = '-';
-        fpTotalDistance.textContent = '-';
-        fpNextWaypointIndex.textContent = '-';
+    if (data.bearing === undefined) {
+        clearFlightPlanFields();
         fpWaypointsList.innerHTML = '<li>No active flight plan data found.</li>';
-        // Ensure the section is visible to show this message
-        if (flightPlannerSection.style.display === 'none' && isConnected) {
-            flightPlannerSection.style.display = 'block';
-        }
         return;
     }
 
-    // If no error and data structure seems valid, proceed to populate the data
-    fpBearing.textContent = data.bearing !== null ? data.bearing.toFixed(2) : '-';
-    fpDesiredTrack.textContent = data.desiredTrack !== null ? data.desiredTrack.toFixed(2) : '-';
-    fpDistanceToDestination.textContent = data.distanceToDestination !== null ? data.distanceToDestination.toFixed(2) + ' nm' : '-';
-    fpDistanceToNext.textContent = data.distanceToNext !== null ? data.distanceToNext.toFixed(2) + ' nm' : '-';
+    fpBearing.textContent = data.bearing != null ? data.bearing.toFixed(2) : '-';
+    fpDesiredTrack.textContent = data.desiredTrack != null ? data.desiredTrack.toFixed(2) : '-';
+    fpDistanceToDestination.textContent = data.distanceToDestination != null ? data.distanceToDestination.toFixed(2) + ' nm' : '-';
+    fpDistanceToNext.textContent = data.distanceToNext != null ? data.distanceToNext.toFixed(2) + ' nm' : '-';
 
     // ETA specific handling
     // If ETE is Infinity or NaN, or ETA is 0 or a very large number, display N/A for ETA.
@@ -586,41 +785,56 @@ function updateFlightPlanDisplay(rawData) {
 
     fpEteToDestination.textContent = data.eteToDestination ?? '-';
     fpEteToNext.textContent = data.eteToNext ?? '-';
-    fpTrack.textContent = data.track !== null ? data.track.toFixed(2) : '-';
+    fpTrack.textContent = data.track != null ? data.track.toFixed(2) : '-';
     fpWaypointName.textContent = data.waypointName ?? '-';
     fpIcao.textContent = data.icao ?? '-';
-    fpNextWaypointLatitude.textContent = data.nextWaypointLatitude !== null ? data.nextWaypointLatitude.toFixed(5) : '-';
-    fpNextWaypointLongitude.textContent = data.nextWaypointLongitude !== null ? data.nextWaypointLongitude.toFixed(5) : '-';
-    fpXTrackErrorDistance.textContent = data.xTrackErrorDistance !== null ? data.xTrackErrorDistance.toFixed(2) + ' nm' : '-';
-    fpXTrackErrorAngle.textContent = data.xTrackErrorAngle !== null ? (data.xTrackErrorAngle * 180 / Math.PI).toFixed(2) + '°' : '-'; // Convert radians to degrees
-    fpTotalDistance.textContent = data.totalDistance !== null ? data.totalDistance.toFixed(2) + ' nm' : '-';
+    fpNextWaypointLatitude.textContent = data.nextWaypointLatitude != null ? data.nextWaypointLatitude.toFixed(5) : '-';
+    fpNextWaypointLongitude.textContent = data.nextWaypointLongitude != null ? data.nextWaypointLongitude.toFixed(5) : '-';
+    fpXTrackErrorDistance.textContent = data.xTrackErrorDistance != null ? data.xTrackErrorDistance.toFixed(2) + ' nm' : '-';
+    fpXTrackErrorAngle.textContent = data.xTrackErrorAngle != null ? (data.xTrackErrorAngle * 180 / Math.PI).toFixed(2) + '°' : '-'; // Convert radians to degrees
+    fpTotalDistance.textContent = data.totalDistance != null ? data.totalDistance.toFixed(2) + ' nm' : '-';
     fpNextWaypointIndex.textContent = data.nextWaypointIndex ?? '-';
+}
 
-    if (data.detailedInfo && data.detailedInfo.flightPlanItems) {
-        fpWaypointsList.innerHTML = ''; // Clear previous waypoints
-        data.detailedInfo.flightPlanItems.forEach(item => {
-            const li = document.createElement('li');
-            li.textContent = `${item.name} (Type: ${item.type})`;
-            if (item.children && item.children.length > 0) {
-                const ul = document.createElement('ul');
-                item.children.forEach(child => {
-                    const childLi = document.createElement('li');
-                    childLi.textContent = `${child.identifier} (Alt: ${child.altitude === -1 ? 'N/A' : child.altitude + 'ft'})`;
-                    ul.appendChild(childLi);
-                });
-                li.appendChild(ul);
-            }
-            fpWaypointsList.appendChild(li);
+function createWaypointItem(item) {
+    const li = document.createElement('li');
+    li.textContent = `${item.name} (Type: ${item.type})`;
+    if (item.children && item.children.length > 0) {
+        const ul = document.createElement('ul');
+        item.children.forEach(child => {
+            const childLi = document.createElement('li');
+            childLi.textContent = `${child.identifier} (Alt: ${child.altitude === -1 ? 'N/A' : child.altitude + 'ft'})`;
+            ul.appendChild(childLi);
         });
-    } else {
-        fpWaypointsList.innerHTML = '<li>No detailed waypoint data available.</li>';
+        li.appendChild(ul);
     }
-    // Show the section if it was hidden and we have data
-    if (flightPlannerSection.style.display === 'none' && isConnected) {
-        flightPlannerSection.style.display = 'block';
+    return li;
+}
+
+function renderWaypoints() {
+    if (!flightPlan.waypoints) {
+        fpWaypointsList.innerHTML = '<li>No detailed waypoint data available.</li>';
+        return;
     }
+    fpWaypointsList.replaceChildren(...flightPlan.waypoints.map(createWaypointItem));
 }
 
+function spliceWaypoints({ start, deleteCount, items }) {
+    if (!flightPlan.waypoints || fpWaypointsList.children.length !== flightPlan.waypoints.length) {
+        // The list shows a message rather than waypoints; rebuild it
+        flightPlan.waypoints = flightPlan.waypoints || [];
+        flightPlan.waypoints.splice(start, deleteCount, ...items);
+        renderWaypoints();
+        return;
+    }
+
+    flightPlan.waypoints.splice(start, deleteCount, ...items);
+    for (let i = 0; i < deleteCount; i++) {
+        fpWaypointsList.children[start].remove();
+    }
+    const anchor = fpWaypointsList.children[start] || null;
+    items.forEach(item => fpWaypointsList.insertBefore(createWaypointItem(item), anchor));
+}
 
 // Make connectToDevice available globally
 window.connectToDevice = connectToDevice;
@@ -0,0 +1,44 @@
+"""Shared fixture for tests that talk to the mock sim."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.client import InfiniteFlightClient
+from src.api.codec import DataType
+from src.api.mock_server import MockInfiniteFlight
+from src.api.replay import Recording
+from src.api.synthetic import write_recording
+
+
+class MockSimTestCase(unittest.IsolatedAsyncioTestCase):
+    """A client connected to a mock sim serving a constant recording."""
+
+    server_class = MockInfiniteFlight
+
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        path = os.path.join(self.directory, "test.iftr")
+        write_recording(path, 300, rows=1)  # One sample, so values never change
+
+        self.recording = Recording(path)
+        self.addCleanup(self.recording.close)
+        self.server = self.server_class(self.recording, port=0, broadcast_address=None)
+        await self.server.start()
+        self.addAsyncCleanup(self.server.stop)
+
+        self.client = InfiniteFlightClient(self.server.host, self.server.port)
+        self.assertTrue(await self.client.connect(), self.client.last_error)
+        self.addAsyncCleanup(self.client.disconnect)
+
+        self.expected = self.recording.values_at(self.recording.start_time)
+
+    def states_of_type(self, *data_types: DataType):
+        """Names of the recorded states of the given types."""
+        return [name for name, t in self.recording.states if t in data_types]
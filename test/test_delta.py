@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests of the change-only updates sent to Socket.IO clients.
+
+    python test/test_delta.py
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.web import DeltaTracker
+
+
+class TestDeltaTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = DeltaTracker(
+            epsilons={"altitude": 1.0}, default_epsilon=0.1, keyframe_interval=5.0
+        )
+        self.now = 100.0
+        patcher = mock.patch("src.web.delta.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_update_is_a_keyframe(self):
+        values = {"altitude": 3000.0, "on_ground": False}
+        self.assertEqual(self.tracker.update(values), (values, True))
+
+    def test_only_moves_beyond_epsilon_are_sent(self):
+        self.tracker.update({"altitude": 3000.0, "speed": 120.0})
+
+        self.now += 1
+        self.assertEqual(
+            self.tracker.update({"altitude": 3000.5, "speed": 120.2}),
+            ({"speed": 120.2}, False),
+        )
+        # Compared against the value last sent, not the last one seen
+        self.now += 1
+        self.assertEqual(
+            self.tracker.update({"altitude": 3001.1, "speed": 120.25}),
+            ({"altitude": 3001.1}, False),
+        )
+
+    def test_booleans_and_strings_compare_by_value(self):
+        self.tracker = DeltaTracker(default_epsilon=5.0)
+        self.tracker.update({"on_ground": False, "name": "A320"})
+        self.assertEqual(
+            self.tracker.update({"on_ground": True, "name": "A320"}),
+            ({"on_ground": True}, False),
+        )
+
+    def test_new_states_are_sent(self):
+        self.tracker.update({"altitude": 3000.0})
+        self.now += 1
+        self.assertEqual(
+            self.tracker.update({"altitude": 3000.0, "speed": 120.0}),
+            ({"speed": 120.0}, False),
+        )
+
+    def test_keyframes_are_periodic_and_on_reset(self):
+        values = {"altitude": 3000.0}
+        self.tracker.update(values)
+
+        self.now += 1
+        self.assertEqual(self.tracker.update(values), ({}, False))
+        self.now += 4
+        self.assertEqual(self.tracker.update(values), (values, True))
+
+        self.now += 1
+        self.tracker.reset()
+        self.assertEqual(self.tracker.update(values), (values, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
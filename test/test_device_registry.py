@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests of parsing discovery broadcasts into the device registry.
+
+    python test/test_device_registry.py
+"""
+
+import json
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.discovery import DeviceRegistry, parse_broadcast
+
+SENDER = ("192.168.1.20", 15000)
+
+
+def _broadcast(**fields) -> bytes:
+    """A discovery broadcast as the sim sends it."""
+    return json.dumps({"deviceId": "device-1", "port": 10112, **fields}).encode()
+
+
+class TestParseBroadcast(unittest.TestCase):
+    def test_prefers_an_address_in_the_sender_subnet(self):
+        addresses = ["127.0.0.1", "fe80::1", "10.0.0.5", "192.168.2.7"]
+        device_info = parse_broadcast(
+            _broadcast(addresses=addresses), ("192.168.2.1", 15000)
+        )
+
+        self.assertEqual(device_info["address"], "192.168.2.1")
+        self.assertEqual(device_info["preferred_ip"], "192.168.2.7")
+
+    def test_wrongly_typed_fields(self):
+        for fields in (
+            {"addresses": ["192.168.1.20", 5]},
+            {"addresses": "192.168.1.20"},
+            {"deviceId": ["device-1"]},
+        ):
+            self.assertIsNone(parse_broadcast(_broadcast(**fields), SENDER), fields)
+
+    def test_not_an_object(self):
+        with self.assertRaises(ValueError):
+            parse_broadcast(b"[]", SENDER)
+
+
+class TestDeviceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.found = []
+        self.registry = DeviceRegistry(on_found=self.found.append)
+
+    def test_malformed_datagrams_are_ignored(self):
+        for data in (
+            b"\xff",
+            b"{",
+            b"null",
+            _broadcast(addresses=[None]),
+            _broadcast(addresses={"ip": 1}),
+        ):
+            self.registry.datagram_received(data, SENDER)
+        self.assertEqual(self.registry.devices, [])
+
+        self.registry.datagram_received(_broadcast(addresses=[SENDER[0]]), SENDER)
+        self.assertEqual(
+            [device["deviceId"] for device in self.registry.devices], ["device-1"]
+        )
+        self.assertEqual(self.found, self.registry.devices)
+
+
+if __name__ == "__main__":
+    unittest.main()
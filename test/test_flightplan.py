@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests of flight plan change detection and waypoint diffs.
+
+    python test/test_flightplan.py
+"""
+
+import json
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.web import FlightPlanTracker
+
+
+def _plan(waypoints, **fields):
+    """A flight plan payload as the sim sends it."""
+    plan = {"totalDistance": 500.0, "distanceToNext": 20.0, **fields}
+    plan["detailedInfo"] = {
+        "waypoints": len(waypoints),
+        "flightPlanItems": [{"name": name} for name in waypoints],
+    }
+    return json.dumps(plan)
+
+
+class TestFlightPlanTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = FlightPlanTracker()
+
+    def test_first_plan_is_a_keyframe(self):
+        update = self.tracker.update(_plan(["EGLL", "LFPG"]))
+
+        self.assertTrue(update["keyframe"])
+        self.assertEqual(update["fields"]["totalDistance"], 500.0)
+        self.assertEqual(update["fields"]["detailedInfo"], {"waypoints": 2})
+        self.assertEqual(update["waypoints"], [{"name": "EGLL"}, {"name": "LFPG"}])
+
+    def test_unchanged_plan_produces_nothing(self):
+        self.tracker.update(_plan(["EGLL", "LFPG"]))
+        self.assertIsNone(self.tracker.update(_plan(["EGLL", "LFPG"])))
+
+        # Same content, different formatting
+        raw = json.loads(_plan(["EGLL", "LFPG"]))
+        self.assertIsNone(self.tracker.update(json.dumps(raw, indent=2)))
+
+    def test_changed_fields_only(self):
+        self.tracker.update(_plan(["EGLL", "LFPG"], eta=10))
+        update = self.tracker.update(_plan(["EGLL", "LFPG"], distanceToNext=19.5))
+
+        self.assertEqual(
+            update, {"keyframe": False, "fields": {"distanceToNext": 19.5, "eta": None}}
+        )
+
+    def test_waypoint_edit_is_one_splice(self):
+        self.tracker.update(_plan(["EGLL", "DVR", "LFPG"]))
+        update = self.tracker.update(_plan(["EGLL", "BIG", "KONAN", "LFPG"]))
+
+        self.assertEqual(update["fields"], {"detailedInfo": {"waypoints": 4}})
+        self.assertEqual(
+            update["waypointsSplice"],
+            {
+                "start": 1,
+                "deleteCount": 1,
+                "items": [{"name": "BIG"}, {"name": "KONAN"}],
+            },
+        )
+
+    def test_reset_and_clear(self):
+        self.tracker.update(_plan(["EGLL"]))
+        self.tracker.reset()
+        self.assertTrue(self.tracker.update(_plan(["EGLL"]))["keyframe"])
+
+        self.assertTrue(self.tracker.clear())
+        self.assertFalse(self.tracker.clear())
+        self.assertTrue(self.tracker.update(_plan(["EGLL"]))["keyframe"])
+
+    def test_bad_payload_then_keyframe(self):
+        self.tracker.update(_plan(["EGLL"]))
+        with self.assertRaises(ValueError):
+            self.tracker.update("not json")
+        with self.assertRaises(ValueError):
+            self.tracker.update("[]")
+        self.assertTrue(self.tracker.update(_plan(["EGLL"]))["keyframe"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests of decoding reply frames from the receive buffer.
+
+    python test/test_frame_protocol.py
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.codec import REPLY_HEADER
+from src.api.transport import FrameProtocol
+
+
+def _reply(state_id: int, payload: bytes) -> bytes:
+    """A reply frame as the sim sends it."""
+    return REPLY_HEADER.pack(state_id, len(payload)) + payload
+
+
+def _feed(protocol: FrameProtocol, data: bytes, step: int):
+    """Deliver bytes to a protocol ``step`` bytes at a time."""
+    for offset in range(0, len(data), step):
+        piece = data[offset : offset + step]
+        protocol.get_buffer(len(piece))[: len(piece)] = piece
+        protocol.buffer_updated(len(piece))
+
+
+class TestFrameProtocol(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.lost = []
+        self.protocol = FrameProtocol(
+            lambda state_id, payload: bytes(payload), on_lost=self.lost.append
+        )
+        self.protocol.connection_made(mock.Mock())
+
+    async def test_replies_resolve_requests_per_state_in_order(self):
+        first, other, second = (
+            self.protocol.expect(state_id, 1.0) for state_id in (1, 2, 1)
+        )
+        data = _reply(2, b"two") + _reply(1, b"one") + _reply(1, b"uno")
+        _feed(self.protocol, data, 1)  # Split at every possible byte
+
+        self.assertEqual(
+            [first.result(), other.result(), second.result()],
+            [b"one", b"two", b"uno"],
+        )
+        self.assertEqual(self.protocol._pending, {})
+        self.assertEqual(self.protocol.metrics.bytes_received, len(data))
+
+    async def test_frame_larger_than_the_buffer(self):
+        waiter = self.protocol.expect(-1, 1.0)
+        payload = bytes(range(256)) * 1024
+        _feed(self.protocol, _reply(-1, payload), 4000)
+
+        self.assertEqual(waiter.result(), payload)
+        # The memory borrowed for the frame is given back
+        self.assertEqual(len(self.protocol._buffer), 64 * 1024)
+
+    async def test_unexpected_reply_is_skipped(self):
+        waiter = self.protocol.expect(1, 1.0)
+        _feed(self.protocol, _reply(7, b"?") + _reply(1, b"one"), 64)
+
+        self.assertEqual(waiter.result(), b"one")
+        self.assertEqual(self.protocol.metrics.errors["unexpected_reply"], 1)
+
+    async def test_connection_lost_fails_pending_requests(self):
+        waiter = self.protocol.expect(1, 1.0)
+        error = ConnectionResetError()
+        self.protocol.connection_lost(error)
+
+        with self.assertRaises(RuntimeError):
+            waiter.result()
+        self.assertEqual(self.lost, [error])
+        with self.assertRaises(RuntimeError):
+            self.protocol.expect(1, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests of merging subscribers' states into one poll plan, and of adaptive polling.
+
+    python test/test_poll_plan.py
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.poll_plan import RATE_TIERS, PollPlan, rate_tier
+from src.api.subscriptions import Subscription
+
+
+class _Client:
+    """Records the subscriptions a plan makes instead of polling."""
+
+    def __init__(self):
+        self.subscriptions = []
+        self.woken = []
+
+    async def subscribe(self, state_names, rate, callback, on_error, min_rate):
+        subscription = Subscription(state_names, rate, callback, on_error, min_rate)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        self.subscriptions.remove(subscription)
+
+    def wake(self, subscriptions=None):
+        self.woken.extend(subscriptions or [])
+
+    def tiers(self):
+        """Poll rate -> polled states."""
+        return {s.rate: s.state_names for s in self.subscriptions}
+
+    def poll(self, now, rate, values):
+        """Deliver one poll of the subscription at a rate, at a loop time."""
+        with mock.patch.object(asyncio.get_running_loop(), "time", lambda: now):
+            for subscription in self.subscriptions:
+                if subscription.rate == rate:
+                    subscription.callback(values)
+
+
+class TestRateTier(unittest.TestCase):
+    def test_rounds_up_to_a_tier(self):
+        self.assertEqual(rate_tier(0.1), 0.25)
+        self.assertEqual(rate_tier(1.0), 1.0)
+        self.assertEqual(rate_tier(3.0), 5.0)
+        self.assertEqual(rate_tier(1000.0), RATE_TIERS[-1])
+
+    def test_rejects_non_positive_rates(self):
+        with self.assertRaises(ValueError):
+            rate_tier(0.0)
+
+
+class TestPollPlan(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = _Client()
+        self.plan = PollPlan(self.client)
+        self.received = {"a": [], "b": []}
+
+    async def subscribe(self, subscriber, state_names, rate):
+        return await self.plan.subscribe(
+            subscriber, state_names, rate, self.received[subscriber].append
+        )
+
+    async def test_each_state_is_polled_once_at_its_fastest_rate(self):
+        self.assertEqual(await self.subscribe("a", ["x", "y"], 3.0), 5.0)
+        self.assertEqual(await self.subscribe("b", ["y", "z"], 10.0), 10.0)
+
+        self.assertEqual(self.plan.rates, {"x": 5.0, "y": 10.0, "z": 10.0})
+        self.assertEqual(self.client.tiers(), {5.0: ["x"], 10.0: ["y", "z"]})
+        self.assertEqual(self.plan.subscribed("a"), {"x": 5.0, "y": 5.0})
+
+    async def test_subscribers_get_their_states_at_their_rate(self):
+        await self.subscribe("a", ["x", "y"], 5.0)
+        await self.subscribe("b", ["y", "z"], 10.0)
+
+        self.client.poll(0.0, 10.0, {"y": 1, "z": 2})
+        self.client.poll(0.1, 10.0, {"y": 3, "z": 4})
+        self.client.poll(0.1, 5.0, {"x": 5})
+
+        self.assertEqual(self.received["b"], [{"y": 1, "z": 2}, {"y": 3, "z": 4}])
+        # The second poll of y came too soon for a's 5 Hz
+        self.assertEqual(self.received["a"], [{"y": 1}, {"x": 5}])
+
+    async def test_unsubscribing_replans(self):
+        await self.subscribe("a", ["x", "y"], 5.0)
+        await self.subscribe("b", ["y", "z"], 10.0)
+
+        await self.plan.unsubscribe("b")
+        self.assertEqual(self.client.tiers(), {5.0: ["x", "y"]})
+
+        await self.plan.unsubscribe("a", ["x"])
+        self.assertEqual(self.client.tiers(), {5.0: ["y"]})
+
+        await self.plan.close()
+        self.assertEqual(self.client.subscriptions, [])
+        self.assertEqual(self.plan.rates, {})
+
+    async def test_failing_subscriber_does_not_starve_others(self):
+        def fail(values):
+            raise RuntimeError("viewer went away")
+
+        await self.plan.subscribe("a", ["x"], 5.0, fail)
+        await self.subscribe("b", ["x"], 5.0)
+
+        self.client.poll(0.0, 5.0, {"x": 1})
+        self.assertEqual(self.received["b"], [{"x": 1}])
+
+
+class TestAdaptivePollPlan(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = _Client()
+        self.plan = PollPlan(self.client, min_rate=1.0)
+
+    async def test_tiers_back_off_to_the_minimum_rate(self):
+        await self.plan.subscribe("a", ["x"], 0.5, lambda values: None)
+        await self.plan.subscribe("b", ["y"], 10.0, lambda values: None)
+
+        # A tier slower than the minimum never speeds up
+        self.assertEqual(
+            {s.rate: s.min_rate for s in self.client.subscriptions},
+            {0.5: 0.5, 10.0: 1.0},
+        )
+
+    async def test_new_states_wake_their_tier(self):
+        await self.plan.subscribe("a", ["x"], 5.0, lambda values: None)
+        self.assertEqual(self.client.woken, [])
+
+        await self.plan.subscribe("b", ["y"], 5.0, lambda values: None)
+        self.assertEqual(self.client.woken, self.client.subscriptions)
+
+        # Dropping a subscriber whose states others still poll changes nothing
+        self.client.woken.clear()
+        await self.plan.subscribe("c", ["x"], 5.0, lambda values: None)
+        await self.plan.unsubscribe("c")
+        self.assertEqual(self.client.woken, [])
+
+
+class TestAdaptiveSubscription(unittest.TestCase):
+    def setUp(self):
+        self.subscription = Subscription(
+            ["x"], 8.0, lambda values: None, min_rate=1.0, idle_polls=2
+        )
+
+    def test_static_values_halve_the_rate_down_to_the_minimum(self):
+        rates = []
+        for _ in range(10):
+            self.subscription.observe({"x": 1})
+            rates.append(self.subscription.effective_rate)
+        self.assertEqual(rates, [8.0, 8.0, 4.0, 4.0, 2.0, 2.0, 1.0, 1.0, 1.0, 1.0])
+
+        self.subscription.observe({"x": 2})
+        self.assertEqual(self.subscription.effective_rate, 8.0)
+
+    def test_idle_stays_at_the_minimum_until_woken(self):
+        self.subscription.idle = True
+        self.subscription.observe({"x": 1})
+        self.subscription.observe({"x": 2})
+        self.assertEqual(self.subscription.effective_rate, 1.0)
+
+        self.subscription.wake()
+        self.assertEqual(self.subscription.effective_rate, 8.0)
+
+    def test_minimum_above_the_rate_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Subscription(["x"], 1.0, lambda values: None, min_rate=2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests of recording telemetry to columnar files.
+
+    python test/test_recorder.py
+"""
+
+import asyncio
+import os
+import unittest
+
+from mock_sim import MockSimTestCase
+from src.api.codec import DataType
+from src.api.recorder import TelemetryRecorder
+from src.api.replay import Recording
+
+
+class TestRecorder(MockSimTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # One state of every recorded type
+        self.names = [
+            self.states_of_type(data_type)[0]
+            for data_type in (
+                DataType.BOOLEAN,
+                DataType.INTEGER,
+                DataType.FLOAT,
+                DataType.DOUBLE,
+                DataType.STRING,
+            )
+        ]
+        self.path = os.path.join(self.directory, "recorded.iftr")
+
+    async def record(self, rows: int) -> TelemetryRecorder:
+        """Record at least ``rows`` samples of ``self.names``."""
+        recorder = TelemetryRecorder(
+            self.client, self.path, self.names, rate=20.0, chunk_rows=5
+        )
+        await recorder.start()
+        try:
+            for _ in range(100):
+                if recorder.rows_written >= rows:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await recorder.stop()
+        return recorder
+
+    async def test_recorded_samples_read_back(self):
+        recorder = await self.record(10)
+
+        with Recording(self.path) as recording:
+            self.assertEqual(recording.state_names, self.names)
+            self.assertEqual(
+                [data_type for _, data_type in recording.states],
+                [self.client.get_state_type(name) for name in self.names],
+            )
+            self.assertEqual(recording.rows, recorder.rows_written)
+            self.assertGreaterEqual(recording.rows, 10)
+
+            samples = list(recording.samples())
+            self.assertEqual(
+                [timestamp for timestamp, _ in samples],
+                sorted(timestamp for timestamp, _ in samples),
+            )
+            for _, values in samples:
+                self.assertEqual(
+                    values, {name: self.expected[name] for name in self.names}
+                )
+
+    async def test_existing_file_is_not_overwritten(self):
+        with open(self.path, "wb"):
+            pass
+        recorder = TelemetryRecorder(self.client, self.path, self.names)
+        with self.assertRaises(FileExistsError):
+            await recorder.start()
+        self.assertFalse(recorder.recording)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests of reading recordings and replaying them through the mock sim.
+
+    python test/test_replay.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from mock_sim import MockSimTestCase
+from src.api.replay import Recording
+from src.api.synthetic import LOCATION_STATES, write_recording
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        path = os.path.join(self.directory, "flight.iftr")
+        write_recording(path, 20, rows=50, rate=10)
+        self.recording = Recording(path)
+        self.addCleanup(self.recording.close)
+
+    def test_index(self):
+        self.assertEqual(self.recording.rows, 50)
+        self.assertEqual(len(self.recording.state_names), 20)
+        self.assertEqual(self.recording.start_time, 1_700_000_000)
+        self.assertAlmostEqual(self.recording.duration, 4.9, places=5)
+
+    def test_values_at_are_the_last_sample_before(self):
+        latitude = LOCATION_STATES["aircraft/0/latitude"]
+        start = self.recording.start_time
+
+        for offset, t in ((1.25, 1.2), (-10.0, 0.0), (100.0, 4.9)):
+            values = self.recording.values_at(start + offset)
+            self.assertAlmostEqual(values["aircraft/0/latitude"], latitude(t))
+
+    def test_samples_in_order(self):
+        samples = list(self.recording.samples())
+        self.assertEqual(len(samples), 50)
+        self.assertEqual(
+            [timestamp for timestamp, _ in samples],
+            sorted(timestamp for timestamp, _ in samples),
+        )
+        self.assertEqual(samples[-1][1], self.recording.values_at(samples[-1][0]))
+
+    def test_not_a_recording(self):
+        path = os.path.join(self.directory, "other.iftr")
+        for content in (b"", b"not a recording"):
+            with open(path, "wb") as file:
+                file.write(content)
+            with self.assertRaises(ValueError):
+                Recording(path)
+
+
+class TestMockServer(MockSimTestCase):
+    async def test_serves_the_recorded_values(self):
+        self.assertEqual(
+            self.client.get_available_states(), sorted(self.recording.state_names)
+        )
+        names = self.recording.state_names
+        self.assertEqual(await self.client.get_states(names), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests of the binary telemetry frames.
+
+    python test/test_telemetry.py
+"""
+
+import os
+import struct
+import sys
+import unittest
+
+# Add parent directory to path to import the module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.codec import DataType
+from src.web import TelemetryEncoder
+from src.web.telemetry import FRAME_HEADER, FRAME_VERSION, MAX_STRING_BYTES, NULL_TAG
+
+
+class TestTelemetryEncoder(unittest.TestCase):
+    def setUp(self):
+        types = {
+            "on_ground": DataType.BOOLEAN,
+            "altitude": DataType.DOUBLE,
+            "name": DataType.STRING,
+        }
+        self.encoder = TelemetryEncoder(types.get)
+
+    def test_indices_are_kept(self):
+        self.assertEqual(
+            self.encoder.register(["altitude", "name"]), {"altitude": 0, "name": 1}
+        )
+        self.assertEqual(
+            self.encoder.register(["on_ground", "altitude"]),
+            {"on_ground": 2, "altitude": 0},
+        )
+
+    def test_frame_layout(self):
+        self.encoder.register(["altitude", "name", "on_ground", "unknown"])
+        frame = self.encoder.encode(
+            {
+                "altitude": 3000.5,
+                "name": "A320",
+                "on_ground": None,
+                "unknown": 1,
+                "unregistered": 2,
+            }
+        )
+
+        expected = (
+            FRAME_HEADER.pack(FRAME_VERSION, 4)
+            + struct.pack("<HBd", 0, DataType.DOUBLE, 3000.5)
+            + struct.pack("<HBH4s", 1, DataType.STRING, 4, b"A320")
+            + struct.pack("<HB", 2, NULL_TAG)
+            + struct.pack("<HB", 3, NULL_TAG)
+        )
+        self.assertEqual(frame, expected)
+
+        # The buffer is reused; a smaller frame carries nothing of the last
+        self.assertEqual(
+            self.encoder.encode({"on_ground": True}),
+            FRAME_HEADER.pack(FRAME_VERSION, 1)
+            + struct.pack("<HB?", 2, DataType.BOOLEAN, True),
+        )
+
+    def test_long_string_is_cut_between_characters(self):
+        self.encoder.register(["name"])
+        # Two-byte characters, the last of which straddles the limit
+        value = "\u00e9" * (MAX_STRING_BYTES // 2 + 1)
+        frame = self.encoder.encode({"name": value})
+
+        (length,) = struct.unpack_from("<H", frame, FRAME_HEADER.size + 3)
+        text = frame[FRAME_HEADER.size + 5 :].decode("utf-8")
+        self.assertEqual(length, MAX_STRING_BYTES - 1)
+        self.assertEqual(text, value[: MAX_STRING_BYTES // 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Tests of the client's connection handling against the mock sim.
+
+    python test/test_transport.py
+"""
+
+import asyncio
+import socket
+import unittest
+from unittest import mock
+
+from mock_sim import MockSimTestCase
+from src.api import transport
+from src.api.client import InfiniteFlightClient
+from src.api.codec import REQUEST, DataType
+from src.api.manifest_cache import ManifestCache
+from src.api.mock_server import MockInfiniteFlight
+
+
+class TestMultiplexing(MockSimTestCase):
+    async def test_concurrent_callers_get_their_own_values(self):
+        names = self.states_of_type(DataType.INTEGER, DataType.DOUBLE)
+
+        async def caller(index: int):
+            for round in range(10):
+                batch = names[index + round :: 7][:20]
+                self.assertEqual(
+                    await self.client.get_states(batch),
+                    {name: self.expected[name] for name in batch},
+                )
+                name = names[(index * 10 + round) % len(names)]
+                self.assertEqual(await self.client.get_state(name), self.expected[name])
+
+        await asyncio.gather(*(caller(i) for i in range(20)))
+        self.assertEqual(self.client._protocol._pending, {})
+        self.assertEqual(self.client.metrics.errors, {})
+
+
+class _SmallWindowSim(MockInfiniteFlight):
+    """Mock sim whose connections have a tiny receive window."""
+
+    async def start(self):
+        await super().start()
+        for sock in self._server.sockets:
+            # Inherited by accepted connections
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+
+
+class TestBackpressure(MockSimTestCase):
+    server_class = _SmallWindowSim
+
+    async def test_writes_queued_by_the_transport_stay_intact(self):
+        """Frames the socket cannot take yet must not change afterwards."""
+        # With the sim not reading, everything below waits in the transport
+        self.client._transport.get_extra_info("socket").setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, 4096
+        )
+        for transport in self.server._connections:
+            transport.pause_reading()
+
+        # Every batch asks for different states (and more of them than the
+        # last), interleaved with sets of other states
+        reads = self.states_of_type(DataType.INTEGER, DataType.DOUBLE)
+        sets = self.states_of_type(DataType.FLOAT)
+        batches = [(reads[i:] + reads[:i])[: 50 + i] for i in range(len(reads) - 50)]
+        served = self.server.requests
+        gets = []
+        for i, batch in enumerate(batches):
+            gets.append(asyncio.ensure_future(self.client.get_states(batch)))
+            if i < len(sets):
+                asyncio.ensure_future(self.client.set_state(sets[i], i + 0.5))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        self.assertGreater(self.client._transport.get_write_buffer_size(), 0)
+
+        for transport in self.server._connections:
+            transport.resume_reading()
+        results = await asyncio.wait_for(asyncio.gather(*gets), timeout=10.0)
+
+        for batch, result in zip(batches, results):
+            self.assertEqual(result, {name: self.expected[name] for name in batch})
+        self.assertEqual(self.server.requests - served, sum(map(len, batches)))
+        written = sets[: len(batches)]
+        self.assertEqual(
+            await self.client.get_states(written),
+            {name: i + 0.5 for i, name in enumerate(written)},
+        )
+
+
+class _DroppingSim(MockInfiniteFlight):
+    """Mock sim that leaves the requests of some reads unanswered."""
+
+    drop = 0  # Number of reads whose replies are dropped
+
+    def _serve(self, buffer):
+        consumed, replies = super()._serve(buffer)
+        if replies and self.drop:
+            self.drop -= 1
+            return consumed, b""
+        return consumed, replies
+
+
+class TestLostReplies(MockSimTestCase):
+    server_class = _DroppingSim
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.client.timeout = 0.2
+        self.name, self.other = self.states_of_type(DataType.DOUBLE)[:2]
+
+    async def test_dropped_reply_does_not_break_the_state(self):
+        self.server.drop = 1
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client.get_state(self.name)
+
+        for _ in range(3):
+            self.assertEqual(
+                await self.client.get_state(self.name), self.expected[self.name]
+            )
+        self.assertEqual(
+            await self.client.get_states([self.name, self.other]),
+            {name: self.expected[name] for name in (self.name, self.other)},
+        )
+        self.assertEqual(self.client.metrics.errors["lost_reply"], 1)
+        self.assertEqual(self.client._protocol._pending, {})
+
+    async def test_abandoned_requests_expire(self):
+        # Without a grace period, a timed out request is given up on at once
+        with mock.patch.object(transport, "LATE_REPLY_GRACE", 0.0):
+            for _ in range(5):
+                self.server.drop = 1
+                with self.assertRaises(asyncio.TimeoutError):
+                    await self.client.get_state(self.name)
+
+        state_id = self.client._manifest.id_of(self.name)
+        self.assertEqual(len(self.client._protocol._pending[state_id]), 1)
+        self.assertEqual(self.client.metrics.errors["lost_reply"], 4)
+
+    async def test_unsent_requests_are_withdrawn(self):
+        with mock.patch.object(
+            self.client._protocol, "write", side_effect=RuntimeError("write failed")
+        ):
+            with self.assertRaises(RuntimeError):
+                await self.client.get_states([self.name, self.other])
+        self.assertEqual(self.client._protocol._pending, {})
+
+        self.assertEqual(
+            await self.client.get_state(self.name), self.expected[self.name]
+        )
+
+
+class TestReconnect(MockSimTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.client.auto_reconnect = True
+        self.reconnected = asyncio.Event()
+        self.client.on_reconnected = self.reconnected.set
+
+    async def drop_connection(self):
+        for transport in list(self.server._connections):
+            transport.close()
+        await asyncio.sleep(0.05)
+
+    async def test_not_connected_until_the_manifest_is_checked(self):
+        validate = self.client._manifest_still_valid
+        seen = []
+
+        async def manifest_still_valid():
+            seen.append(self.client.is_connected)
+            return await validate()
+
+        self.client._manifest_still_valid = manifest_still_valid
+        await self.drop_connection()
+        await asyncio.wait_for(self.reconnected.wait(), timeout=5.0)
+
+        self.assertEqual(seen, [False])
+        self.assertTrue(self.client.is_connected)
+        self.assertEqual(self.client.reconnects, 1)
+
+    async def test_manifest_reloaded_for_another_aircraft(self):
+        self.client._aircraft_name = "Another aircraft"
+        await self.drop_connection()
+        await asyncio.wait_for(self.reconnected.wait(), timeout=5.0)
+
+        self.assertTrue(self.client.is_connected)
+        self.assertEqual(self.client._aircraft_name, self.expected["aircraft/0/name"])
+        self.assertEqual(self.client.metrics.operations["manifest"].count, 2)
+
+    async def test_manifest_cached_under_the_aircraft_it_belongs_to(self):
+        cache = ManifestCache(self.directory)
+        device = dict(self.server.device)
+        client = InfiniteFlightClient(
+            self.server.host,
+            self.server.port,
+            device=device,
+            manifest_cache_dir=self.directory,
+            auto_reconnect=True,
+        )
+        reconnected = asyncio.Event()
+        client.on_reconnected = reconnected.set
+        self.assertTrue(await client.connect(), client.last_error)
+        self.addAsyncCleanup(client.disconnect)
+        key = ManifestCache.make_key(
+            device["deviceId"], device["version"], device["aircraft"]
+        )
+        self.assertIsNotNone(cache.load(key))
+
+        # The sim switches aircraft while the connection is down
+        await client.set_state("aircraft/0/name", "Cessna 172")
+        await client.flush_sets()
+        with mock.patch.object(
+            ManifestCache, "save", autospec=True, side_effect=ManifestCache.save
+        ) as save:
+            await self.drop_connection()
+            await asyncio.wait_for(reconnected.wait(), timeout=5.0)
+
+        cessna = ManifestCache.make_key(
+            device["deviceId"], device["version"], "Cessna 172"
+        )
+        self.assertEqual([call.args[1] for call in save.call_args_list], [cessna])
+        self.assertEqual(client.device["aircraft"], "Cessna 172")
+        self.assertEqual(device["aircraft"], self.server.device["aircraft"])
+
+
+class TestCommands(MockSimTestCase):
+    async def test_long_sequences_are_written_in_chunks(self):
+        sizes = []
+        write = self.client._protocol.write
+
+        def record_write(data):
+            sizes.append(len(data))
+            write(data)
+
+        with mock.patch.object(
+            self.client, "_command_id", lambda name: 100_000
+        ), mock.patch.object(self.client._protocol, "write", record_write):
+            self.client.queue_command("commands/Test", repeat=2500)
+            self.client.queue_command("commands/Test", repeat=10)
+            await self.client.run_command("commands/Test")
+
+        frame = REQUEST.size
+        self.assertEqual(sizes, [1024 * frame, 1024 * frame, 462 * frame, frame])
+        self.assertEqual(self.client.metrics.commands, 2511)
+        self.assertIsNone(self.client._command_writer)
+
+    async def test_invalid_repeat(self):
+        with self.assertRaises(ValueError):
+            self.client.queue_command("commands/Test", repeat=0)
+
+
+class TestCachedStates(MockSimTestCase):
+    async def test_failed_chunk_is_yielded_without_values(self):
+        names = self.states_of_type(DataType.DOUBLE)[:6]
+        get_states = self.client.get_states
+
+        async def failing_get_states(state_names):
+            if names[2] in state_names:
+                raise asyncio.TimeoutError()
+            return await get_states(state_names)
+
+        with mock.patch.object(self.client, "get_states", failing_get_states):
+            chunks = [
+                values
+                async for values in self.client.iter_cached_states(
+                    names, max_age=0.0, chunk_size=2
+                )
+            ]
+
+        self.assertEqual(
+            chunks,
+            [
+                {name: self.expected[name] for name in names[:2]},
+                {names[2]: None, names[3]: None},
+                {name: self.expected[name] for name in names[4:]},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()